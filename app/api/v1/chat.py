@@ -19,9 +19,15 @@ async def get_chat_history(current_user: Annotated[User, Depends(deps.get_curren
 
 
 @router.get("/sessions/{session_id}")
-async def get_session_detail(session_id: str, current_user: Annotated[User, Depends(deps.get_current_user)]):
-    """获取指定会话的详细历史"""
-    session_data = session_service.get_session(session_id, user_id=current_user.id)
+async def get_session_detail(
+    session_id: str,
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+    expand_attachments: bool = False,
+):
+    """获取指定会话的详细历史 (expand_attachments=true 时附带附件解析正文)"""
+    session_data = session_service.get_session(
+        session_id, user_id=current_user.id, expand_attachments=expand_attachments
+    )
     if not session_data:
         raise HTTPException(status_code=404, detail="Session not found")
     return session_data
@@ -58,7 +64,10 @@ async def chat_completions(request: ChatRequest, current_user: Annotated[User, D
 @router.delete("/sessions")
 async def delete_all_sessions(current_user: Annotated[User, Depends(deps.get_current_user)]):
     """删除该用户的所有会话"""
-    session_service.delete_all_sessions(user_id=current_user.id)
+    session_ids = [s.id for s in session_service.list_sessions(user_id=current_user.id)]
+    if session_service.delete_all_sessions(user_id=current_user.id):
+        for session_id in session_ids:
+            await workflow_service.delete_thread(session_id)
     return {"status": "success", "message": "All sessions deleted"}
 
 
@@ -68,6 +77,7 @@ async def delete_session(session_id: str, current_user: Annotated[User, Depends(
     success = session_service.delete_session(session_id, user_id=current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Session not found or permission denied")
+    await workflow_service.delete_thread(session_id)
     return {"status": "success"}
 
 
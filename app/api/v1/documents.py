@@ -1,16 +1,13 @@
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from sqlmodel import Session
 
 from app.api import deps
 from app.core.config import settings
-from app.core.db import engine
-from app.models.file import FileParsingCache
 from app.models.user import User
-from app.services.document_service import UPLOAD_CACHE, document_service
+from app.services.document_service import UPLOAD_CACHE, UploadTooLargeError, document_service
 
 router = APIRouter()
 
@@ -24,11 +21,10 @@ class UploadResponse(BaseModel):
 
 @router.post("/upload")
 async def upload_file(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: Annotated[User, Depends(deps.get_current_user)] = None,
 ):
-    """上传文件并进行解析与异步索引"""
+    """上传文件：保存并哈希后立即返回，解析与索引由任务队列在后台完成"""
     allowed_extensions = (".pdf", ".docx", ".doc", ".xlsx", ".xls", ".pptx", ".ppt", ".txt", ".md", ".json")
     if not file.filename.lower().endswith(allowed_extensions):
         raise HTTPException(
@@ -36,11 +32,11 @@ async def upload_file(
             detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}",
         )
     try:
-        # 直接传递 UploadFile 对象，让 service 处理保存、哈希和进度排期
-        result = await document_service.process_file(
-            file, user_id=current_user.id if current_user else None, background_tasks=background_tasks
-        )
+        # 直接传递 UploadFile 对象，让 service 处理保存、哈希和任务入队
+        result = await document_service.process_file(file, user_id=current_user.id if current_user else None)
         return result
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)) from e
     except Exception as e:
         from app.core.logging import logger
 
@@ -55,10 +51,10 @@ async def list_documents(current_user: Annotated[User, Depends(deps.get_current_
 
 
 @router.post("/sync")
-async def sync_kb(background_tasks: BackgroundTasks):
-    """同步知识库目录 (knowledge_base/)"""
+async def sync_kb():
+    """同步知识库目录 (knowledge_base/)，解析与索引排入任务队列"""
     try:
-        results = await document_service.sync_knowledge_base(background_tasks)
+        results = await document_service.sync_knowledge_base()
         return {"status": "success", "results": results}
     except Exception as e:
         # logger.exception(f"Sync failed: {e}") # Assuming logger is defined elsewhere
@@ -70,8 +66,9 @@ async def index_document(
     file_hash: str,
     current_user: Annotated[User, Depends(deps.get_current_user)] = None,
 ):
-    """手动触发索引"""
-    document_service.index_document_task(file_hash, user_id=current_user.id if current_user else None)
+    """手动触发索引 (失败的文件会从上次提交的批次续传，未解析的重新解析)"""
+    if not document_service.requeue(file_hash, user_id=current_user.id if current_user else None):
+        raise HTTPException(status_code=404, detail="File not found")
     return {"status": "indexing_started", "file_hash": file_hash}
 
 
@@ -90,10 +87,9 @@ async def delete_document(
 async def get_document_file(file_hash: str):
     """获取原始文件流"""
     # 1. 查缓存
-    if file_hash in UPLOAD_CACHE:
-        path = UPLOAD_CACHE[file_hash]["path"]
-        filename = UPLOAD_CACHE[file_hash]["filename"]
-        return FileResponse(path, filename=filename)
+    cached = UPLOAD_CACHE.get(file_hash)
+    if cached and "path" in cached:
+        return FileResponse(cached["path"], filename=cached["filename"])
 
     # 2. 查数据库 (我们需要确保数据库或文件系统里有持久化的文件)
     # 尝试在 upload_dir 中寻找以 hash 开头的文件
@@ -109,12 +105,12 @@ async def get_document_file(file_hash: str):
 async def get_document_content(file_hash: str):
     """获取已解析的文件内容用于预览"""
     # 优先查缓存
-    if file_hash in UPLOAD_CACHE:
-        return {"content": UPLOAD_CACHE[file_hash]["content"]}
-
-    # 缓存没有，查数据库
-    with Session(engine) as session:
-        file_record = session.get(FileParsingCache, file_hash)
-        if not file_record:
-            raise HTTPException(status_code=404, detail="File not found")
-        return {"content": file_record.content}
+    cached = UPLOAD_CACHE.get(file_hash)
+    if cached:
+        return {"content": cached["content"]}
+
+    # 缓存没有，查数据库 (预渲染的标记文本)
+    contents = document_service.get_rendered_contents([file_hash])
+    if file_hash not in contents:
+        raise HTTPException(status_code=404, detail="File not found")
+    return {"content": contents[file_hash]}
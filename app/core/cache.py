@@ -1,12 +1,137 @@
 import functools
-from collections.abc import Callable
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from pathlib import PurePath
 from typing import Any
 
+from app.core.config import settings
 from app.core.logging import logger
 
-# 全局工具缓存：{tool_name: {query_hash: result}}
+_MISSING = object()
+
+
+def estimate_size(obj: Any) -> int:
+    """粗略估算对象占用的内存字节数 (递归处理常见容器)"""
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, PurePath):
+        return sys.getsizeof(str(obj))
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_size(item) for item in obj)
+    if hasattr(obj, "__dict__"):
+        # 如 langchain Document 等 Pydantic 对象
+        return sys.getsizeof(obj) + estimate_size(vars(obj))
+    return sys.getsizeof(obj)
+
+
+class LRUCache:
+    """
+    线程安全的有界 LRU 缓存。
+    - max_bytes: 按 sizeof 估算的总字节预算，超出时淘汰最久未使用的条目
+    - ttl: 可选的过期时间 (秒)，None 表示不过期
+    - stats: 命中 / 未命中 / 淘汰 / 过期计数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int,
+        ttl: float | None = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._data: OrderedDict[Hashable, tuple[Any, int, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, _, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            # 旧值已过时，不能因新值过大而继续返回它
+            with self._lock:
+                if key in self._data:
+                    self._remove(key)
+            logger.debug(f"[Cache:{self.name}] 条目 {key} 大小 {size}B 超出总预算，跳过缓存")
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            value = self._data[key][0]
+            self._remove(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "items": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# 全局工具缓存：key 为 (tool_name, query)
 # 这种结构允许不同工具对同一 query 有不同的缓存
-GLOBAL_TOOL_CACHE: dict[str, dict[str, Any]] = {}
+GLOBAL_TOOL_CACHE = LRUCache("tool", max_bytes=settings.TOOL_CACHE_MAX_BYTES, ttl=settings.TOOL_CACHE_TTL_SECONDS)
 
 
 def tool_cache(func: Callable) -> Callable:
@@ -33,14 +158,11 @@ def tool_cache(func: Callable) -> Callable:
             # 如果没参数，不缓存，直接运行
             return await func(*args, **kwargs)
 
-        # 初始化该工具的缓存桶
-        if tool_name not in GLOBAL_TOOL_CACHE:
-            GLOBAL_TOOL_CACHE[tool_name] = {}
-
         # 检查命中
-        if query in GLOBAL_TOOL_CACHE[tool_name]:
+        cached = GLOBAL_TOOL_CACHE.get((tool_name, query), _MISSING)
+        if cached is not _MISSING:
             logger.info(f"[Cache HIT] Tool: {tool_name} | Query: {query[:20]}...")
-            return GLOBAL_TOOL_CACHE[tool_name][query]
+            return cached
 
         # 未命中，执行并写入
         logger.info(f"[Cache MISS] Tool: {tool_name} | Query: {query[:20]}...")
@@ -48,7 +170,7 @@ def tool_cache(func: Callable) -> Callable:
 
         # 只有成功的结果才缓存 (防止报错也被缓存)
         if result and "error" not in str(result).lower():
-            GLOBAL_TOOL_CACHE[tool_name][query] = result
+            GLOBAL_TOOL_CACHE.set((tool_name, query), result)
 
         return result
 
@@ -50,9 +50,72 @@ class Settings(BaseSettings):
     # Storage
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent
     VECTOR_DB_PERSIST_DIR: Path = BASE_DIR / "data" / "qdrant_db"
+    QDRANT_URL: str | None = None  # 设置后连接 Qdrant Server，否则使用本地嵌入式模式 (VECTOR_DB_PERSIST_DIR)
+    QDRANT_API_KEY: str | None = None
+    # Collection Layout (新建 / 重建集合时生效，见 scripts/migrate_vector_layout.py)
+    VECTOR_ON_DISK: bool = True  # 原始向量存磁盘 (mmap)
+    VECTOR_QUANTIZATION: str | None = "int8"  # "int8" 或 None (不量化)
+    QUANTIZATION_QUANTILE: float = 0.99
+    QUANTIZATION_RESCORE: bool = True  # 用原始向量对量化候选重新打分
+    QUANTIZATION_OVERSAMPLING: float = 2.0
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCT: int = 100
+    HNSW_EF_SEARCH: int | None = 128
+    VECTOR_SEARCH_CONCURRENCY: int = 8  # 同时进行的异步检索数
+    QDRANT_EXECUTOR_WORKERS: int = 4  # 本地 Qdrant 引擎专用线程数
+    EMBED_QUERY_WORKERS: int = 4  # 检索 query Embedding 专用线程数 (文档 Embedding 使用 INDEX_CONCURRENCY 个线程)
+    VECTOR_PAYLOAD_INDEX_FIELDS: list[str] = ["user_id", "file_hash"]  # 需要建立 keyword 索引的 metadata 过滤字段
+    # 按集合选择检索引擎："qdrant" (默认) 或 "numpy" (启动时载入内存做精确检索，适合几千条的小集合)
+    VECTOR_SEARCH_BACKENDS: dict[str, str] = {}
+    COLLECTION_VERSIONS_KEEP: int = 2  # 别名背后保留的集合版本数 (当前版本 + 用于回滚的旧版本)
+    COLLECTION_ALIAS_CHECK_SECONDS: float = 5  # 检查别名是否被其他进程 (迁移 / 重建 / 回滚脚本) 切换的间隔
     UPLOAD_DIR: Path = BASE_DIR / "data" / "uploads"
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024  # 单个上传文件的大小上限
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024  # 上传流式读写的块大小
+    PDF_PARSE_WORKERS: int = 4  # PDF 按页段并行解析的进程数 (1 表示在线程中串行解析)
+    PDF_PARSE_TIMEOUT_SECONDS: float = 300  # 单个 PDF 的解析超时
+    EXCEL_BLOCK_MAX_CHARS: int = 900  # Excel 连续行合并成块的字符预算 (含表头行，小于切分的 chunk_size)
     KNOWLEDGE_BASE_DIR: Path = BASE_DIR / "knowledge_base"
+    CATALOG_FILE_NAME: str = "绿色金融支持项目目录（2025年版）.json"  # 结构化目录索引的数据源
     SQLITE_DB_PATH: str = "sqlite:///data/greencredit.db"
+    CHECKPOINT_DB_PATH: Path = BASE_DIR / "data" / "checkpoints.db"  # LangGraph 状态持久化
+    CHECKPOINT_MAX_PER_THREAD: int = 10  # 每个会话保留的 checkpoint 数量
+
+    # Indexing Pipeline
+    INDEX_BATCH_SIZE: int = 10  # 每批 Embedding 的片段数 (DashScope v3 单次上限为 10)
+    INDEX_CONCURRENCY: int = 4  # 同时进行的 Embedding 请求数
+    INDEX_MAX_RETRIES: int = 3  # 单批最大尝试次数
+
+    # Job Queue (解析 / 索引任务持久化在 SQLite 中，进程重启后继续执行)
+    JOB_WORKERS: int = 2  # 同时执行的任务数
+    JOB_MAX_ATTEMPTS: int = 3  # 单个任务最大尝试次数 (含首次)
+    JOB_RETRY_BACKOFF_SECONDS: float = 5  # 失败重试的退避基数，按尝试次数指数增长
+    JOB_RETRY_BACKOFF_MAX_SECONDS: float = 300
+    JOB_LEASE_SECONDS: float = 60  # 执行中任务的租约，持有进程每 1/3 租约续期一次；过期即视为进程已退出，任务可被回收
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0  # 空闲时轮询间隔 (本进程入队会立即唤醒，轮询用于到期的重试与其他进程入队)
+    ATTACHMENT_PARSE_WAIT_SECONDS: float = 60  # 对话引用仍在解析中的附件时的最长等待
+
+    # Embedding
+    EMBEDDING_DIM: int = 1024  # 新建集合使用的维度；已有集合以其存储的维度为准，变更后需运行迁移脚本
+
+    # Embedding Cache (按 模型 + 文本哈希 持久化)
+    EMBEDDING_CACHE_PATH: Path = BASE_DIR / "data" / "embedding_cache.db"
+    EMBEDDING_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Hybrid Retrieval (BM25 倒排索引 + 向量检索，RRF 融合)
+    LEXICAL_INDEX_PATH: Path = BASE_DIR / "data" / "lexical_index.db"
+    HYBRID_CANDIDATES: int = 20  # 每一路参与融合的候选数
+    HYBRID_RRF_K: int = 60
+    LEXICAL_DECISIVE_RATIO: float = 2.0  # 首位完全覆盖查询且得分领先第二位该倍数时，跳过向量检索
+
+    # In-process Caches
+    UPLOAD_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # 已解析文件缓存的内存预算
+    UPLOAD_CACHE_TTL_SECONDS: int | None = 6 * 60 * 60
+    TOOL_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    TOOL_CACHE_TTL_SECONDS: int | None = 24 * 60 * 60
+    QUERY_EMBEDDING_CACHE_MAX_BYTES: int = 16 * 1024 * 1024  # 检索 query -> 向量
+    SEARCH_RESULT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # (query, k, filter) -> 命中结果
+    SEARCH_RESULT_CACHE_TTL_SECONDS: int | None = 60 * 60  # 兜底过期 (其他进程写入时本进程代数不会变化)
 
 
 settings = Settings()
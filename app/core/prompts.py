@@ -83,7 +83,7 @@ class Prompts:
 
 【强制准则】：
 1. 你必须首先使用 search_enterprise_info 工具（天眼查）核实企业的当前经营状态和统一社会信用代码。
-2. 即使文档中已有信息，你也必须通过 search_green_policy 工具检索最新的 2025 版绿色金融目录进行比对。
+2. 即使文档中已有信息，你也必须核对最新的 2025 版绿色金融目录：已知行业代码、领域编号或准确行业名称时使用 lookup_green_catalog 精确查询，否则使用 search_green_policy 语义检索。
 3. 只有在完成以上工具调用并获得事实后，才能开始撰写报告。
 
 【思考格式】：
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from app.core.logging import logger
+
+
+class RetentionSqliteSaver(AsyncSqliteSaver):
+    """
+    带保留策略的异步 SQLite Checkpointer。
+    每次写入新 checkpoint 后，只保留该线程 (thread_id + checkpoint_ns) 最近的 max_per_thread 个，
+    并清理被淘汰 checkpoint 的 pending writes，使数据库体积不随对话轮数无限增长。
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, max_per_thread: int = 10, **kwargs):
+        super().__init__(conn, **kwargs)
+        self.max_per_thread = max(1, max_per_thread)
+
+    @classmethod
+    async def open(cls, db_path: Path, max_per_thread: int = 10) -> "RetentionSqliteSaver":
+        """在当前事件循环中打开连接并完成建表"""
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = aiosqlite.connect(str(db_path))
+        saver = cls(conn, max_per_thread=max_per_thread)
+        await saver.setup()
+        logger.info(f"[Checkpoint] SQLite checkpointer ready at {db_path} (keep {saver.max_per_thread}/thread)")
+        return saver
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        await self.aprune(
+            next_config["configurable"]["thread_id"], next_config["configurable"].get("checkpoint_ns", "")
+        )
+        return next_config
+
+    async def aprune(self, thread_id: str, checkpoint_ns: str = ""):
+        """删除该线程中超出保留数量的旧 checkpoint (checkpoint_id 为时间有序的 uuid6)"""
+        params = (str(thread_id), checkpoint_ns)
+        async with self.lock, self.conn.cursor() as cur:
+            await cur.execute(
+                """
+                DELETE FROM checkpoints
+                WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                    SELECT checkpoint_id FROM checkpoints
+                    WHERE thread_id = ? AND checkpoint_ns = ?
+                    ORDER BY checkpoint_id DESC LIMIT ?
+                )
+                """,
+                (*params, *params, self.max_per_thread),
+            )
+            if cur.rowcount:
+                await cur.execute(
+                    """
+                    DELETE FROM writes
+                    WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                    )
+                    """,
+                    (*params, *params),
+                )
+            await self.conn.commit()
+
+    async def aclose(self):
+        await self.conn.close()
@@ -11,7 +11,11 @@ from app.agents.router import router_agent
 from app.core.logging import logger
 from app.core.prompts import Prompts
 from app.graph.state import GreenCreditState
+from app.rag.catalog_index import catalog_index
 from app.services.llm_factory import llm_factory
+from app.tools.rag_tool import format_catalog_entries
+
+EXTRACTOR_CONTEXT_CHARS = 30000  # 信息提取节点的文档上下文上限 (字符)
 
 
 # --- 1. Router Node ---
@@ -19,7 +23,8 @@ async def router_node(state: GreenCreditState, config: RunnableConfig) -> dict[s
     """判定意图"""
     from app.services.session_service import session_service
 
-    history = session_service.get_chat_history(state["session_id"], limit=3)
+    history_cache = config.get("configurable", {}).get("history_cache")
+    history = session_service.get_chat_history(state["session_id"], limit=3, cache=history_cache)
     intent = await router_agent.route(state["user_query"], chat_history=history)
     return {"current_intent": intent.value}
 
@@ -31,8 +36,10 @@ async def extractor_node(state: GreenCreditState, config: RunnableConfig) -> dic
         return {"analysis_history": ["当前无上传文件"]}
 
     llm = llm_factory.get_expert_model()
-    all_docs_content = "\n\n".join(state["uploaded_documents"])
-    prompt = Prompts.EXTRACTOR_SYSTEM.format(content=all_docs_content[:30000])
+    all_docs_content = build_document_context(
+        state["uploaded_documents"], state.get("active_documents") or [], limit=EXTRACTOR_CONTEXT_CHARS
+    )
+    prompt = Prompts.EXTRACTOR_SYSTEM.format(content=all_docs_content)
 
     try:
         # 恢复标准调用，不做特殊屏蔽，交由 WorkflowService 过滤
@@ -130,6 +137,11 @@ async def policy_enrichment_node(state: GreenCreditState, config: RunnableConfig
     请开始合规性分析。
     """
 
+    # 已提取行业时先做目录精确匹配 (字典查询)，命中结果直接提供给智能体
+    catalog_hits = catalog_index.lookup(industry) if state.get("industry_category") else []
+    if catalog_hits:
+        user_input += f"\n【目录精确匹配结果】\n{format_catalog_entries(catalog_hits, limit=5)}\n"
+
     # 动态获取 Agent
     res = await policy_agent.ainvoke({"messages": [{"role": "user", "content": user_input}]}, config=config)
 
@@ -151,7 +163,8 @@ async def chat_node(state: GreenCreditState, config: RunnableConfig) -> dict[str
 
     # 动态获取 Agent (统一模式)
 
-    history = session_service.get_chat_history(state["session_id"], limit=10)
+    history_cache = config.get("configurable", {}).get("history_cache")
+    history = session_service.get_chat_history(state["session_id"], limit=10, cache=history_cache)
     history_text = "\n".join([f"{msg.type}: {msg.content}" for msg in history])
 
     user_input = f"""
@@ -167,6 +180,23 @@ async def chat_node(state: GreenCreditState, config: RunnableConfig) -> dict[str
 
 
 # --- Helpers ---
+def build_document_context(documents: dict[str, str], priority: list[str], limit: int) -> str:
+    """
+    从去重后的文档登记表构建有界上下文。
+    本轮挂载的文档排在前面；总长度超出 limit 时按公平份额截断每个文档，避免单个大文件挤占其他文档。
+    """
+    ordered = [h for h in dict.fromkeys(priority) if h in documents]
+    ordered += [h for h in documents if h not in ordered]
+
+    # 按长度从短到长分配预算，短文档用不完的份额留给长文档
+    budget, allocation = limit, {}
+    for i, h in enumerate(sorted(ordered, key=lambda key: len(documents[key]))):
+        allocation[h] = min(len(documents[h]), budget // (len(ordered) - i))
+        budget -= allocation[h]
+
+    return "\n\n".join(documents[h][: allocation[h]] for h in ordered)
+
+
 def extract_json(text: str) -> dict:
     if not text or not text.strip():
         return {}
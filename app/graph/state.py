@@ -1,12 +1,27 @@
+import hashlib
 import operator
 from typing import Annotated, Any, TypedDict
 
 
+def merge_documents(left: dict[str, str] | list[str] | None, right: dict[str, str] | None) -> dict[str, str]:
+    """
+    文档登记表的 reducer：以文件哈希为键，同一文档只登记一次。
+    兼容旧 checkpoint 中的 list[str] 形式 (按内容哈希转换)。
+    """
+    if isinstance(left, list):
+        left = {hashlib.sha256(text.encode("utf-8")).hexdigest(): text for text in left}
+    merged = dict(left or {})
+    for file_hash, content in (right or {}).items():
+        merged.setdefault(file_hash, content)
+    return merged
+
+
 class GreenCreditState(TypedDict):
     # --- 基础输入 ---
     session_id: str  # 唯一会话ID
     user_query: str  # 用户当前输入
-    uploaded_documents: Annotated[list[str], operator.add]  # 累计提取后的文档内容
+    uploaded_documents: Annotated[dict[str, str], merge_documents]  # 文档登记表 {file_hash: 标记文本}
+    active_documents: list[str]  # 本轮挂载的文件哈希 (提取时优先)
     user_id: str | None  # 用户ID (多租户隔离)
 
     # --- 核心实体 ---
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
@@ -8,6 +9,11 @@ from app.api.v1 import api_router
 from app.core.config import settings
 from app.core.db import init_db
 from app.core.logging import logger
+from app.parsers import close_parsers
+from app.rag.vector_store import vector_store
+from app.services.document_service import document_service
+from app.services.job_queue import job_queue
+from app.services.workflow_service import workflow_service
 
 
 @asynccontextmanager
@@ -22,9 +28,27 @@ async def lifespan(app: FastAPI):
         logger.error(f"Database initialization failed (likely locked): {e}")
         # 不抛出异常，允许应用启动
 
+    if vector_store.backend == "numpy":
+        # 内存检索引擎在启动时载入向量，避免首个请求承担加载耗时
+        try:
+            await asyncio.to_thread(vector_store.initialize)
+        except Exception as e:
+            logger.error(f"Vector store warm-up failed: {e}")
+
+    try:
+        # 启动 worker (租约过期的 RUNNING 任务由其定期回收)，再补齐没有任务的 PARSING / INDEXING 文件
+        await job_queue.start()
+        await asyncio.to_thread(document_service.recover_stuck_files)
+    except Exception as e:
+        logger.error(f"Job queue startup failed: {e}")
+
     yield
     # 关闭时的逻辑
     logger.info("Shutting down...")
+    await job_queue.stop()
+    await workflow_service.aclose()
+    await vector_store.aclose()
+    await asyncio.to_thread(close_parsers)
 
 
 app = FastAPI(
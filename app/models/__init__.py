@@ -1,3 +1,4 @@
 from app.models.config import AgentTool as AgentTool, McpServer as McpServer
 from app.models.file import FileParsingCache as FileParsingCache
-from app.models.session import ChatSession as ChatSession
+from app.models.job import Job as Job
+from app.models.session import ChatMessage as ChatMessage, ChatSession as ChatSession
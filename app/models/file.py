@@ -18,6 +18,8 @@ class FileParsingCache(SQLModel, table=True):
     file_hash: str = Field(primary_key=True, max_length=64, description="SHA-256 hash of file content")
     filename: str = Field(index=True)
     content: str = Field(description="Parsed text content")
+    rendered_content: str | None = Field(default=None, description="LLM-ready text with [Page n] style markers")
+    page_count: int = Field(default=0)
     file_type: str = Field(max_length=10)
     file_size: int = Field(default=0)
     user_id: str | None = Field(default=None, index=True, description="Owner of the file")
@@ -26,5 +28,7 @@ class FileParsingCache(SQLModel, table=True):
     status: FileStatus = Field(default=FileStatus.PENDING, index=True)
     indexed: bool = Field(default=False, description="Deprecated: use status instead")
     error_message: str | None = Field(default=None)
+    chunk_count: int = Field(default=0, description="Total chunks produced for indexing")
+    indexed_chunks: int = Field(default=0, description="Committed chunk watermark, used to resume indexing")
 
     created_at: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,45 @@
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class JobKind(str, Enum):
+    PARSE = "PARSE"  # 解析文件，完成后排入索引任务
+    INDEX = "INDEX"  # 切分并向量化
+    SNAPSHOT = "SNAPSHOT"  # 载入预计算的向量快照
+
+
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"  # 等待执行 (含退避中的重试)
+    RUNNING = "RUNNING"  # 执行中
+    SUCCEEDED = "SUCCEEDED"  # 执行成功
+    FAILED = "FAILED"  # 尝试次数用尽
+
+
+class Job(SQLModel, table=True):
+    """后台任务 (解析 / 索引)，持久化后进程崩溃或重启不会丢失"""
+
+    __tablename__ = "jobs"  # type: ignore
+    # 领取任务：按状态过滤后按优先级、入队顺序取第一条
+    __table_args__ = (Index("ix_jobs_claim", "status", "priority", "id"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    kind: JobKind
+    file_hash: str = Field(index=True)
+    payload: str = Field(default="{}", description="JSON serialized handler arguments")
+    priority: int = Field(default=0, description="Higher runs first")
+    status: JobStatus = Field(default=JobStatus.QUEUED)
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    available_at: datetime = Field(
+        default_factory=datetime.now, description="Not claimed before this time (retry backoff)"
+    )
+    last_error: str | None = Field(default=None)
+    claimed_by: str | None = Field(default=None, description="Worker process that holds the lease")
+    lease_until: datetime | None = Field(
+        default=None, description="RUNNING jobs whose lease has expired are recovered by any process"
+    )
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
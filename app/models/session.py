@@ -1,6 +1,7 @@
 from datetime import datetime
 from uuid import uuid4
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -9,7 +10,23 @@ class ChatSession(SQLModel, table=True):
 
     id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
     title: str | None = Field(default=None)
-    history: str = Field(default="[]", description="JSON serialized chat history")
+    history: str = Field(default="[]", description="Deprecated: use chat_messages table instead")
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     user_id: str | None = Field(default=None, index=True, description="Owner of the session")
+
+
+class ChatMessage(SQLModel, table=True):
+    """会话消息 (一行一条，追加写入)"""
+
+    __tablename__ = "chat_messages"  # type: ignore
+    __table_args__ = (Index("ix_chat_messages_session_seq", "session_id", "seq", unique=True),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    session_id: str = Field(description="Owning chat session id")
+    seq: int = Field(description="Message order within the session, starting from 0")
+    role: str = Field(max_length=20)
+    content: str
+    attachments: str | None = Field(default=None, description="JSON serialized attachment list")
+    thought_process: str | None = Field(default=None, description="JSON serialized thought logs")
+    created_at: datetime = Field(default_factory=datetime.now)
@@ -43,3 +43,8 @@ async def parse_file(file_path: Path) -> list[Document]:
     except Exception as e:
         logger.error(f"Failed to parse {file_path}: {e}")
         raise e
+
+
+def close_parsers():
+    """释放解析器持有的进程池 (应用退出时调用)"""
+    PARSER_REGISTRY[".pdf"].close()
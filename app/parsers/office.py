@@ -1,4 +1,6 @@
 import asyncio
+import contextlib
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 from docx import Document as DocxDocument
@@ -7,50 +9,90 @@ from langchain_core.callbacks import adispatch_custom_event
 from langchain_core.documents import Document
 from openpyxl import load_workbook
 
+from app.core.config import settings
 from app.parsers.base import FileParser
 
 
+async def _report_progress(text: str):
+    """向所在的 LangGraph 运行推送进度；在运行之外 (如上传接口) 调用时没有接收方，直接忽略"""
+    with contextlib.suppress(RuntimeError):
+        await adispatch_custom_event("status_update", {"text": text})
+
+
+def _cell_text(value) -> str:
+    return str(value) if value is not None else ""
+
+
+def iter_row_blocks(rows: Iterable[tuple], max_chars: int, first_row: int = 2) -> Iterator[tuple[int, int, list[str]]]:
+    """
+    将行流按字符预算分组，产出 (起始行号, 结束行号, 行文本列表)。
+    行文本为单元格值以 " | " 连接；空行跳过；单行超出预算时独占一块 (后续切分策略会再拆分)。
+    """
+    block: list[str] = []
+    size, start, end = 0, first_row, first_row
+    for row_idx, row in enumerate(rows, start=first_row):
+        values = [_cell_text(value) for value in row]
+        if not any(values):  # 跳过空行
+            continue
+        line = " | ".join(values).rstrip(" |")
+        if block and size + len(line) + 1 > max_chars:
+            yield start, end, block
+            block, size = [], 0
+        if not block:
+            start = row_idx
+        block.append(line)
+        size += len(line) + 1
+        end = row_idx
+    if block:
+        yield start, end, block
+
+
 class ExcelParser(FileParser):
+    def __init__(self, block_max_chars: int | None = None):
+        self.block_max_chars = block_max_chars or settings.EXCEL_BLOCK_MAX_CHARS
+
     async def parse(self, file_path: Path) -> list[Document]:
         """
-        将 Excel 每一行转换为带上下文的 Document 对象。
+        流式解析 Excel：只读模式逐行读取 (不载入整个工作簿)，
+        按字符预算将连续行合并为以表头开头的块，metadata 记录行号范围以便引用溯源。
         """
-        # 加载工作簿是阻塞操作
-        wb = await asyncio.to_thread(load_workbook, str(file_path), data_only=True)
+        # 加载工作簿与逐行读取都是阻塞操作
+        wb = await asyncio.to_thread(load_workbook, str(file_path), read_only=True, data_only=True)
         documents = []
-
-        for sheet_name in wb.sheetnames:
-            sheet = wb[sheet_name]
-            # 获取表头
-            headers = [str(cell.value) if cell.value is not None else "" for cell in sheet[1]]
-
-            rows = list(sheet.iter_rows(min_row=2))
-            total_rows = len(rows)
-
-            for row_idx, row in enumerate(rows, start=2):
-                if row_idx % 100 == 0:
-                    await adispatch_custom_event(
-                        "status_update", {"text": f"正在解析 Excel ({sheet_name}): {row_idx}/{total_rows} 行..."}
-                    )
-
-                # 行处理也可能耗时，在大规模数据下可考虑分批 thread 执行，这里保持简单
-                row_values = [str(cell.value) if cell.value is not None else "" for cell in row]
-                if not any(row_values):  # 跳过空行
+        try:
+            for sheet_name in wb.sheetnames:
+                sheet = wb[sheet_name]
+                rows = sheet.iter_rows(values_only=True)
+                header_row = await asyncio.to_thread(next, rows, None)
+                if header_row is None:
                     continue
-
-                # 构建文本：Header1: Val1, Header2: Val2 ...
-                content_parts = []
-                for header, val in zip(headers, row_values):
-                    if val:
-                        content_parts.append(f"{header}: {val}")
-
-                content = " | ".join(content_parts)
-                documents.append(
-                    Document(
-                        page_content=content,
-                        metadata={"source": str(file_path), "sheet": sheet_name, "row": row_idx, "type": "excel"},
+                header = " | ".join(_cell_text(value) for value in header_row).rstrip(" |")
+                # 表头之后的行按预算分组；为表头行预留空间，保证整块不超过预算
+                budget = max(1, self.block_max_chars - len(header) - 1)
+                blocks = iter_row_blocks(rows, budget)
+                total_rows = sheet.max_row or "?"
+
+                reported = 0
+                while block := await asyncio.to_thread(next, blocks, None):
+                    row_start, row_end, lines = block
+                    documents.append(
+                        Document(
+                            page_content="\n".join([header, *lines]),
+                            metadata={
+                                "source": str(file_path),
+                                "sheet": sheet_name,
+                                "row": row_start,
+                                "row_end": row_end,
+                                "type": "excel",
+                            },
+                        )
                     )
-                )
+                    if row_end - reported >= 1000:
+                        reported = row_end
+                        await _report_progress(f"正在解析 Excel ({sheet_name}): {row_end}/{total_rows} 行...")
+        finally:
+            # 只读模式持有文件句柄，需要显式关闭
+            wb.close()
         return documents
 
 
@@ -0,0 +1,240 @@
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.core.logging import logger
+
+# 领域列如 "1. 1.2 节能窑炉制造"，PDF 转换带来的空格需先去除
+_DOMAIN_RE = re.compile(r"^(\d+(?:\.\d+)*)\.?(.*)$")
+# 行业代码须为独立的 4 位数字，"5G"、"2号机组" 中的零散数字不能当作代码前缀
+_INDUSTRY_CODE_RE = re.compile(r"(?<!\d)\d{4}(?!\d)")
+_DOMAIN_CODE_RE = re.compile(r"\d+(?:\.\d+)+")
+
+
+def _squash(text: str | None) -> str:
+    return re.sub(r"\s+", "", text or "")
+
+
+def _join_lines(*parts: str) -> str:
+    return "\n".join(p.strip() for p in parts if p and p.strip())
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.entries: list[int] = []
+
+
+class CatalogIndex:
+    """
+    《绿色金融支持项目目录（2025年版）》结构化索引。
+    - 国民经济行业代码前缀树: "34" 可列出 34xx 下全部条目
+    - 领域层级树: 1 -> 1.1 -> 1.1.1，叶子挂载具体条目
+    - 名称精确映射: 行业类别名称 / 领域名称 (去空白后) -> 条目或领域
+    由 sync_knowledge_base 在同步时构建，未同步时首次查询从知识库目录懒加载。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.entries: list[dict[str, Any]] = []
+        self.domains: dict[str, dict[str, Any]] = {}
+        self._code_trie = _TrieNode()
+        self._industry_names: dict[str, list[int]] = {}
+        self._domain_names: dict[str, str] = {}
+
+    # --- 构建 ---
+    def build(self, records: list[dict]):
+        """从目录 JSON 的行记录构建索引 (整体替换，读取方不会看到半成品)"""
+        entries: list[dict[str, Any]] = []
+        domains: dict[str, dict[str, Any]] = {}
+        current: str | None = None
+
+        for row in records:
+            raw_domain = _squash(row.get("领域"))
+            code = _squash(row.get("国民经济行业代码")).strip("-")
+            name = _squash(row.get("国民经济行业类别名称"))
+            criteria = (row.get("条件/标准") or "").strip()
+            remarks = (row.get("备注") or "").strip()
+
+            match = _DOMAIN_RE.match(raw_domain)
+            if match:
+                domain_code, domain_name = match.group(1), match.group(2)
+                if domain_code not in domains:
+                    parent = domain_code.rsplit(".", 1)[0] if "." in domain_code else None
+                    domains[domain_code] = {
+                        "code": domain_code,
+                        "name": domain_name,
+                        "parent": parent,
+                        "children": [],
+                        "entries": [],
+                    }
+                    if parent in domains:
+                        domains[parent]["children"].append(domain_code)
+                current = domain_code
+            elif current is None or raw_domain.startswith("注"):
+                # 目录尾部的注释说明
+                continue
+            elif raw_domain and raw_domain != domains[current].get("_tail"):
+                # PDF 换行导致领域名称被拆到下一行
+                domains[current]["name"] += raw_domain
+                domains[current]["_tail"] = raw_domain
+
+            if current is None:
+                continue
+
+            has_row_code = bool(_squash(row.get("国民经济行业代码")))
+            last = entries[-1] if entries and entries[-1]["domain_code"] == current else None
+            if not has_row_code and last is not None and (name or criteria or remarks):
+                # 续行：行业名称 / 条件被拆到下一行
+                last["industry_name"] += name
+                last["criteria"] = _join_lines(last["criteria"], criteria)
+                last["remarks"] = _join_lines(last["remarks"], remarks)
+                continue
+            if not (has_row_code or name or criteria):
+                continue
+
+            entries.append(
+                {
+                    "domain_code": current,
+                    "industry_code": code if code.isdigit() else "",
+                    "industry_name": name,
+                    "criteria": criteria,
+                    "remarks": remarks,
+                    "carbon_contribution": _squash(row.get("温室气体减排贡献")),
+                }
+            )
+
+        code_trie = _TrieNode()
+        industry_names: dict[str, list[int]] = {}
+        for idx, entry in enumerate(entries):
+            domains[entry["domain_code"]]["entries"].append(idx)
+            if entry["industry_code"]:
+                node = code_trie
+                for digit in entry["industry_code"]:
+                    node = node.children.setdefault(digit, _TrieNode())
+                node.entries.append(idx)
+            if entry["industry_name"]:
+                industry_names.setdefault(entry["industry_name"], []).append(idx)
+
+        for domain in domains.values():
+            domain.pop("_tail", None)
+        domain_names = {domain["name"]: code for code, domain in domains.items()}
+
+        with self._lock:
+            self.entries = entries
+            self.domains = domains
+            self._code_trie = code_trie
+            self._industry_names = industry_names
+            self._domain_names = domain_names
+            self._loaded = True
+        logger.info(f"[Catalog] 目录索引构建完成: {len(domains)} 个领域, {len(entries)} 个条目")
+
+    def build_from_file(self, path: Path):
+        with path.open(encoding="utf-8") as f:
+            self.build(json.load(f))
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        path = settings.KNOWLEDGE_BASE_DIR / settings.CATALOG_FILE_NAME
+        if path.exists():
+            self.build_from_file(path)
+        else:
+            logger.warning(f"[Catalog] 未找到目录文件: {path}")
+            self._loaded = True
+
+    # --- 查询 ---
+    def _entry(self, idx: int) -> dict[str, Any]:
+        entry = self.entries[idx]
+        return {**entry, "domain_path": self.domain_path(entry["domain_code"])}
+
+    def domain_path(self, domain_code: str) -> list[str]:
+        """领域的完整层级路径，如 ["1 节能降碳产业", "1.1 高效节能装备制造", "1.1.1 节能锅炉制造"]"""
+        path = []
+        code: str | None = domain_code
+        while code and code in self.domains:
+            path.append(f"{code} {self.domains[code]['name']}")
+            code = self.domains[code]["parent"]
+        return path[::-1]
+
+    def lookup_industry_code(self, code: str) -> list[dict[str, Any]]:
+        """按国民经济行业代码前缀查询 ("4416" 精确到小类，"44" 列出整个大类)"""
+        self._ensure_loaded()
+        node = self._code_trie
+        for digit in code:
+            node = node.children.get(digit)
+            if node is None:
+                return []
+
+        found, stack = [], [node]
+        while stack:
+            current = stack.pop()
+            found.extend(current.entries)
+            stack.extend(current.children.values())
+        return [self._entry(idx) for idx in sorted(found)]
+
+    def lookup_domain(self, domain_code: str) -> dict[str, Any] | None:
+        """按领域编号查询，返回层级路径、下级领域与本级及下级的全部条目"""
+        self._ensure_loaded()
+        domain = self.domains.get(_squash(domain_code).rstrip("."))
+        if domain is None:
+            return None
+
+        found, stack = [], [domain["code"]]
+        while stack:
+            code = stack.pop()
+            found.extend(self.domains[code]["entries"])
+            stack.extend(self.domains[code]["children"])
+        return {
+            "code": domain["code"],
+            "name": domain["name"],
+            "path": self.domain_path(domain["code"]),
+            "children": [f"{c} {self.domains[c]['name']}" for c in domain["children"]],
+            "entries": [self._entry(idx) for idx in sorted(found)],
+        }
+
+    def lookup_name(self, name: str) -> list[dict[str, Any]]:
+        """按行业类别名称或领域名称精确匹配 (忽略空白)"""
+        self._ensure_loaded()
+        key = _squash(name)
+        if key in self._industry_names:
+            return [self._entry(idx) for idx in self._industry_names[key]]
+        if key in self._domain_names:
+            return self.lookup_domain(self._domain_names[key])["entries"]
+        return []
+
+    def lookup(self, query: str) -> list[dict[str, Any]]:
+        """
+        综合查询：依次尝试 领域编号 (1.1.1) -> 行业代码 (3411) -> 名称精确匹配。
+        查询如 "3411 锅炉及辅助设备制造" 时优先使用其中的代码；只有整个查询都是数字时才按代码前缀 ("34") 查询。
+        """
+        self._ensure_loaded()
+        key = _squash(query)
+        if not key:
+            return []
+
+        domain_code = _DOMAIN_CODE_RE.search(key)
+        if domain_code and domain_code.group() in self.domains:
+            return self.lookup_domain(domain_code.group())["entries"]
+
+        if key.isdigit():
+            industry_code = key if len(key) <= 4 else None
+        else:
+            match = _INDUSTRY_CODE_RE.search(key)
+            industry_code = match.group() if match else None
+        if industry_code:
+            results = self.lookup_industry_code(industry_code)
+            if results:
+                return results
+
+        return self.lookup_name(key) or self.lookup_name(re.sub(r"[\d.]+", "", key))
+
+
+# 单例导出
+catalog_index = CatalogIndex()
@@ -0,0 +1,164 @@
+import re
+from collections.abc import Callable
+from datetime import datetime
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from app.core.config import settings
+from app.core.logging import logger
+
+PointTransform = Callable[[list[rest.Record]], list[rest.PointStruct]]
+
+
+def layout_kwargs(dim: int) -> dict:
+    """
+    按配置生成 create_collection 的存储布局参数：
+    - VECTOR_ON_DISK: 原始 float32 向量放在磁盘 (mmap)，内存中只保留量化向量与 HNSW 图
+    - VECTOR_QUANTIZATION="int8": 标量量化，检索时用原始向量重排 (rescore)
+    - HNSW_M / HNSW_EF_CONSTRUCT: 图的连接数与构建精度
+    本地嵌入式模式为精确检索，会忽略 HNSW 与量化参数。
+    """
+    kwargs = {
+        "vectors_config": rest.VectorParams(size=dim, distance=rest.Distance.COSINE, on_disk=settings.VECTOR_ON_DISK),
+        "hnsw_config": rest.HnswConfigDiff(m=settings.HNSW_M, ef_construct=settings.HNSW_EF_CONSTRUCT),
+    }
+    if settings.VECTOR_QUANTIZATION == "int8":
+        kwargs["quantization_config"] = rest.ScalarQuantization(
+            scalar=rest.ScalarQuantizationConfig(
+                type=rest.ScalarType.INT8,
+                quantile=settings.QUANTIZATION_QUANTILE,
+                always_ram=True,
+            )
+        )
+    return kwargs
+
+
+def embedding_metadata(dim: int) -> dict:
+    """随集合保存的 Embedding 信息"""
+    return {"embedding_model": settings.EMBEDDING_MODEL_NAME, "embedding_dim": dim}
+
+
+def search_params() -> rest.SearchParams:
+    """检索参数：HNSW ef 与量化重排 (oversampling 后用原始向量重新打分)"""
+    quantization = None
+    if settings.VECTOR_QUANTIZATION == "int8":
+        quantization = rest.QuantizationSearchParams(
+            rescore=settings.QUANTIZATION_RESCORE, oversampling=settings.QUANTIZATION_OVERSAMPLING
+        )
+    return rest.SearchParams(hnsw_ef=settings.HNSW_EF_SEARCH, quantization=quantization)
+
+
+def resolve_alias(client: QdrantClient, name: str) -> str | None:
+    """返回别名指向的物理集合名，name 不是别名时返回 None"""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return None
+
+
+def list_versions(client: QdrantClient, name: str) -> list[str]:
+    """name 的全部版本 (物理集合 name_<时间戳>)，按创建时间升序"""
+    pattern = re.compile(rf"^{re.escape(name)}_\d{{20}}$")
+    return sorted(c.name for c in client.get_collections().collections if pattern.match(c.name))
+
+
+def create_version(client: QdrantClient, name: str, dim: int) -> str:
+    """按当前布局配置创建 name 的新版本 (空集合)，沿用线上版本的 payload 索引，返回物理集合名"""
+    target = f"{name}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+    client.create_collection(collection_name=target, metadata=embedding_metadata(dim), **layout_kwargs(dim))
+    if client.collection_exists(name):
+        for field, schema in (client.get_collection(name).payload_schema or {}).items():
+            client.create_payload_index(
+                collection_name=target, field_name=field, field_schema=schema.data_type, wait=True
+            )
+    logger.info(f"[Collection] Created version '{target}' (dim={dim})")
+    return target
+
+
+def promote_version(client: QdrantClient, name: str, target: str, keep: int | None = None) -> str | None:
+    """
+    原子地将别名 name 切换到 target，并只保留最近 keep 个版本 (默认 COLLECTION_VERSIONS_KEEP)。
+    返回切换前的物理集合名 (首次创建时为 None)。
+    """
+    current = resolve_alias(client, name)
+    if current is None and client.collection_exists(name):
+        # 旧部署中 name 是物理集合：别名无法与其同名，只能删除后由别名接管 (无法保留回滚版本)
+        logger.warning(f"[Collection] '{name}' is a plain collection; replacing it with an alias to '{target}'")
+        client.delete_collection(name)
+    operations = [rest.CreateAliasOperation(create_alias=rest.CreateAlias(collection_name=target, alias_name=name))]
+    if current is not None:
+        operations.insert(0, rest.DeleteAliasOperation(delete_alias=rest.DeleteAlias(alias_name=name)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(f"[Collection] Alias '{name}': {current} -> {target}")
+
+    keep = max(1, settings.COLLECTION_VERSIONS_KEEP if keep is None else keep)
+    # 优先保留新的线上版本与刚被替换的版本 (回滚目标)，其余按时间戳从旧到新淘汰
+    retained = [target] + ([current] if current and keep > 1 else [])
+    others = [version for version in list_versions(client, name) if version not in retained]
+    stale = others[: max(0, len(others) - (keep - len(retained)))]
+    for version in stale:
+        logger.info(f"[Collection] Dropping old version '{version}'")
+        client.delete_collection(version)
+    return current
+
+
+def rollback_version(client: QdrantClient, name: str) -> str:
+    """将别名切回上一版本 (不删除当前版本，可再次切回)，返回回滚到的物理集合名"""
+    current = resolve_alias(client, name)
+    older = [version for version in list_versions(client, name) if current is None or version < current]
+    if not older:
+        raise ValueError(f"No previous version of '{name}' to roll back to")
+    promote_version(client, name, older[-1], keep=len(list_versions(client, name)))
+    return older[-1]
+
+
+def copy_points(
+    client: QdrantClient,
+    source: str,
+    target: str,
+    batch_size: int = 256,
+    transform: PointTransform | None = None,
+    scroll_filter: rest.Filter | None = None,
+) -> int:
+    """逐批 scroll 源集合 (含向量，可按 scroll_filter 过滤) 写入目标集合，返回复制的点数"""
+    copied, offset = 0, None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            scroll_filter=scroll_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            points = (
+                transform(records)
+                if transform
+                else [rest.PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records]
+            )
+            client.upsert(collection_name=target, points=points, wait=True)
+            copied += len(records)
+            logger.debug(f"[Collection] {source} -> {target}: {copied}")
+        if offset is None:
+            return copied
+
+
+def rebuild_collection(
+    client: QdrantClient, name: str, dim: int | None = None, transform: PointTransform | None = None
+) -> str:
+    """
+    将集合 (或别名指向的集合) 按当前布局配置复制为新版本，并将别名 name 切换到新版本 (旧版本保留用于回滚)。
+    dim 为 None 时沿用原集合维度；transform 可在复制时改写点 (如重新计算向量)。
+    返回新的物理集合名。
+    """
+    current = resolve_alias(client, name) or name
+    dim = dim or client.get_collection(current).config.params.vectors.size
+
+    target = create_version(client, name, dim)
+    logger.info(f"[Collection] Rebuilding '{current}' into '{target}'...")
+    copied = copy_points(client, current, target, transform=transform)
+    logger.info(f"[Collection] Copied {copied} points")
+    promote_version(client, name, target)
+    return target
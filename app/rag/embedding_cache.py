@@ -0,0 +1,144 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from app.core.logging import logger
+
+
+class EmbeddingCache:
+    """
+    基于 SQLite 的内容寻址 Embedding 缓存。
+    - 键: (namespace, sha256(text))，namespace 由模型名与文本类型组成
+    - 值: float32 向量的原始字节
+    - 总大小超出 max_bytes 时按最近使用时间淘汰；命中时只刷新超过 touch_interval 未刷新的行，
+      淘汰精度降为 touch_interval，换来读取基本不产生写事务
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int, touch_interval: float = 3600):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    namespace TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (namespace, text_hash)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+            self._bytes = conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, namespace: str, texts: list[str]) -> list[list[float] | None]:
+        """批量查询，未命中的位置返回 None"""
+        hashes = [self.text_hash(t) for t in texts]
+        found: dict[str, list[float]] = {}
+        stale: list[str] = []
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            unique = list(dict.fromkeys(hashes))
+            # SQLite 单条语句变量数有限，分段查询
+            for i in range(0, len(unique), 500):
+                part = unique[i : i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector, last_used FROM embeddings "
+                    f"WHERE namespace = ? AND text_hash IN ({placeholders})",
+                    (namespace, *part),
+                ).fetchall()
+                for text_hash, blob, last_used in rows:
+                    found[text_hash] = array("f", blob).tolist()
+                    if now - last_used >= self.touch_interval:
+                        stale.append(text_hash)
+
+            if stale:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE namespace = ? AND text_hash = ?",
+                    [(now, namespace, h) for h in stale],
+                )
+                conn.commit()
+
+            results = [found.get(h) for h in hashes]
+            hit_count = sum(1 for r in results if r is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def put_many(self, namespace: str, texts: list[str], vectors: list[list[float]]):
+        """批量写入，并在超出容量时淘汰最久未使用的向量"""
+        now = time.time()
+        rows = [
+            (namespace, self.text_hash(text), array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors, strict=True)
+        ]
+        with self._lock:
+            conn = self._connect()
+            for row in rows:
+                old = conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE namespace = ? AND text_hash = ?", row[:2]
+                ).fetchone()
+                conn.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", row)
+                self._bytes += len(row[2]) - (old[0] if old else 0)
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        if self._bytes <= self.max_bytes:
+            return
+        # 淘汰到预算的 90%，避免每次写入都触发
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            victims = conn.execute(
+                "SELECT namespace, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not victims:
+                break
+            for namespace, text_hash, size in victims:
+                if self._bytes <= target:
+                    break
+                conn.execute("DELETE FROM embeddings WHERE namespace = ? AND text_hash = ?", (namespace, text_hash))
+                self._bytes -= size
+                self.evictions += 1
+        logger.info(f"[EmbedCache] 容量淘汰完成，当前 {self._bytes / 1024 / 1024:.1f}MB, 累计淘汰 {self.evictions} 条")
+
+    @property
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,92 @@
+import asyncio
+import inspect
+from collections.abc import Awaitable, Callable
+
+from langchain_core.documents import Document
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
+
+from app.core.config import settings
+from app.core.logging import logger
+
+ProgressCallback = Callable[[int, int], Awaitable[None] | None]
+
+
+class IndexingPipeline:
+    """
+    分批、有限并发的向量化入库管线。
+    - 每批独立重试 (指数退避)
+    - Embedding 与 Qdrant 写入在向量库的专用线程池中执行，不阻塞事件循环，也不占用检索线程
+    - 以"连续完成的批次前缀"作为已提交水位，失败后可从水位处续传
+    """
+
+    def __init__(self, batch_size: int = 10, concurrency: int = 4, max_retries: int = 3):
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(1, max_retries)
+
+    async def run(
+        self,
+        store,
+        documents: list[Document],
+        ids: list[str],
+        user_id: str | None = None,
+        start: int = 0,
+        on_progress: ProgressCallback | None = None,
+    ) -> int:
+        """
+        从第 start 个片段开始入库，返回最终提交水位 (已入库片段数)。
+        ids 应为确定性 ID，保证重复写入同一批次是幂等的。
+        """
+        total = len(documents)
+        batches = [(i, min(i + self.batch_size, total)) for i in range(start, total, self.batch_size)]
+        if not batches:
+            return total
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        write_lock = asyncio.Lock()  # 本地 Qdrant 写入串行化
+        done: set[int] = set()
+        watermark = start
+
+        async def _index_batch(begin: int, end: int):
+            nonlocal watermark
+            async with semaphore:
+                async for attempt in AsyncRetrying(
+                    stop=stop_after_attempt(self.max_retries),
+                    wait=wait_exponential(multiplier=1, max=10),
+                    reraise=True,
+                ):
+                    with attempt:
+                        batch = documents[begin:end]
+                        vectors = await store.aembed_documents([doc.page_content for doc in batch])
+                        async with write_lock:
+                            await store.aadd_embeddings(batch, vectors, ids[begin:end], user_id)
+
+            # 推进连续提交水位
+            done.add(begin)
+            advanced = False
+            while watermark in done:
+                watermark = min(watermark + self.batch_size, total)
+                advanced = True
+            if advanced:
+                logger.debug(f"[Index] 进度 {watermark}/{total}")
+                if on_progress:
+                    result = on_progress(watermark, total)
+                    if inspect.isawaitable(result):
+                        await result
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for begin, end in batches:
+                    tg.create_task(_index_batch(begin, end))
+        except ExceptionGroup as eg:
+            logger.error(f"[Index] 入库中断，已提交 {watermark}/{total} 个片段")
+            raise eg.exceptions[0] from eg
+
+        return watermark
+
+
+indexing_pipeline = IndexingPipeline(
+    batch_size=settings.INDEX_BATCH_SIZE,
+    concurrency=settings.INDEX_CONCURRENCY,
+    max_retries=settings.INDEX_MAX_RETRIES,
+)
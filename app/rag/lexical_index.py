@@ -0,0 +1,259 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import NamedTuple
+
+from langchain_core.documents import Document
+
+from app.core.logging import logger
+
+# 汉字连续串按字符 n-gram 切分；字母数字串 (含 1.1.1 这类点分编码、3411 这类行业代码) 整体作为一个词项
+_TOKEN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]+|[0-9A-Za-z]+(?:\.[0-9A-Za-z]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    """中文字符 bigram + trigram，单字串保留 unigram；英文与数字小写后整体保留"""
+    terms: list[str] = []
+    for match in _TOKEN_RE.finditer(text):
+        run = match.group()
+        if not run[0].isascii():
+            if len(run) == 1:
+                terms.append(run)
+            for n in (2, 3):
+                terms.extend(run[i : i + n] for i in range(len(run) - n + 1))
+        else:
+            terms.append(run.lower())
+    return terms
+
+
+class LexicalHit(NamedTuple):
+    document: Document
+    score: float
+    coverage: float  # 命中的查询词项占比 (1.0 表示查询的所有 n-gram 都出现在该片段中)
+
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int, rrf_k: int = 60) -> list[Document]:
+    """倒数排名融合：score = Σ 1 / (rrf_k + rank)，按 Qdrant point id (metadata._id) 去重"""
+    scores: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = str(doc.metadata.get("_id") or doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ordered[:k]]
+
+
+class LexicalIndex:
+    """
+    基于 SQLite 的 BM25 倒排索引，与 Qdrant 中的片段一一对应 (以 point id 关联)。
+    - docs: 片段正文、metadata 与长度
+    - postings: (词项, 片段) -> 词频
+    写入与删除和向量库同步进行，支持增量构建。
+    """
+
+    def __init__(self, db_path: Path, k1: float = 1.5, b: float = 0.75):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        # 片段数与总长度 (BM25 的 N 与 avgdl)：本连接的写入增量维护，其他连接提交后按 data_version 重新统计
+        self._doc_count = 0
+        self._total_length = 0
+        self._data_version: int | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS docs (
+                    doc_id INTEGER PRIMARY KEY,
+                    point_id TEXT NOT NULL UNIQUE,
+                    user_id TEXT,
+                    length INTEGER NOT NULL,
+                    page_content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_postings_doc ON postings (doc_id)")
+            conn.commit()
+            self._conn = conn
+        self._refresh_stats(self._conn)
+        return self._conn
+
+    def _refresh_stats(self, conn: sqlite3.Connection):
+        """其他进程 / 连接 (如 build_lexical_index.py、知识库重建) 提交过写入时重新统计片段数与总长度"""
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._doc_count, self._total_length = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs"
+            ).fetchone()
+            self._data_version = version
+
+    def _remove_docs(self, conn: sqlite3.Connection, rows: list[tuple[int, int]]):
+        """rows: [(doc_id, length)]"""
+        for i in range(0, len(rows), 500):
+            part = [doc_id for doc_id, _ in rows[i : i + 500]]
+            placeholders = ",".join("?" * len(part))
+            conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", part)
+            conn.execute(f"DELETE FROM docs WHERE doc_id IN ({placeholders})", part)
+        self._doc_count -= len(rows)
+        self._total_length -= sum(length for _, length in rows)
+
+    def add(self, ids: list[str], documents: list[Document]):
+        """写入片段 (point id 已存在则覆盖，重复写入是幂等的)"""
+        with self._lock:
+            conn = self._connect()
+            for point_id, doc in zip(ids, documents, strict=True):
+                point_id = str(point_id)
+                old = conn.execute("SELECT doc_id, length FROM docs WHERE point_id = ?", (point_id,)).fetchall()
+                if old:
+                    self._remove_docs(conn, old)
+
+                terms = Counter(tokenize(doc.page_content))
+                length = sum(terms.values())
+                metadata = {**doc.metadata, "_id": point_id}
+                cursor = conn.execute(
+                    "INSERT INTO docs (point_id, user_id, length, page_content, metadata) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        point_id,
+                        doc.metadata.get("user_id"),
+                        length,
+                        doc.page_content,
+                        json.dumps(metadata, ensure_ascii=False, default=str),
+                    ),
+                )
+                conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in terms.items()],
+                )
+                self._doc_count += 1
+                self._total_length += length
+            conn.commit()
+
+    def delete_by_metadata(self, key: str, value: str) -> int:
+        """删除 metadata[key] == value 的片段，返回删除数量"""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT doc_id, length FROM docs WHERE json_extract(metadata, ?) = ?", (f'$."{key}"', value)
+            ).fetchall()
+            if rows:
+                self._remove_docs(conn, rows)
+                conn.commit()
+                logger.debug(f"[Lexical] 删除 {len(rows)} 个片段 ({key} == {value})")
+            return len(rows)
+
+    def delete(self, ids: list[str]) -> int:
+        """按 point id 删除片段，返回删除数量"""
+        ids = [str(point_id) for point_id in ids]
+        with self._lock:
+            conn = self._connect()
+            rows = []
+            for i in range(0, len(ids), 500):
+                part = ids[i : i + 500]
+                rows += conn.execute(
+                    f"SELECT doc_id, length FROM docs WHERE point_id IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+            if rows:
+                self._remove_docs(conn, rows)
+                conn.commit()
+                logger.debug(f"[Lexical] 删除 {len(rows)} 个片段")
+            return len(rows)
+
+    def clear(self):
+        """清空索引 (全量重建前调用)"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM docs")
+            conn.commit()
+            self._doc_count, self._total_length = 0, 0
+
+    def search(self, query: str, k: int = 4, user_id: str | None = None) -> list[LexicalHit]:
+        """BM25 检索，按得分降序返回前 k 个片段"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            conn = self._connect()
+            if not self._doc_count:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            df = dict(
+                conn.execute(
+                    f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", terms
+                ).fetchall()
+            )
+            if not df:
+                return []
+
+            # 只查询索引中存在的词项
+            params: list = list(df)
+            sql = (
+                "SELECT p.term, p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id "
+                f"WHERE p.term IN ({','.join('?' * len(params))})"
+            )
+            if user_id:
+                sql += " AND d.user_id = ?"
+                params.append(user_id)
+            postings = conn.execute(sql, params).fetchall()
+
+            n = self._doc_count
+            avg_length = self._total_length / n if n else 1.0
+            scores: dict[int, float] = {}
+            matched: Counter[int] = Counter()
+            for term, doc_id, tf, length in postings:
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+                matched[doc_id] += 1
+
+            top = sorted(scores, key=scores.get, reverse=True)[:k]
+            if not top:
+                return []
+            rows = conn.execute(
+                f"SELECT doc_id, page_content, metadata FROM docs WHERE doc_id IN ({','.join('?' * len(top))})", top
+            ).fetchall()
+
+        by_id = {doc_id: (content, metadata) for doc_id, content, metadata in rows}
+        return [
+            LexicalHit(
+                document=Document(page_content=by_id[doc_id][0], metadata=json.loads(by_id[doc_id][1])),
+                score=scores[doc_id],
+                coverage=matched[doc_id] / len(terms),
+            )
+            for doc_id in top
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._connect()
+            return self._doc_count
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,148 @@
+import threading
+from typing import NamedTuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from app.core.logging import logger
+
+CONTENT_KEY = QdrantVectorStore.CONTENT_KEY
+METADATA_KEY = QdrantVectorStore.METADATA_KEY
+
+
+class _Snapshot(NamedTuple):
+    ids: list[str]
+    matrix: np.ndarray  # (n, dim) float32，行已归一化，点积即余弦相似度
+    payloads: list[dict]
+    columns: dict[str, np.ndarray]  # metadata 字段 -> 取值数组 (过滤时按需构建，随快照一起替换)
+
+
+class NumpyVectorIndex:
+    """
+    小集合的内存精确检索引擎：向量与 payload 一次性载入连续的 float32 矩阵，
+    top-k 只需一次矩阵-向量乘法，没有本地 Qdrant 的逐查询开销与文件锁。
+    数据仍以 Qdrant 为准：启动时从集合载入，写入 / 删除时同步更新，别名切换到其他版本后整体重新载入。
+    读取使用不可变快照，写入时整体替换，检索无需加锁。
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot([], np.empty((0, 0), dtype=np.float32), [], {})
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def load(self, client: QdrantClient, batch_size: int = 1024) -> int:
+        """从 Qdrant 集合 (或别名) 全量载入，返回点数"""
+        ids, vectors, payloads, offset = [], [], [], None
+        while True:
+            records, offset = client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for record in records:
+                ids.append(str(record.id))
+                vectors.append(record.vector)
+                payloads.append(record.payload or {})
+            if offset is None:
+                break
+
+        dim = client.get_collection(self.collection_name).config.params.vectors.size
+        matrix = self._normalize(vectors) if vectors else np.empty((0, dim), dtype=np.float32)
+        with self._lock:
+            self._snapshot = _Snapshot(ids, matrix, payloads, {})
+        logger.info(f"[NumpyIndex] Loaded {len(ids)} vectors ({dim} dims) from '{self.collection_name}'")
+        return len(ids)
+
+    def add(self, ids: list[str], vectors: list[list[float]], documents: list[Document]):
+        """写入片段 (point id 已存在则覆盖)"""
+        ids = [str(point_id) for point_id in ids]
+        rows = self._normalize(vectors)
+        payloads = [{CONTENT_KEY: doc.page_content, METADATA_KEY: doc.metadata} for doc in documents]
+        with self._lock:
+            current = self._snapshot
+            replaced = set(ids)
+            keep = [i for i, point_id in enumerate(current.ids) if point_id not in replaced]
+            matrix = np.concatenate([current.matrix[keep], rows]) if len(current.ids) else rows
+            self._snapshot = _Snapshot(
+                [current.ids[i] for i in keep] + ids,
+                np.ascontiguousarray(matrix),
+                [current.payloads[i] for i in keep] + payloads,
+                {},
+            )
+
+    def delete_by_metadata(self, key: str, value: str) -> int:
+        """删除 metadata[key] == value 的片段，返回删除数量"""
+        with self._lock:
+            current = self._snapshot
+            keep = [i for i, p in enumerate(current.payloads) if (p.get(METADATA_KEY) or {}).get(key) != value]
+            removed = len(current.ids) - len(keep)
+            if removed:
+                self._snapshot = _Snapshot(
+                    [current.ids[i] for i in keep],
+                    np.ascontiguousarray(current.matrix[keep]),
+                    [current.payloads[i] for i in keep],
+                    {},
+                )
+            return removed
+
+    def _mask(self, snapshot: _Snapshot, filter: dict[str, str] | None) -> np.ndarray | None:
+        """metadata 等值过滤 (多个字段取交集)，与 Qdrant 的 must + MatchValue 语义一致"""
+        if not filter:
+            return None
+        mask = np.ones(len(snapshot.ids), dtype=bool)
+        for key, value in filter.items():
+            column = snapshot.columns.get(key)
+            if column is None:
+                column = np.array([(p.get(METADATA_KEY) or {}).get(key) for p in snapshot.payloads], dtype=object)
+                snapshot.columns[key] = column
+            mask &= column == value
+        return mask
+
+    def _top_k(self, snapshot: _Snapshot, scores: np.ndarray, k: int) -> list[tuple[Document, float]]:
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for i in top:
+            payload = snapshot.payloads[i]
+            metadata = {
+                **(payload.get(METADATA_KEY) or {}),
+                "_id": snapshot.ids[i],
+                "_collection_name": self.collection_name,
+            }
+            results.append((Document(page_content=payload.get(CONTENT_KEY) or "", metadata=metadata), float(scores[i])))
+        return results
+
+    def search(
+        self, vector: list[float], k: int = 4, filter: dict[str, str] | None = None
+    ) -> list[tuple[Document, float]]:
+        """精确余弦检索，返回 [(文档, 相似度)]，按相似度降序"""
+        return self.search_batch([vector], k, filter)[0]
+
+    def search_batch(
+        self, vectors: list[list[float]], k: int = 4, filter: dict[str, str] | None = None
+    ) -> list[list[tuple[Document, float]]]:
+        """批量检索：多个查询合并为一次矩阵乘法"""
+        snapshot = self._snapshot
+        if not snapshot.ids:
+            return [[] for _ in vectors]
+        scores = self._normalize(vectors) @ snapshot.matrix.T  # (queries, n)
+        mask = self._mask(snapshot, filter)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        return [self._top_k(snapshot, row, k) for row in scores]
+
+    def __len__(self) -> int:
+        return len(self._snapshot.ids)
@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from app.core.logging import logger
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+PAYLOADS_FILE = "payloads.jsonl"
+
+
+def snapshot_dir_for(source: Path) -> Path:
+    """知识库文件对应的快照目录 (与源文件放在一起，如 目录.json.snapshot/)"""
+    return source.with_name(f"{source.name}.snapshot")
+
+
+def read_manifest(snapshot_dir: Path) -> dict | None:
+    path = snapshot_dir / MANIFEST_FILE
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"[Snapshot] Unreadable manifest {path}: {e}")
+        return None
+
+
+def manifest_matches(manifest: dict | None, source_hash: str, model: str, dim: int) -> bool:
+    """快照只有在源文件、Embedding 模型与维度都一致时才可直接载入"""
+    return (
+        manifest is not None
+        and manifest.get("format") == SNAPSHOT_FORMAT
+        and manifest.get("source_hash") == source_hash
+        and manifest.get("embedding_model") == model
+        and manifest.get("embedding_dim") == dim
+    )
+
+
+def export_snapshot(
+    client: QdrantClient,
+    collection_name: str,
+    snapshot_dir: Path,
+    source_hash: str,
+    source_file: str,
+    model: str,
+    batch_size: int = 1024,
+) -> dict:
+    """
+    导出集合中属于某个源文件 (metadata.file_hash) 的全部点：
+    - vectors.npy: (n, dim) float32 矩阵
+    - payloads.jsonl: 每行 {"id", "payload"}，与矩阵逐行对应
+    - manifest.json: 模型、维度、源文件哈希与点数
+    返回 manifest。
+    """
+    file_filter = rest.Filter(
+        must=[
+            rest.FieldCondition(
+                key=f"{QdrantVectorStore.METADATA_KEY}.file_hash", match=rest.MatchValue(value=source_hash)
+            )
+        ]
+    )
+    dim = client.get_collection(collection_name).config.params.vectors.size
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    vectors, offset = [], None
+    with (snapshot_dir / PAYLOADS_FILE).open("w", encoding="utf-8") as f:
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                scroll_filter=file_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for record in records:
+                vectors.append(record.vector)
+                f.write(json.dumps({"id": str(record.id), "payload": record.payload}, ensure_ascii=False) + "\n")
+            if offset is None:
+                break
+    if not vectors:
+        raise ValueError(f"No points with file_hash={source_hash} in '{collection_name}'")
+    np.save(snapshot_dir / VECTORS_FILE, np.asarray(vectors, dtype=np.float32))
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "embedding_model": model,
+        "embedding_dim": dim,
+        "source_file": source_file,
+        "source_hash": source_hash,
+        "count": len(vectors),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    (snapshot_dir / MANIFEST_FILE).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info(f"[Snapshot] Exported {len(vectors)} points of {source_file} to {snapshot_dir}")
+    return manifest
+
+
+def import_snapshot(store, snapshot_dir: Path, batch_size: int = 256) -> int:
+    """
+    将快照批量写入向量库 (走 store.add_embeddings，倒排索引等同步更新)，返回写入点数。
+    point id 与原集合一致，重复导入是幂等的。
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in {snapshot_dir}")
+    vectors = np.load(snapshot_dir / VECTORS_FILE, mmap_mode="r")
+    with (snapshot_dir / PAYLOADS_FILE).open(encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if len(rows) != len(vectors) or len(rows) != manifest["count"]:
+        raise ValueError(f"Corrupt snapshot {snapshot_dir}: {len(rows)} payloads, {len(vectors)} vectors")
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start : start + batch_size]
+        documents = [
+            Document(
+                page_content=row["payload"].get(QdrantVectorStore.CONTENT_KEY) or "",
+                metadata=row["payload"].get(QdrantVectorStore.METADATA_KEY) or {},
+            )
+            for row in batch
+        ]
+        store.add_embeddings(documents, vectors[start : start + batch_size].tolist(), [row["id"] for row in batch])
+    logger.info(f"[Snapshot] Imported {len(rows)} points from {snapshot_dir}")
+    return len(rows)
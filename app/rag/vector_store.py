@@ -1,69 +1,259 @@
 import asyncio
+import functools
+import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
+from uuid import uuid4
 
 from langchain_community.embeddings import DashScopeEmbeddings
+from langchain_community.embeddings.dashscope import embed_with_retry
+from langchain_core.documents import Document
 from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from pydantic import Field
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from tenacity import retry, stop_after_attempt, wait_fixed
 
+from app.core.cache import LRUCache
 from app.core.config import settings
 from app.core.logging import logger
+from app.rag.collections import copy_points, create_version, promote_version, resolve_alias, search_params
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.lexical_index import LexicalHit, LexicalIndex, reciprocal_rank_fusion
+from app.rag.numpy_index import NumpyVectorIndex
 
 
 class LoggingDashScopeEmbeddings(DashScopeEmbeddings):
-    """带详细日志的 Embedding 包装类"""
+    """带详细日志与内容寻址缓存的 Embedding 包装类"""
+
+    cache: Any = Field(default=None, exclude=True)  # EmbeddingCache | None
+    dimensions: int | None = None  # 输出维度 (text-embedding-v3 支持 1024/768/512/256/128/64)，None 为模型默认
+
+    def _namespace(self, text_type: str) -> str:
+        # DashScope 对 document / query 使用不同的编码方式；不同维度的向量不可混用，需分开缓存
+        return f"{self.model}/{self.dimensions or 'default'}/{text_type}"
+
+    def _request(self, texts: list[str] | str, text_type: str) -> list[list[float]]:
+        kwargs = {"input": texts, "text_type": text_type, "model": self.model}
+        if self.dimensions:
+            kwargs["dimension"] = self.dimensions
+        return [item["embedding"] for item in embed_with_retry(self, **kwargs)]
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        logger.debug(f"[Embed] 正在请求阿里云 API Embedding，批次大小: {len(texts)} 条文本...")
+        results: list[list[float] | None] = [None] * len(texts)
+        if self.cache is not None:
+            results = self.cache.get_many(self._namespace("document"), texts)
+
+        missing = [i for i, vec in enumerate(results) if vec is None]
+        if not missing:
+            logger.debug(f"[Embed] 缓存全部命中 ({len(texts)} 条)")
+            return results
+
+        missing_texts = [texts[i] for i in missing]
+        logger.debug(
+            f"[Embed] 正在请求阿里云 API Embedding，批次大小: {len(missing_texts)} 条文本 (缓存命中 {len(texts) - len(missing)} 条)..."
+        )
         start_time = time.time()
         try:
-            result = super().embed_documents(texts)
+            vectors = self._request(missing_texts, "document")
             duration = time.time() - start_time
             logger.debug(f"[Embed] API 请求成功，耗时: {duration:.2f}s")
-            return result
         except Exception as e:
             logger.error(f"[Embed] API 请求失败! 耗时: {time.time() - start_time:.2f}s. 错误: {e}")
             raise e
 
+        if self.cache is not None:
+            self.cache.put_many(self._namespace("document"), missing_texts, vectors)
+        for i, vec in zip(missing, vectors, strict=True):
+            results[i] = vec
+        return results
+
+    def embed_query(self, text: str) -> list[float]:
+        if self.cache is not None:
+            cached = self.cache.get_many(self._namespace("query"), [text])[0]
+            if cached is not None:
+                return cached
+
+        vector = self._request(text, "query")[0]
+        if self.cache is not None:
+            self.cache.put_many(self._namespace("query"), [text], [vector])
+        return vector
+
 
 class VectorStoreService:
     def __init__(self):
         self.persist_directory = str(settings.VECTOR_DB_PERSIST_DIR)
         self.collection_name = "policy_kb"
         self._client = None
+        self._aclient: AsyncQdrantClient | None = None  # 仅 Server 模式
         self._db = None
         self._embeddings = None
+        self._lexical = None
+        self._numpy: NumpyVectorIndex | None = None  # 仅 numpy 检索引擎
+        # 专用线程池：检索 / 索引不再占用 Starlette 共享的默认线程池，彼此也互不排队。
+        # 按需创建，aclose 关闭后再次使用 (如测试或热重载中重复启动应用) 会重新创建
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        self._executors_lock = threading.Lock()
+        self._search_semaphore = asyncio.Semaphore(settings.VECTOR_SEARCH_CONCURRENCY)
+        # 集合代数：每次写入 / 删除后递增，结果缓存的 key 带上代数，旧结果自然失效
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        # 别名当前指向的物理集合：其他进程切换别名后按新版本重新载入 (维度、检索实例)
+        self._serving: str | None = None
+        self._alias_checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        # 两级检索缓存：(维度, query) -> 向量 (与集合内容无关)；(代数, query, k, filter) -> 命中文档
+        self._query_vectors = LRUCache("query_embedding", max_bytes=settings.QUERY_EMBEDDING_CACHE_MAX_BYTES)
+        self._search_results = LRUCache(
+            "search_result",
+            max_bytes=settings.SEARCH_RESULT_CACHE_MAX_BYTES,
+            ttl=settings.SEARCH_RESULT_CACHE_TTL_SECONDS,
+        )
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _bump_generation(self):
+        """集合内容发生变化，使已缓存的检索结果全部失效"""
+        with self._generation_lock:
+            self._generation += 1
+        self._search_results.clear()
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        # 仅折叠空白，不改变大小写，避免影响 Embedding 语义
+        return " ".join(query.split())
+
+    def _embed_query(self, normalized_query: str) -> list[float]:
+        key = (self.embeddings.dimensions, normalized_query)
+        vector = self._query_vectors.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(normalized_query)
+            self._query_vectors.set(key, vector)
+        return vector
 
     @property
     def embeddings(self):
         if self._embeddings is None:
             self._embeddings = LoggingDashScopeEmbeddings(
-                model="text-embedding-v3", dashscope_api_key=settings.DASHSCOPE_API_KEY
+                model=settings.EMBEDDING_MODEL_NAME,
+                dimensions=settings.EMBEDDING_DIM,
+                dashscope_api_key=settings.DASHSCOPE_API_KEY,
+                cache=EmbeddingCache(settings.EMBEDDING_CACHE_PATH, max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES),
             )
         return self._embeddings
 
+    @property
+    def backend(self) -> str:
+        """当前集合的向量检索引擎 (VECTOR_SEARCH_BACKENDS)"""
+        return settings.VECTOR_SEARCH_BACKENDS.get(self.collection_name, "qdrant")
+
+    @property
+    def lexical(self) -> LexicalIndex:
+        """与向量库同步维护的 BM25 倒排索引"""
+        if self._lexical is None:
+            self._lexical = LexicalIndex(settings.LEXICAL_INDEX_PATH)
+        return self._lexical
+
     def initialize(self):
         """延迟初始化，避免模块导入时锁定文件"""
         if self._client:
             return
 
-        logger.info(f"Connecting to Qdrant (Local) at {self.persist_directory}...")
-        self._client = QdrantClient(path=self.persist_directory)
+        if settings.QDRANT_URL:
+            logger.info(f"Connecting to Qdrant (Server) at {settings.QDRANT_URL}...")
+            self._client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+            self._aclient = AsyncQdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+        else:
+            logger.info(f"Connecting to Qdrant (Local) at {self.persist_directory}...")
+            self._client = QdrantClient(path=self.persist_directory)
 
         if not self._client.collection_exists(self.collection_name):
+            # 新集合以版本形式创建，collection_name 始终是指向线上版本的别名
             logger.info(f"Collection '{self.collection_name}' not found. Creating...")
-            self._client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(size=1024, distance=Distance.COSINE),
+            version = create_version(self._client, self.collection_name, settings.EMBEDDING_DIM)
+            promote_version(self._client, self.collection_name, version)
+        self._ensure_payload_indexes()
+        self._load_serving()
+
+    def _load_serving(self):
+        """按别名当前指向的物理集合同步 Embedding 维度、检索实例与内存索引 (numpy 引擎)"""
+        serving = resolve_alias(self._client, self.collection_name) or self.collection_name
+        # 维度以集合为准：配置变更后、迁移完成前，仍按旧维度检索与写入，避免向量维度不匹配
+        dim = self._client.get_collection(serving).config.params.vectors.size
+        if dim != settings.EMBEDDING_DIM:
+            logger.warning(
+                f"Collection '{self.collection_name}' stores {dim}-dim vectors but EMBEDDING_DIM={settings.EMBEDDING_DIM}; "
+                "using the collection dimension. Run scripts/migrate_embedding_dim.py to re-embed."
             )
+        self.embeddings.dimensions = dim
 
         self._db = QdrantVectorStore(
             client=self._client,
             collection_name=self.collection_name,
             embedding=self.embeddings,
         )
+        if self.backend == "numpy":
+            if self._numpy is None:
+                self._numpy = NumpyVectorIndex(self.collection_name)
+            self._numpy.load(self._client)
+        self._serving = serving
+        self._alias_checked_at = time.monotonic()
+
+    def _alias_check_due(self) -> bool:
+        return (
+            self._serving is not None
+            and time.monotonic() - self._alias_checked_at >= settings.COLLECTION_ALIAS_CHECK_SECONDS
+        )
+
+    def sync_alias(self, force: bool = False) -> bool:
+        """
+        检查别名是否已被其他进程切换 (维度迁移、知识库重建、回滚)，是则按新版本重新载入并使检索缓存失效。
+        检索与写入路径按 COLLECTION_ALIAS_CHECK_SECONDS 节流调用；返回是否发生了切换。
+        """
+        if self._serving is None or not (force or self._alias_check_due()):
+            return False
+        with self._reload_lock:
+            if not force and not self._alias_check_due():
+                return False
+            self._alias_checked_at = time.monotonic()
+            try:
+                serving = resolve_alias(self._client, self.collection_name) or self.collection_name
+            except Exception as e:
+                logger.warning(f"[DB] Failed to resolve alias '{self.collection_name}': {e}")
+                return False
+            if serving == self._serving:
+                return False
+            logger.info(f"[DB] Alias '{self.collection_name}' moved: {self._serving} -> {serving}, reloading")
+            self._load_serving()
+        self._bump_generation()
+        return True
+
+    def _ensure_payload_indexes(self):
+        """
+        为声明的过滤字段 (metadata.user_id / metadata.file_hash 等) 建立 keyword 索引。
+        已有集合缺少的索引会被补建，使过滤检索与按文件删除不再全量扫描。
+        """
+        if not settings.QDRANT_URL:
+            # 本地嵌入式模式不支持 payload 索引 (过滤始终是全量扫描)
+            return
+
+        from qdrant_client.http import models as rest
+
+        existing = self._client.get_collection(self.collection_name).payload_schema or {}
+        for field in settings.VECTOR_PAYLOAD_INDEX_FIELDS:
+            key = f"{QdrantVectorStore.METADATA_KEY}.{field}"
+            if key in existing:
+                continue
+            logger.info(f"[DB] Creating keyword payload index on '{key}'...")
+            self._client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=key,
+                field_schema=rest.PayloadSchemaType.KEYWORD,
+                wait=True,
+            )
 
     @property
     def db(self) -> QdrantVectorStore:
@@ -83,50 +273,334 @@ class VectorStoreService:
         if user_id:
             for doc in documents:
                 doc.metadata["user_id"] = user_id
+        self.sync_alias()
 
+        # 显式生成 point id，使倒排索引与向量库中的片段一一对应
+        ids = [str(uuid4()) for _ in documents]
         try:
-            self.db.add_documents(documents=documents)
+            self.db.add_documents(documents=documents, ids=ids)
+            self.lexical.add(ids, documents)
+            if self._numpy is not None:
+                # 向量由 QdrantVectorStore 内部计算，从集合中取回
+                records = self._client.retrieve(self.collection_name, ids, with_vectors=True)
+                vectors = {str(r.id): r.vector for r in records}
+                self._numpy.add(ids, [vectors[point_id] for point_id in ids], documents)
             logger.debug("[DB] 写入成功")
         except Exception as e:
             logger.error(f"[DB] 写入失败，准备重试。错误详情: {e}")
             raise e
+        finally:
+            # 失败时也可能已部分写入
+            self._bump_generation()
 
-    def search(self, query: str, k: int = 4, user_id: str | None = None):
-        """同步语义检索"""
-        logger.info(f"Searching for: {query}, user_id={user_id}")
+    def add_embeddings(self, documents: list, vectors: list[list[float]], ids: list[str], user_id: str | None = None):
+        """写入已计算好向量的文档 (ids 相同则覆盖，便于断点续传时幂等重写)"""
+        from qdrant_client.http import models as rest
 
-        filter_condition = None
+        self.initialize()
+        self.sync_alias()
         if user_id:
-            from qdrant_client.http import models as rest
+            for doc in documents:
+                doc.metadata["user_id"] = user_id
+
+        points = [
+            rest.PointStruct(
+                id=point_id,
+                vector=vector,
+                payload={
+                    QdrantVectorStore.CONTENT_KEY: doc.page_content,
+                    QdrantVectorStore.METADATA_KEY: doc.metadata,
+                },
+            )
+            for doc, vector, point_id in zip(documents, vectors, ids, strict=True)
+        ]
+        try:
+            self._client.upsert(collection_name=self.collection_name, points=points)
+            self.lexical.add(ids, documents)
+            if self._numpy is not None:
+                self._numpy.add(ids, vectors, documents)
+        finally:
+            self._bump_generation()
+        logger.debug(f"[DB] 写入 {len(points)} 个向量")
+
+    def rebuild(
+        self, documents: list[Document], batch_size: int = 25, on_batch: Callable[[int], None] | None = None
+    ) -> str:
+        """
+        将知识库文档全量写入新的集合版本，完成后原子切换别名，返回新版本名。
+        构建期间检索仍读取线上版本；用户上传的文档 (带 file_hash，由 DocumentService 管理) 在切换前复制到新版本。
+        上一版本保留用于回滚 (scripts/rollback_collection.py)。失败时删除未完成的版本，线上版本不受影响。
+        """
+        from qdrant_client.http import models as rest
+
+        self.initialize()
+        live = resolve_alias(self._client, self.collection_name) or self.collection_name
+        dim = self._client.get_collection(live).config.params.vectors.size
+        target = create_version(self._client, self.collection_name, dim)
+        managed = rest.IsEmptyCondition(is_empty=rest.PayloadField(key=f"{QdrantVectorStore.METADATA_KEY}.file_hash"))
+
+        ids = [str(uuid4()) for _ in documents]
+        try:
+            for start in range(0, len(documents), batch_size):
+                batch = documents[start : start + batch_size]
+                vectors = self.embeddings.embed_documents([doc.page_content for doc in batch])
+                self._client.upsert(
+                    collection_name=target,
+                    points=[
+                        rest.PointStruct(
+                            id=point_id,
+                            vector=vector,
+                            payload={
+                                QdrantVectorStore.CONTENT_KEY: doc.page_content,
+                                QdrantVectorStore.METADATA_KEY: doc.metadata,
+                            },
+                        )
+                        for doc, vector, point_id in zip(batch, vectors, ids[start:], strict=False)
+                    ],
+                    wait=True,
+                )
+                if on_batch:
+                    on_batch(len(batch))
+
+            # 在切换前最后一刻复制用户文档，尽量缩短构建期间新上传文档丢失的窗口
+            carried = copy_points(self._client, live, target, scroll_filter=rest.Filter(must_not=[managed]))
+            logger.info(f"[DB] Carried over {carried} user document chunks into '{target}'")
+        except Exception as e:
+            logger.error(f"[DB] Rebuild of '{self.collection_name}' failed, dropping '{target}': {e}")
+            self._client.delete_collection(target)
+            raise
 
-            filter_condition = rest.Filter(
-                must=[rest.FieldCondition(key="metadata.user_id", match=rest.MatchValue(value=user_id))]
+        # 旧版本中被替换的知识库片段 (无 file_hash) 需从倒排索引移除
+        retired, offset = [], None
+        while True:
+            records, offset = self._client.scroll(
+                collection_name=live,
+                scroll_filter=rest.Filter(must=[managed]),
+                limit=1024,
+                offset=offset,
+                with_payload=False,
             )
+            retired += [str(r.id) for r in records]
+            if offset is None:
+                break
+
+        promote_version(self._client, self.collection_name, target)
+        with self._reload_lock:
+            self._load_serving()
+        try:
+            self.lexical.delete(retired)
+            self.lexical.add(ids, documents)
+        finally:
+            self._bump_generation()
+        logger.info(f"[DB] '{self.collection_name}' now serves '{target}' ({len(documents)} knowledge base chunks)")
+        return target
+
+    @staticmethod
+    def _is_decisive(hits: list[LexicalHit]) -> bool:
+        """首位片段覆盖全部查询词项，且得分显著领先第二位"""
+        if not hits or hits[0].coverage < 1.0:
+            return False
+        return len(hits) == 1 or hits[0].score >= settings.LEXICAL_DECISIVE_RATIO * hits[1].score
+
+    def _cached(self, cache_key: tuple) -> list[Document] | None:
+        cached = self._search_results.get(cache_key)
+        if cached is None:
+            return None
+        logger.debug(f"[Search] 结果缓存命中: {cache_key[1][:20]}...")
+        # 返回副本，避免调用方修改 metadata 污染缓存
+        return [doc.model_copy(deep=True) for doc in cached]
+
+    def _remember(self, cache_key: tuple, results: list[Document]):
+        # 检索期间集合若发生写入，结果可能已过时，不再缓存
+        if cache_key[0] == self._generation:
+            self._search_results.set(cache_key, [doc.model_copy(deep=True) for doc in results])
+
+    @staticmethod
+    def _user_filter(user_id: str | None):
+        if not user_id:
+            return None
+        from qdrant_client.http import models as rest
+
+        return rest.Filter(must=[rest.FieldCondition(key="metadata.user_id", match=rest.MatchValue(value=user_id))])
 
-        return self.db.similarity_search(query, k=k, filter=filter_condition)
+    @staticmethod
+    def _fuse(dense: list[Document], lexical_hits: list[LexicalHit], k: int) -> list[Document]:
+        return reciprocal_rank_fusion([dense, [hit.document for hit in lexical_hits]], k=k, rrf_k=settings.HYBRID_RRF_K)
+
+    def search(self, query: str, k: int = 4, user_id: str | None = None):
+        """
+        同步混合检索：BM25 倒排索引 + 向量检索，倒数排名融合 (RRF)。
+        关键词命中足够明确时直接返回词法结果，省去 Embedding 调用。
+        query 向量与检索结果均有缓存。
+        """
+        self.sync_alias()
+        normalized = self._normalize_query(query)
+        cache_key = (self._generation, normalized, k, user_id)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+
+        logger.info(f"Searching for: {query}, user_id={user_id}")
+        results = self._hybrid_search(normalized, k, user_id)
+        self._remember(cache_key, results)
+        return results
+
+    def _hybrid_search(self, query: str, k: int, user_id: str | None) -> list[Document]:
+        candidates = max(k, settings.HYBRID_CANDIDATES)
+        lexical_hits = self.lexical.search(query, k=candidates, user_id=user_id)
+        if self._is_decisive(lexical_hits):
+            logger.debug(f"[Search] 词法检索结果明确，跳过向量检索: {query[:20]}...")
+            return [hit.document for hit in lexical_hits[:k]]
+
+        vector = self._embed_query(query)
+        return self._fuse(self._dense_search(vector, candidates, user_id), lexical_hits, k)
+
+    def _dense_search(self, vector: list[float], k: int, user_id: str | None) -> list[Document]:
+        db = self.db  # 按需初始化 (numpy 引擎在初始化时载入)
+        if self._numpy is not None:
+            return [doc for doc, _ in self._numpy.search(vector, k, {"user_id": user_id} if user_id else None)]
+        return db.similarity_search_by_vector(
+            vector, k=k, filter=self._user_filter(user_id), search_params=search_params()
+        )
+
+    def similarity_search_batch(
+        self, queries: list[str], k: int = 4, user_id: str | None = None
+    ) -> list[list[Document]]:
+        """批量向量检索 (不含词法融合)。numpy 引擎下所有查询合并为一次矩阵乘法"""
+        self.sync_alias()
+        vectors = [self._embed_query(self._normalize_query(query)) for query in queries]
+        if self._db is None:
+            self.initialize()
+        if self._numpy is not None:
+            batch = self._numpy.search_batch(vectors, k, {"user_id": user_id} if user_id else None)
+            return [[doc for doc, _ in hits] for hits in batch]
+        return [self._dense_search(vector, k, user_id) for vector in vectors]
 
     def delete_by_metadata(self, key: str, value: str):
         """通过元数据过滤删除文档"""
         from qdrant_client.http import models as rest
 
         self.initialize()
+        self.sync_alias()
         logger.info(f"[DB] Deleting vectors where {key} == {value}...")
-        self._client.delete(
+        try:
+            self._client.delete(
+                collection_name=self.collection_name,
+                points_selector=rest.FilterSelector(
+                    filter=rest.Filter(
+                        must=[rest.FieldCondition(key=f"metadata.{key}", match=rest.MatchValue(value=value))]
+                    )
+                ),
+            )
+            self.lexical.delete_by_metadata(key, value)
+            if self._numpy is not None:
+                self._numpy.delete_by_metadata(key, value)
+        finally:
+            self._bump_generation()
+        logger.info("[DB] Delete command sent.")
+
+    # --- 异步路径 ---
+    def _executor(self, name: str) -> ThreadPoolExecutor:
+        with self._executors_lock:
+            executor = self._executors.get(name)
+            if executor is None:
+                workers = {
+                    "qdrant": settings.QDRANT_EXECUTOR_WORKERS,
+                    "embed-query": settings.EMBED_QUERY_WORKERS,
+                    "embed-index": settings.INDEX_CONCURRENCY,
+                }[name]
+                executor = self._executors[name] = ThreadPoolExecutor(workers, thread_name_prefix=name)
+            return executor
+
+    async def _run(self, pool: str, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(pool), functools.partial(func, *args, **kwargs))
+
+    async def _aembed_query(self, normalized_query: str) -> list[float]:
+        key = (self.embeddings.dimensions, normalized_query)
+        vector = self._query_vectors.get(key)
+        if vector is None:
+            vector = await self._run("embed-query", self.embeddings.embed_query, normalized_query)
+            self._query_vectors.set(key, vector)
+        return vector
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """在索引专用线程池中批量计算文档向量"""
+        return await self._run("embed-index", self.embeddings.embed_documents, texts)
+
+    async def _adense_search(self, vector: list[float], k: int, user_id: str | None) -> list[Document]:
+        if self._client is None:
+            await self._run("qdrant", self.initialize)
+        if self._aclient is None or self._numpy is not None:
+            # 本地嵌入式 Qdrant 只有同步接口 (numpy 引擎为 CPU 计算)，放到专用线程池
+            return await self._run("qdrant", self._dense_search, vector, k, user_id)
+
+        response = await self._aclient.query_points(
             collection_name=self.collection_name,
-            points_selector=rest.FilterSelector(
-                filter=rest.Filter(
-                    must=[rest.FieldCondition(key=f"metadata.{key}", match=rest.MatchValue(value=value))]
-                )
-            ),
+            query=vector,
+            limit=k,
+            query_filter=self._user_filter(user_id),
+            search_params=search_params(),
+            with_payload=True,
         )
-        logger.info("[DB] Delete command sent.")
+        return [
+            QdrantVectorStore._document_from_point(
+                point, self.collection_name, QdrantVectorStore.CONTENT_KEY, QdrantVectorStore.METADATA_KEY
+            )
+            for point in response.points
+        ]
+
+    async def asearch(self, query: str, k: int = 4, user_id: str | None = None) -> list[Document]:
+        """
+        异步混合检索。
+        Embedding 与本地 Qdrant 调用在专用线程池中执行，Server 模式直接使用异步客户端；
+        同时进行的检索数受 VECTOR_SEARCH_CONCURRENCY 限制。
+        """
+        if self._alias_check_due():
+            await self._run("qdrant", self.sync_alias)
+        normalized = self._normalize_query(query)
+        cache_key = (self._generation, normalized, k, user_id)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
 
-    async def asearch(self, query: str, k: int = 4, user_id: str | None = None) -> list[Any]:
-        """异步语义检索 (在线程池中运行同步操作)"""
         logger.info(f"[Async] Searching for: {query}, user_id={user_id}")
-        # 由于 Qdrant 本地客户端和 embed_query 都是同步阻塞的，必须放到线程池
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, lambda: self.search(query, k, user_id=user_id))
+        async with self._search_semaphore:
+            candidates = max(k, settings.HYBRID_CANDIDATES)
+            lexical_hits = await self._run("qdrant", self.lexical.search, normalized, candidates, user_id)
+            if self._is_decisive(lexical_hits):
+                logger.debug(f"[Search] 词法检索结果明确，跳过向量检索: {normalized[:20]}...")
+                results = [hit.document for hit in lexical_hits[:k]]
+            else:
+                vector = await self._aembed_query(normalized)
+                dense = await self._adense_search(vector, candidates, user_id)
+                results = self._fuse(dense, lexical_hits, k)
+
+        self._remember(cache_key, results)
+        return results
+
+    async def aadd_embeddings(
+        self, documents: list, vectors: list[list[float]], ids: list[str], user_id: str | None = None
+    ):
+        await self._run("qdrant", self.add_embeddings, documents, vectors, ids, user_id)
+
+    async def aadd_documents(self, documents: list, ids: list[str] | None = None, user_id: str | None = None):
+        """异步写入文档：Embedding 走索引线程池，写入走 Qdrant 线程池，不占用检索线程"""
+        if not documents:
+            return
+        ids = ids or [str(uuid4()) for _ in documents]
+        vectors = await self.aembed_documents([doc.page_content for doc in documents])
+        await self.aadd_embeddings(documents, vectors, ids, user_id)
+
+    async def aclose(self):
+        """释放异步客户端与专用线程池 (应用退出时调用；之后再次使用时按需重新创建)"""
+        if self._aclient is not None:
+            await self._aclient.close()
+            self._aclient = None
+        with self._executors_lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
 
 
 # 单例导出
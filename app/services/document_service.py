@@ -1,22 +1,40 @@
+import asyncio
 import hashlib
 import json
-import shutil
+import time
+from collections.abc import Awaitable, Callable
 from pathlib import Path
+from uuid import NAMESPACE_URL, uuid4, uuid5
 
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile
 from langchain_core.documents import Document
 from sqlmodel import Session, select
 
+from app.core.cache import LRUCache
 from app.core.config import settings
 from app.core.db import engine
 from app.core.logging import logger
 from app.models.file import FileParsingCache, FileStatus
+from app.models.job import Job, JobKind, JobStatus
 from app.parsers import parse_file
+from app.rag.catalog_index import catalog_index
+from app.rag.indexing import indexing_pipeline
+from app.rag.snapshot import import_snapshot, manifest_matches, read_manifest, snapshot_dir_for
 from app.rag.strategies.general import GeneralRecursiveStrategy
 from app.rag.vector_store import vector_store
+from app.services.job_queue import ACTIVE_STATUSES, PRIORITY_SYNC, PRIORITY_UPLOAD, job_queue
 
-# 简单的内存缓存
-UPLOAD_CACHE = {}
+# 已解析文件的内存缓存 (有界 LRU，按字节预算淘汰)
+UPLOAD_CACHE = LRUCache("upload", max_bytes=settings.UPLOAD_CACHE_MAX_BYTES, ttl=settings.UPLOAD_CACHE_TTL_SECONDS)
+
+# 排队等待解析的记录 content 占位 (content 列非空)
+UNPARSED_CONTENT = "[]"
+
+
+class UploadTooLargeError(ValueError):
+    """上传文件超过 UPLOAD_MAX_BYTES"""
 
 
 class DocumentService:
@@ -25,6 +43,11 @@ class DocumentService:
         self.upload_dir.mkdir(parents=True, exist_ok=True)
         # 默认使用通用递归策略
         self.default_strategy = GeneralRecursiveStrategy()
+        # 进行中的解析：file_hash -> Future，合并同一文件的并发上传
+        self._inflight: dict[str, asyncio.Future] = {}
+        job_queue.register(JobKind.PARSE, self._run_parse_job)
+        job_queue.register(JobKind.INDEX, self._run_index_job)
+        job_queue.register(JobKind.SNAPSHOT, self._run_snapshot_job)
 
     def _calculate_hash(self, file_path: Path) -> str:
         """计算文件的 SHA-256 哈希值"""
@@ -34,9 +57,177 @@ class DocumentService:
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
 
+    def _serialize_docs(self, docs: list[Document]) -> list[dict]:
+        """序列化兼容性处理 (Pydantic V1/V2)"""
+        docs_dicts = []
+        for d in docs:
+            if hasattr(d, "model_dump"):
+                docs_dicts.append(d.model_dump())
+            elif hasattr(d, "dict"):
+                docs_dicts.append(d.dict())
+            else:
+                docs_dicts.append({"page_content": d.page_content, "metadata": d.metadata})
+        return docs_dicts
+
+    def render_docs(self, docs_dicts: list[dict]) -> str:
+        """将解析结果渲染为带 [Page n] 等结构化标记的文本，帮助 LLM 溯源"""
+        formatted_parts = []
+        for doc in docs_dicts:
+            metadata = doc.get("metadata", {})
+            page_content = doc.get("page_content", "")
+
+            # 根据类型添加标记
+            if "page" in metadata:
+                marker = f"[Page {metadata['page']}]"
+            elif "sheet" in metadata and "row_end" in metadata and metadata["row_end"] != metadata.get("row"):
+                marker = f"[Sheet: {metadata['sheet']}, Rows: {metadata['row']}-{metadata['row_end']}]"
+            elif "sheet" in metadata and "row" in metadata:
+                marker = f"[Sheet: {metadata['sheet']}, Row: {metadata['row']}]"
+            elif "slide" in metadata:
+                marker = f"[Slide {metadata['slide']}]"
+            elif "paragraph_index" in metadata:
+                marker = f"[Para {metadata['paragraph_index']}]"
+            else:
+                marker = ""
+
+            formatted_parts.append(f"{marker}\n{page_content}")
+
+        return "\n\n".join(formatted_parts)
+
+    def count_pages(self, docs_dicts: list[dict]) -> int:
+        """估算解析结果的页数 (page/slide/sheet 去重计数，缺省为片段数)"""
+        locations = set()
+        for doc in docs_dicts:
+            metadata = doc.get("metadata", {})
+            for key in ("page", "slide", "page_estimate", "sheet"):
+                if key in metadata:
+                    locations.add((key, metadata[key]))
+                    break
+        return len(locations) or len(docs_dicts)
+
+    def render_marked_text(self, content: str) -> str:
+        """兼容旧数据：从 content JSON 现场渲染 (新数据应直接读取 rendered_content)"""
+        try:
+            docs_data = json.loads(content)
+        except (json.JSONDecodeError, TypeError):
+            return content
+        if not isinstance(docs_data, list):
+            return str(docs_data)
+        return self.render_docs(docs_data)
+
+    def get_rendered_contents(self, file_hashes: list[str]) -> dict[str, str]:
+        """批量获取文件的渲染文本 {file_hash: text}，用于附件引用的按需展开"""
+        if not file_hashes:
+            return {}
+        with Session(engine) as session:
+            stmt = select(FileParsingCache.file_hash, FileParsingCache.rendered_content).where(
+                FileParsingCache.file_hash.in_(file_hashes)
+            )
+            contents = dict(session.exec(stmt).all())
+
+            # 尚未回填 rendered_content 的旧记录，回退到现场渲染
+            legacy = [h for h, text in contents.items() if text is None]
+            if legacy:
+                stmt = select(FileParsingCache.file_hash, FileParsingCache.content).where(
+                    FileParsingCache.file_hash.in_(legacy)
+                )
+                for file_hash, content in session.exec(stmt):
+                    contents[file_hash] = self.render_marked_text(content)
+        return contents
+
+    def _is_parsed(self, file_record: FileParsingCache) -> bool:
+        """记录是否已有解析结果 (排队或解析失败的记录只有 content 占位)"""
+        return file_record.rendered_content is not None or file_record.content != UNPARSED_CONTENT
+
+    def _upload_path(self, file_record: FileParsingCache) -> Path | None:
+        """上传文件的落盘路径 (知识库目录中的文件不在此处，返回 None)"""
+        path = self.upload_dir / f"{file_record.file_hash}{file_record.file_type}"
+        return path if path.exists() else None
+
+    def _queue_parse(
+        self, file_record: FileParsingCache, file_path: Path, session: Session, user_id: str | None, priority: int
+    ) -> Job:
+        """将记录置为 PARSING 并排入解析任务 (随 session 一起提交)"""
+        file_record.status = FileStatus.PARSING
+        file_record.error_message = None
+        session.add(file_record)
+        return job_queue.enqueue(
+            JobKind.PARSE, file_record.file_hash, {"path": str(file_path), "user_id": user_id}, priority, session
+        )
+
+    def queue_indexing(
+        self,
+        file_hash: str,
+        session: Session,
+        source_path: Path | None = None,
+        user_id: str | None = None,
+        priority: int = PRIORITY_SYNC,
+    ) -> Job:
+        """已解析的文件排入索引：源文件旁有匹配的向量快照时直接载入，否则重新 Embedding"""
+        snapshot_dir = self._matching_snapshot(source_path, file_hash) if source_path else None
+        if snapshot_dir:
+            return job_queue.enqueue(
+                JobKind.SNAPSHOT, file_hash, {"snapshot_dir": str(snapshot_dir)}, priority, session
+            )
+        return job_queue.enqueue(JobKind.INDEX, file_hash, {"user_id": user_id}, priority, session)
+
+    async def parse_document_task(
+        self, file_hash: str, file_path: Path, user_id: str | None = None, priority: int = PRIORITY_SYNC
+    ):
+        """
+        [队列任务] 解析文件并写入缓存表，完成后排入索引任务
+        """
+        with Session(engine) as session:
+            file_record = session.get(FileParsingCache, file_hash)
+            if not file_record:
+                return
+
+            try:
+                file_record.status = FileStatus.PARSING
+                session.add(file_record)
+                session.commit()
+
+                logger.info(f"Scanning file: {file_record.filename}")
+                docs = await parse_file(file_path)
+                logger.info(f"Parsed {len(docs)} documents from {file_record.filename}")
+
+                docs_dicts = self._serialize_docs(docs)
+                file_record.content = json.dumps(docs_dicts, ensure_ascii=False)
+                # 解析时一次性生成 LLM 可用的标记文本，请求路径无需再解码 JSON
+                file_record.rendered_content = self.render_docs(docs_dicts)
+                file_record.page_count = self.count_pages(docs_dicts)
+                file_record.status = FileStatus.PENDING
+                file_record.error_message = None
+                session.add(file_record)
+                logger.info(f"Serialized content size: {len(file_record.content)} chars")
+
+                # 解析结果与索引任务同一事务提交，不会出现已解析却无人索引的记录
+                self.queue_indexing(file_hash, session, file_path, user_id, priority)
+                session.commit()
+                # 解析完成前读取到的内容 (如重新解析前的旧结果) 不再有效
+                UPLOAD_CACHE.pop(file_hash)
+
+            except Exception as e:
+                logger.exception(f"Parse failed for {file_hash}")
+                file_record.status = FileStatus.FAILED
+                file_record.error_message = str(e)
+                session.add(file_record)
+                session.commit()
+                raise
+
+    async def _run_parse_job(self, job: Job):
+        payload = json.loads(job.payload)
+        await self.parse_document_task(job.file_hash, Path(payload["path"]), payload.get("user_id"), job.priority)
+
+    async def _run_index_job(self, job: Job):
+        await self.index_document_task(job.file_hash, json.loads(job.payload).get("user_id"))
+
+    async def _run_snapshot_job(self, job: Job):
+        await self.import_snapshot_task(job.file_hash, Path(json.loads(job.payload)["snapshot_dir"]))
+
     async def index_document_task(self, file_hash: str, user_id: str | None = None):
         """
-        [异步背景任务] 执行向量索引
+        [队列任务] 执行向量索引 (失败时记录错误并抛出，由任务队列退避重试)
         """
         with Session(engine) as session:
             file_record = session.get(FileParsingCache, file_hash)
@@ -78,8 +269,27 @@ class DocumentService:
                     doc.metadata["file_hash"] = file_hash
                     doc.metadata["filename"] = file_record.filename
 
-                # 存入向量库
-                vector_store.add_documents(documents, user_id=user_id)
+                # 确定性 ID：同一文件同一片段总是写入同一个 point，续传时重写是幂等的
+                ids = [str(uuid5(NAMESPACE_URL, f"{file_hash}:{idx}")) for idx in range(len(documents))]
+
+                # 切分结果与上次一致时，从已提交水位处续传
+                start = file_record.indexed_chunks if file_record.chunk_count == len(documents) else 0
+                if start:
+                    logger.info(f"Resuming indexing of {file_record.filename} from chunk {start}/{len(documents)}")
+                file_record.chunk_count = len(documents)
+                file_record.indexed_chunks = start
+                session.add(file_record)
+                session.commit()
+
+                def _save_progress(committed: int, total: int):
+                    file_record.indexed_chunks = committed
+                    session.add(file_record)
+                    session.commit()
+
+                # 分批并发写入向量库
+                await indexing_pipeline.run(
+                    vector_store, documents, ids, user_id=user_id, start=start, on_progress=_save_progress
+                )
                 # 更新状态：完成
                 file_record.status = FileStatus.COMPLETED
                 file_record.indexed = True  # 保持兼容性
@@ -94,83 +304,254 @@ class DocumentService:
                 file_record.error_message = str(e)
                 session.add(file_record)
                 session.commit()
+                raise
 
-    async def process_file(self, file: UploadFile, user_id: str | None = None, background_tasks=None) -> dict:
-        temp_path = self.upload_dir / f"temp_{file.filename}"
-        try:
-            with temp_path.open("wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+    async def import_snapshot_task(self, file_hash: str, snapshot_dir: Path):
+        """
+        [队列任务] 直接载入预先计算好的向量快照，省去重新 Embedding；失败时回退到常规索引
+        """
+        with Session(engine) as session:
+            file_record = session.get(FileParsingCache, file_hash)
+            if not file_record:
+                return
 
-            file_hash = self._calculate_hash(temp_path)
-            final_path = self.upload_dir / f"{file_hash}{Path(file.filename).suffix}"
+            try:
+                file_record.status = FileStatus.INDEXING
+                session.add(file_record)
+                session.commit()
 
-            with Session(engine) as session:
-                cached_file = session.get(FileParsingCache, file_hash)
+                logger.info(f"Loading embedding snapshot for {file_record.filename}...")
+                count = await asyncio.to_thread(import_snapshot, vector_store, snapshot_dir)
 
-                if cached_file:
-                    temp_path.unlink()
-                    content = cached_file.content
-                else:
-                    logger.info(f"Scanning file: {file.filename}")
-                    try:
-                        docs = await parse_file(temp_path)
-                        logger.info(f"Parsed {len(docs)} documents from {file.filename}")
-
-                        # 序列化兼容性处理 (Pydantic V1/V2)
-                        docs_dicts = []
-                        for d in docs:
-                            if hasattr(d, "model_dump"):
-                                docs_dicts.append(d.model_dump())
-                            elif hasattr(d, "dict"):
-                                docs_dicts.append(d.dict())
-                            else:
-                                docs_dicts.append({"page_content": d.page_content, "metadata": d.metadata})
-
-                        content = json.dumps(docs_dicts, ensure_ascii=False)
-                        logger.info(f"Serialized content size: {len(content)} chars")
-
-                    except Exception as e:
-                        logger.exception(f"Failed to process file {file.filename}")
-                        raise e
+                file_record.chunk_count = count
+                file_record.indexed_chunks = count
+                file_record.status = FileStatus.COMPLETED
+                file_record.indexed = True  # 保持兼容性
+                file_record.error_message = None
+                session.add(file_record)
+                session.commit()
+                logger.info(f"File {file_hash} indexed from snapshot ({count} chunks).")
+                return
+            except Exception:
+                logger.exception(f"Snapshot import failed for {file_hash}, falling back to re-embedding")
+
+        await self.index_document_task(file_hash)
+
+    def _matching_snapshot(self, file_path: Path, file_hash: str) -> Path | None:
+        """返回与文件内容、当前 Embedding 模型和集合维度一致的快照目录"""
+        snapshot_dir = snapshot_dir_for(file_path)
+        manifest = read_manifest(snapshot_dir)
+        if manifest is None:
+            return None
+        vector_store.initialize()
+        embeddings = vector_store.embeddings
+        if manifest_matches(manifest, file_hash, embeddings.model, embeddings.dimensions):
+            return snapshot_dir
+        logger.info(f"Snapshot {snapshot_dir.name} does not match the file or embedding settings, re-embedding")
+        return None
+
+    async def _save_upload(self, file: UploadFile, path: Path) -> tuple[str, int]:
+        """
+        单遍流式保存上传文件：按大块读取，边写盘 (aiofiles) 边增量计算 SHA-256，
+        超过 UPLOAD_MAX_BYTES 立即中止。返回 (文件哈希, 字节数)。
+        """
+        limit = settings.UPLOAD_MAX_BYTES
+        if file.size is not None and file.size > limit:
+            raise UploadTooLargeError(f"File exceeds the {limit // (1024 * 1024)} MB upload limit")
 
-                    cached_file = FileParsingCache(
-                        file_hash=file_hash,
-                        filename=file.filename,
-                        content=content,
-                        file_type=Path(file.filename).suffix,
-                        file_size=temp_path.stat().st_size,
-                        status=FileStatus.PENDING,
-                        indexed=False,
-                        user_id=user_id,
-                    )
-                    session.add(cached_file)
-                    session.commit()
+        sha256_hash = hashlib.sha256()
+        size = 0
+        async with aiofiles.open(path, "wb") as buffer:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLargeError(f"File exceeds the {limit // (1024 * 1024)} MB upload limit")
+                sha256_hash.update(chunk)
+                await buffer.write(chunk)
+        return sha256_hash.hexdigest(), size
+
+    async def _coalesce(self, file_hash: str, factory: Callable[[], Awaitable[dict]]) -> tuple[dict, bool]:
+        """
+        按文件哈希合并进行中的解析 (singleflight)：同一哈希只有第一个请求执行 factory，
+        并发到达的请求等待同一个 Future 并共享结果 (或异常)。返回 (结果, 是否为共享结果)。
+        首个请求被取消 (如客户端断开) 时，等待方不随之取消，而是重新查找，其中一个成为新的执行者。
+        """
+        while inflight := self._inflight.get(file_hash):
+            logger.info(f"Joining in-flight parse of {file_hash[:12]}")
+            try:
+                # shield：某个等待方被取消时不影响首个请求与其他等待方
+                return await asyncio.shield(inflight), True
+            except asyncio.CancelledError:
+                # 等待方自身被取消时照常传播
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                logger.info(f"In-flight parse of {file_hash[:12]} was cancelled, retrying")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[file_hash] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 标记已读取，无等待方时不产生 "never retrieved" 警告
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._inflight[file_hash]
 
-                    if not final_path.exists():
-                        shutil.move(temp_path, final_path)
-                    else:
-                        temp_path.unlink()
-
-                # 无论是否命中缓存，如果状态不是 COMPLETED，都可以尝试加入索引队列
-                if cached_file.status in [FileStatus.PENDING, FileStatus.FAILED] and background_tasks:
-                    background_tasks.add_task(self.index_document_task, file_hash, user_id)
-
-                UPLOAD_CACHE[file_hash] = {
-                    "content": content,
-                    "filename": file.filename,
-                    "path": final_path,
-                }
-                return {
-                    "filename": file.filename,
-                    "status": "success",
-                    "message": "File processed and queued for indexing",
-                    "file_hash": file_hash,
-                }
+    async def _load_or_enqueue(
+        self, file_hash: str, temp_path: Path, filename: str, file_size: int, user_id: str | None
+    ) -> dict:
+        """
+        命中 FileParsingCache 则直接复用 (未索引的排入索引)，否则登记记录并排入解析任务后立即返回，
+        不等待解析。返回上传缓存所需的字段 (未解析时 rendered 为 None)。
+        """
+        final_path = self.upload_dir / f"{file_hash}{temp_path.suffix}"
+        with Session(engine) as session:
+            cached_file = session.get(FileParsingCache, file_hash)
+
+            if cached_file is None:
+                cached_file = FileParsingCache(
+                    file_hash=file_hash,
+                    filename=filename,
+                    content=UNPARSED_CONTENT,
+                    file_type=temp_path.suffix,
+                    file_size=file_size,
+                    status=FileStatus.PARSING,
+                    indexed=False,
+                    user_id=user_id,
+                )
+                self._queue_parse(cached_file, final_path, session, user_id, PRIORITY_UPLOAD)
+            elif not self._is_parsed(cached_file):
+                # 此前解析失败 (或仍在排队)：用本次上传的文件重新解析，排队中的任务不会重复入队
+                self._queue_parse(cached_file, final_path, session, user_id, PRIORITY_UPLOAD)
+            elif cached_file.status in [FileStatus.PENDING, FileStatus.FAILED]:
+                # 重复上传：复用解析结果，未完成索引的重新排入索引
+                self.queue_indexing(file_hash, session, user_id=user_id, priority=PRIORITY_UPLOAD)
+
+            if cached_file.status == FileStatus.PARSING and not await aiofiles.os.path.exists(final_path):
+                # 先落盘再提交：worker 被唤醒时文件已就位 (同目录内重命名，不复制数据)
+                await aiofiles.os.replace(temp_path, final_path)
+            session.commit()
+
+            rendered = None
+            if self._is_parsed(cached_file):
+                rendered = cached_file.rendered_content or self.render_marked_text(cached_file.content)
+            return {
+                "rendered": rendered,
+                "path": final_path,
+                "size": cached_file.file_size,
+                "page_count": cached_file.page_count,
+                "status": cached_file.status,
+            }
+
+    async def process_file(self, file: UploadFile, user_id: str | None = None) -> dict:
+        """保存并哈希上传文件后立即返回，解析与索引由任务队列在后台完成"""
+        suffix = Path(file.filename).suffix
+        # 临时文件名唯一，避免同名文件并发上传互相覆盖；保留后缀供解析器分发
+        temp_path = self.upload_dir / f"temp_{uuid4().hex}{suffix}"
+        try:
+            file_hash, file_size = await self._save_upload(file, temp_path)
+            # 同一文件的并发上传只登记、入队一次 (由首个请求负责)
+            record, _ = await self._coalesce(
+                file_hash, lambda: self._load_or_enqueue(file_hash, temp_path, file.filename, file_size, user_id)
+            )
+
+            if record["rendered"] is None:
+                message = "File queued for parsing and indexing"
+            else:
+                message = "File processed and queued for indexing"
+                UPLOAD_CACHE.set(
+                    file_hash,
+                    {
+                        "content": record["rendered"],
+                        "filename": file.filename,
+                        "path": record["path"],
+                        "size": record["size"],
+                        "page_count": record["page_count"],
+                    },
+                )
+            return {
+                "filename": file.filename,
+                "status": "success",
+                "message": message,
+                "file_hash": file_hash,
+            }
 
         finally:
-            file.file.close()
-            if temp_path.exists():
-                temp_path.unlink()
+            await file.close()
+            if await aiofiles.os.path.exists(temp_path):
+                await aiofiles.os.remove(temp_path)
+
+    def requeue(self, file_hash: str, user_id: str | None = None) -> bool:
+        """手动重新排队：未解析的重新解析 (需要上传文件仍在)，否则重新索引 (从上次提交的批次续传)"""
+        with Session(engine) as session:
+            file_record = session.get(FileParsingCache, file_hash)
+            if not file_record:
+                return False
+            if self._is_parsed(file_record):
+                self.queue_indexing(file_hash, session, user_id=user_id, priority=PRIORITY_UPLOAD)
+            elif upload_path := self._upload_path(file_record):
+                self._queue_parse(file_record, upload_path, session, user_id, PRIORITY_UPLOAD)
+            else:
+                return False
+            session.commit()
+            return True
+
+    def recover_stuck_files(self) -> int:
+        """
+        启动时恢复卡在 PARSING / INDEXING 且没有可恢复任务的文件 (如任务队列上线前中断的记录)，返回重新入队数量。
+        最近一次任务已失败的标记为 FAILED，不再自动重试。
+        """
+        requeued = 0
+        with Session(engine) as session:
+            stuck = session.exec(
+                select(FileParsingCache).where(FileParsingCache.status.in_([FileStatus.PARSING, FileStatus.INDEXING]))
+            ).all()
+            for file_record in stuck:
+                latest = job_queue.latest_job(file_record.file_hash)
+                if latest is not None and latest.status in ACTIVE_STATUSES:
+                    continue
+                if latest is not None and latest.status == JobStatus.FAILED:
+                    file_record.status = FileStatus.FAILED
+                    file_record.error_message = latest.last_error
+                elif self._is_parsed(file_record):
+                    self.queue_indexing(file_record.file_hash, session, user_id=file_record.user_id)
+                    requeued += 1
+                elif upload_path := self._upload_path(file_record):
+                    self._queue_parse(file_record, upload_path, session, file_record.user_id, PRIORITY_UPLOAD)
+                    requeued += 1
+                else:
+                    # 知识库文件的路径未持久化，重新同步即可
+                    file_record.status = FileStatus.FAILED
+                    file_record.error_message = "Interrupted before parsing; upload or sync the file again"
+                session.add(file_record)
+            session.commit()
+        if stuck:
+            logger.warning(f"Found {len(stuck)} files stuck in PARSING/INDEXING, requeued {requeued}")
+        return requeued
+
+    def _parsing_hashes(self, file_hashes: list[str]) -> list[str]:
+        with Session(engine) as session:
+            stmt = select(FileParsingCache.file_hash).where(
+                FileParsingCache.file_hash.in_(file_hashes), FileParsingCache.status == FileStatus.PARSING
+            )
+            return list(session.exec(stmt).all())
+
+    async def wait_until_parsed(self, file_hashes: list[str], timeout: float | None = None) -> list[str]:
+        """等待排队解析中的文件 (如对话引用刚上传的附件)，返回超时后仍未解析完成的文件"""
+        timeout = settings.ATTACHMENT_PARSE_WAIT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        pending = await asyncio.to_thread(self._parsing_hashes, file_hashes)
+        while pending and time.monotonic() < deadline:
+            await asyncio.sleep(min(settings.JOB_POLL_INTERVAL_SECONDS, max(0.0, deadline - time.monotonic())))
+            pending = await asyncio.to_thread(self._parsing_hashes, pending)
+        return pending
 
     def list_documents(self, user_id: str | None = None) -> list[FileParsingCache]:
         with Session(engine) as session:
@@ -188,7 +569,12 @@ class DocumentService:
                     logger.warning(f"Unauthorized delete attempt by {user_id} on file {file_hash}")
                     return False
 
-                if file_record.indexed or file_record.status == FileStatus.COMPLETED:
+                # 断点续传：失败或仍在索引中的文件也可能已写入部分向量 (indexed_chunks > 0)
+                if (
+                    file_record.indexed
+                    or file_record.indexed_chunks
+                    or file_record.status in (FileStatus.INDEXING, FileStatus.COMPLETED)
+                ):
                     vector_store.delete_by_metadata("file_hash", file_hash)
 
                 final_path = self.upload_dir / f"{file_hash}{file_record.file_type}"
@@ -197,11 +583,12 @@ class DocumentService:
 
                 session.delete(file_record)
                 session.commit()
+                UPLOAD_CACHE.pop(file_hash)
                 return True
         return False
 
-    async def sync_knowledge_base(self, background_tasks):
-        """扫描并异步索引"""
+    async def sync_knowledge_base(self):
+        """扫描知识库目录，新文件排入解析任务，未索引的排入索引任务"""
         kb_dir = Path("knowledge_base")
         if not kb_dir.exists():
             kb_dir.mkdir(parents=True)
@@ -221,7 +608,19 @@ class DocumentService:
             ".jpg",
             ".jpeg",
         }
-        files = [f for f in kb_dir.glob("**/*") if f.is_file() and f.suffix.lower() in supported_extensions]
+        files = [
+            f
+            for f in kb_dir.glob("**/*")
+            if f.is_file()
+            and f.suffix.lower() in supported_extensions
+            # 向量快照目录 (*.snapshot/) 不是知识库文档
+            and not any(parent.suffix == ".snapshot" for parent in f.parents)
+        ]
+
+        # 绿色金融目录额外构建结构化索引 (行业代码 / 领域层级 / 名称)
+        catalog_path = kb_dir / settings.CATALOG_FILE_NAME
+        if catalog_path.exists():
+            catalog_index.build_from_file(catalog_path)
 
         results = []
         for file_path in files:
@@ -229,36 +628,28 @@ class DocumentService:
             with Session(engine) as session:
                 cached_file = session.get(FileParsingCache, file_hash)
                 if not cached_file:
-                    docs = await parse_file(file_path)
-
-                    # 统一序列化逻辑
-                    docs_dicts = []
-                    for d in docs:
-                        if hasattr(d, "model_dump"):
-                            docs_dicts.append(d.model_dump())
-                        elif hasattr(d, "dict"):
-                            docs_dicts.append(d.dict())
-                        else:
-                            docs_dicts.append({"page_content": d.page_content, "metadata": d.metadata})
-
-                    content = json.dumps(docs_dicts, ensure_ascii=False)
-
                     cached_file = FileParsingCache(
                         file_hash=file_hash,
                         filename=file_path.name,
-                        content=content,
+                        content=UNPARSED_CONTENT,
                         file_type=file_path.suffix,
                         file_size=file_path.stat().st_size,
-                        status=FileStatus.PENDING,
+                        status=FileStatus.PARSING,
                     )
-                    session.add(cached_file)
-                    session.commit()
 
-                if cached_file.status in [FileStatus.PENDING, FileStatus.FAILED]:
-                    background_tasks.add_task(self.index_document_task, file_hash)
-                    results.append(f"Queued: {file_path.name}")
+                if not self._is_parsed(cached_file):
+                    self._queue_parse(cached_file, file_path, session, None, PRIORITY_SYNC)
+                    results.append(f"Queued (parse): {file_path.name}")
+                elif cached_file.status in [FileStatus.PENDING, FileStatus.FAILED]:
+                    job = self.queue_indexing(file_hash, session, file_path)
+                    results.append(
+                        f"Queued (snapshot): {file_path.name}"
+                        if job.kind == JobKind.SNAPSHOT
+                        else f"Queued: {file_path.name}"
+                    )
                 else:
                     results.append(f"Skipped: {file_path.name}")
+                session.commit()
         return results
 
 
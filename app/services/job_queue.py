@@ -0,0 +1,308 @@
+import asyncio
+import contextlib
+import json
+import os
+import socket
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import event, update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logging import logger
+from app.models.job import Job, JobKind, JobStatus
+
+# 优先级：用户上传的文件先于知识库批量同步处理
+PRIORITY_UPLOAD = 10
+PRIORITY_SYNC = 0
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class JobQueue:
+    """
+    SQLite 持久化的任务队列：
+    - 入队即写库，进程崩溃或重启后任务不会丢失
+    - 固定数量的 worker 按优先级 (高者先) 与入队顺序领取，领取是带状态条件的 UPDATE，多进程共享同一数据库也不会重复执行
+    - 领取的任务带租约 (claimed_by / lease_until)，执行期间定期续期；只有租约过期 (持有进程已退出) 的 RUNNING 任务
+      才会被任一进程放回队列，不会重置其他存活进程正在执行的任务
+    - 失败后按指数退避重试，尝试次数用尽标记为 FAILED
+    同一文件同类任务排队或执行中时不重复入队。
+    """
+
+    def __init__(self, workers: int | None = None, poll_interval: float | None = None):
+        self.workers = max(1, workers or settings.JOB_WORKERS)
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL_SECONDS
+        self._handlers: dict[JobKind, JobHandler] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        # 租约持有者标识：同一主机的多个 uvicorn worker / 脚本进程互不相同
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+    def register(self, kind: JobKind, handler: JobHandler):
+        """注册任务处理函数 (抛出异常即视为失败，按退避策略重试)"""
+        self._handlers[kind] = handler
+
+    def enqueue(
+        self,
+        kind: JobKind,
+        file_hash: str,
+        payload: dict | None = None,
+        priority: int = 0,
+        session: Session | None = None,
+    ) -> Job:
+        """
+        任务入队并唤醒 worker。传入 session 时只加入该事务 (与业务记录一起提交，提交后唤醒)，
+        否则独立提交。同一文件同类任务已在排队或执行时直接返回该任务 (排队中的按更高优先级提升)。
+        """
+        if session is None:
+            with Session(engine, expire_on_commit=False) as own_session:
+                job = self.enqueue(kind, file_hash, payload, priority, session=own_session)
+                own_session.commit()
+                return job
+
+        active = session.exec(
+            select(Job).where(Job.kind == kind, Job.file_hash == file_hash, Job.status.in_(ACTIVE_STATUSES))
+        ).first()
+        if active is not None:
+            if active.status == JobStatus.QUEUED and priority > active.priority:
+                active.priority = priority
+                active.updated_at = datetime.now()
+                session.add(active)
+            return active
+
+        job = Job(
+            kind=kind,
+            file_hash=file_hash,
+            payload=json.dumps(payload or {}, ensure_ascii=False),
+            priority=priority,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+        )
+        session.add(job)
+        event.listen(session, "after_commit", lambda _: self.notify(), once=True)
+        logger.info(f"[JobQueue] Queued {kind.value} for {file_hash[:12]} (priority={priority})")
+        return job
+
+    def notify(self):
+        """唤醒空闲的 worker (可在任意线程调用，队列未启动时忽略)"""
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def active_job(self, file_hash: str) -> Job | None:
+        """文件当前排队或执行中的任务"""
+        with Session(engine) as session:
+            return session.exec(
+                select(Job).where(Job.file_hash == file_hash, Job.status.in_(ACTIVE_STATUSES)).order_by(Job.id.desc())
+            ).first()
+
+    def latest_job(self, file_hash: str) -> Job | None:
+        """文件最近一次入队的任务 (任意状态)"""
+        with Session(engine) as session:
+            return session.exec(select(Job).where(Job.file_hash == file_hash).order_by(Job.id.desc())).first()
+
+    def backoff(self, attempts: int) -> float:
+        """第 attempts 次失败后的重试等待秒数"""
+        return min(settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX_SECONDS)
+
+    def recover(self) -> int:
+        """
+        将租约已过期 (持有进程崩溃或被杀) 的 RUNNING 任务放回队列，返回恢复数量。
+        已用尽尝试次数的不再执行 (可能正是它导致了进程崩溃)，直接标记为 FAILED。
+        """
+        now = datetime.now()
+        recovered = 0
+        with Session(engine) as session:
+            expired = (Job.lease_until.is_(None)) | (Job.lease_until < now)
+            jobs = session.exec(select(Job).where(Job.status == JobStatus.RUNNING, expired)).all()
+            for job in jobs:
+                if job.attempts >= job.max_attempts:
+                    values = {
+                        "status": JobStatus.FAILED,
+                        "last_error": job.last_error or "Interrupted (process exited while running)",
+                    }
+                else:
+                    values = {"status": JobStatus.QUEUED, "available_at": now}
+                # 条件更新：读取之后被续期 (持有进程仍存活) 的任务保持不变
+                recovered += session.execute(
+                    update(Job)
+                    .where(Job.id == job.id, Job.status == JobStatus.RUNNING, expired)
+                    .values(claimed_by=None, lease_until=None, updated_at=now, **values)
+                ).rowcount
+            session.commit()
+        if recovered:
+            logger.warning(f"[JobQueue] Recovered {recovered} interrupted jobs")
+        return recovered
+
+    def _lease_until(self) -> datetime:
+        return datetime.now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+    def _renew(self, job: Job) -> bool:
+        """续期租约，返回是否仍持有该任务"""
+        with Session(engine) as session:
+            renewed = session.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == JobStatus.RUNNING, Job.claimed_by == self.owner)
+                .values(lease_until=self._lease_until())
+            ).rowcount
+            session.commit()
+        return bool(renewed)
+
+    async def _heartbeat(self, job: Job):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            try:
+                if not await asyncio.to_thread(self._renew, job):
+                    logger.warning(f"[JobQueue] Lost the lease on job #{job.id}; its result will be discarded")
+                    return
+            except Exception as e:
+                logger.warning(f"[JobQueue] Failed to renew the lease on job #{job.id}: {e}")
+
+    def _claim(self) -> Job | None:
+        """领取一个到期的最高优先级任务 (条件 UPDATE 保证同一任务只被领取一次)"""
+        with Session(engine, expire_on_commit=False) as session:
+            while True:
+                now = datetime.now()
+                job = session.exec(
+                    select(Job)
+                    .where(Job.status == JobStatus.QUEUED, Job.available_at <= now)
+                    .order_by(Job.priority.desc(), Job.id)
+                    .limit(1)
+                ).first()
+                if job is None:
+                    return None
+                claimed = session.execute(
+                    update(Job)
+                    .where(Job.id == job.id, Job.status == JobStatus.QUEUED)
+                    .values(
+                        status=JobStatus.RUNNING,
+                        attempts=Job.attempts + 1,
+                        claimed_by=self.owner,
+                        lease_until=self._lease_until(),
+                        updated_at=now,
+                    )
+                ).rowcount
+                session.commit()
+                if claimed:
+                    session.refresh(job)
+                    return job
+                # 被其他 worker 抢先领取，继续找下一个
+
+    def _finish(self, job: Job, error: BaseException | None = None, release: bool = False):
+        """记录执行结果：成功、失败 (退避后重试或标记 FAILED) 或退还 (停机中断，不计尝试次数)"""
+        now = datetime.now()
+        with Session(engine) as session:
+            record = session.get(Job, job.id)
+            if record is None:
+                return
+            if record.status != JobStatus.RUNNING or record.claimed_by != self.owner:
+                # 租约已过期并被回收 (可能已由其他进程重新执行)，本次结果作废
+                logger.warning(f"[JobQueue] Job #{job.id} is no longer held by this process, dropping its result")
+                return
+            record.claimed_by = None
+            record.lease_until = None
+            if release:
+                record.status = JobStatus.QUEUED
+                record.attempts = max(0, record.attempts - 1)
+            elif error is None:
+                record.status = JobStatus.SUCCEEDED
+                record.last_error = None
+            else:
+                record.last_error = f"{type(error).__name__}: {error}"
+                if record.attempts < record.max_attempts:
+                    delay = self.backoff(record.attempts)
+                    record.status = JobStatus.QUEUED
+                    record.available_at = now + timedelta(seconds=delay)
+                    logger.warning(
+                        f"[JobQueue] {record.kind.value} {record.file_hash[:12]} failed "
+                        f"(attempt {record.attempts}/{record.max_attempts}), retrying in {delay:.0f}s: {error}"
+                    )
+                else:
+                    record.status = JobStatus.FAILED
+                    logger.error(
+                        f"[JobQueue] {record.kind.value} {record.file_hash[:12]} failed after {record.attempts} attempts: {error}"
+                    )
+            record.updated_at = now
+            session.add(record)
+            session.commit()
+
+    async def run_job(self, job: Job):
+        handler = self._handlers.get(job.kind)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {job.kind}")
+            await handler(job)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self._finish, job, release=True)
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self._finish, job, e)
+        else:
+            await asyncio.to_thread(self._finish, job)
+        finally:
+            heartbeat.cancel()
+
+    async def run_pending(self) -> int:
+        """在当前协程中依次执行所有到期任务，返回执行数量 (脚本与测试使用，不需要启动 worker)"""
+        count = 0
+        while job := await asyncio.to_thread(self._claim):
+            await self.run_job(job)
+            count += 1
+        return count
+
+    async def _worker(self, index: int):
+        while True:
+            # 先清除再领取：领取之后到达的入队通知不会丢失
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.error(f"[JobQueue] Worker {index} failed to claim a job: {e}")
+                job = None
+            if job is None:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                continue
+            logger.info(f"[JobQueue] Worker {index} running {job.kind.value} {job.file_hash[:12]} (#{job.id})")
+            try:
+                await self.run_job(job)
+            except Exception as e:
+                # 结果未能写回 (如数据库被锁)：任务保持 RUNNING，租约过期后被回收
+                logger.error(f"[JobQueue] Worker {index} failed to record job #{job.id}: {e}")
+
+    async def _reaper(self):
+        """定期回收租约过期的任务 (其他进程崩溃时无需等到本进程重启)"""
+        while True:
+            try:
+                if await asyncio.to_thread(self.recover):
+                    self.notify()
+            except Exception as e:
+                logger.error(f"[JobQueue] Failed to recover expired jobs: {e}")
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS)
+
+    async def start(self):
+        """启动 worker 与过期租约回收"""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i), name=f"job-worker-{i}") for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper(), name="job-reaper"))
+        logger.info(f"[JobQueue] Started {self.workers} workers")
+
+    async def stop(self):
+        """停止 worker，执行中的任务退回队列，下次启动继续"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop = self._wakeup = None
+
+
+job_queue = JobQueue()
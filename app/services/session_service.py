@@ -1,12 +1,15 @@
 import json
+from datetime import datetime
 from uuid import uuid4
 
 from langchain_core.messages import AIMessage, HumanMessage
+from sqlalchemy import String, delete, func, insert, literal, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session, select
 
 from app.core.db import engine
 from app.core.logging import logger
-from app.models.session import ChatSession
+from app.models.session import ChatMessage, ChatSession
 
 
 class SessionService:
@@ -27,6 +30,7 @@ class SessionService:
                 # 权限检查
                 if user_id and chat_session.user_id and chat_session.user_id != user_id:
                     return False
+                session.execute(delete(ChatMessage).where(ChatMessage.session_id == session_id))
                 session.delete(chat_session)
                 session.commit()
                 return True
@@ -42,6 +46,7 @@ class SessionService:
             statement = select(ChatSession).where(ChatSession.user_id == user_id)
             results = session.exec(statement)
             for chat_session in results:
+                session.execute(delete(ChatMessage).where(ChatMessage.session_id == chat_session.id))
                 session.delete(chat_session)
             session.commit()
             return True
@@ -55,8 +60,17 @@ class SessionService:
             session.refresh(new_session)
             return new_session
 
-    def get_session(self, session_id: str, user_id: str | None = None) -> dict | None:
-        """获取会话详情并确保 history 是解析后的对象"""
+    def get_session(
+        self,
+        session_id: str,
+        user_id: str | None = None,
+        include_history: bool = True,
+        expand_attachments: bool = False,
+    ) -> dict | None:
+        """
+        获取会话详情，history 由 chat_messages 表按顺序组装。
+        附件默认只返回引用 {hash, name, size, page_count}，expand_attachments=True 时按需补全正文。
+        """
         with Session(engine) as session:
             chat_session = session.get(ChatSession, session_id)
             if not chat_session:
@@ -66,36 +80,56 @@ class SessionService:
             if user_id and chat_session.user_id and chat_session.user_id != user_id:
                 return None
 
-            # 将 SQLModel 对象转为字典，并手动处理 history
-            data = chat_session.model_dump()
-            if isinstance(data["history"], str):
-                try:
-                    data["history"] = json.loads(data["history"])
-                except Exception:
-                    data["history"] = []
+            data = chat_session.model_dump(exclude={"history"})
+            if include_history:
+                statement = select(ChatMessage).where(ChatMessage.session_id == session_id).order_by(ChatMessage.seq)
+                data["history"] = [self._to_dict(msg) for msg in session.exec(statement)]
+                self._resolve_attachments(data["history"], expand=expand_attachments)
             return data
 
-    def get_chat_history(self, session_id: str, limit: int = 10) -> list:
-        """获取 LangChain 格式的最近历史记录"""
-        session_data = self.get_session(session_id)
-        if not session_data or not session_data.get("history"):
+    def count_messages(self, session_id: str) -> int:
+        """统计会话消息数 (走 session_id+seq 索引)"""
+        with Session(engine) as session:
+            statement = select(func.count()).select_from(ChatMessage).where(ChatMessage.session_id == session_id)
+            return session.exec(statement).one()
+
+    def get_history_window(self, session_id: str, limit: int = 10, cache: dict | None = None) -> list[dict]:
+        """
+        获取最近 limit 条消息的 role/content 窗口，不读取附件与思维链字段。
+        传入 cache (单次图运行内共享的字典) 时，同一会话的重复读取直接命中内存。
+        """
+        if limit <= 0:
             return []
 
-        try:
-            # get_session 已经处理过 json.loads 了，这里直接用
-            raw_history = session_data["history"]
-            recent_history = raw_history[-limit:]
-
-            messages = []
-            for msg in recent_history:
-                if msg["role"] == "user":
-                    messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    messages.append(AIMessage(content=msg["content"]))
-            return messages
-        except Exception as e:
-            logger.error(f"Error parsing history for session {session_id}: {e}")
-            return []
+        if cache is not None and session_id in cache:
+            fetched_limit, window = cache[session_id]
+            # 已缓存窗口足够大，或者已经覆盖了全部历史
+            if fetched_limit >= limit or len(window) < fetched_limit:
+                return window[-limit:]
+
+        with Session(engine) as session:
+            statement = (
+                select(ChatMessage.role, ChatMessage.content)
+                .where(ChatMessage.session_id == session_id)
+                .order_by(ChatMessage.seq.desc())
+                .limit(limit)
+            )
+            rows = list(session.exec(statement).all())
+
+        window = [{"role": role, "content": content} for role, content in reversed(rows)]
+        if cache is not None:
+            cache[session_id] = (limit, window)
+        return window
+
+    def get_chat_history(self, session_id: str, limit: int = 10, cache: dict | None = None) -> list:
+        """获取 LangChain 格式的最近历史记录"""
+        messages = []
+        for msg in self.get_history_window(session_id, limit=limit, cache=cache):
+            if msg["role"] == "user":
+                messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                messages.append(AIMessage(content=msg["content"]))
+        return messages
 
     def append_message(
         self,
@@ -106,27 +140,34 @@ class SessionService:
         thought_process: list = None,
         user_id: str | None = None,
     ):
-        """追加消息到历史记录"""
+        """
+        追加一条消息 (仅插入新行，不重写历史)。
+        seq 在同一条 INSERT ... SELECT 中计算，同一会话的并发追加 (如流式写入与重试) 不会取到相同的序号；
+        会话行不存在时以 INSERT OR IGNORE 创建，并发创建同样安全。
+        """
+        now = datetime.now()
         with Session(engine) as session:
-            chat_session = session.get(ChatSession, session_id)
-            if not chat_session:
-                chat_session = ChatSession(id=session_id, title="新对话", history="[]", user_id=user_id)
-                session.add(chat_session)
-
-            try:
-                history = json.loads(chat_session.history)
-            except Exception:
-                history = []
-
-            msg_obj = {"role": role, "content": content}
-            if attachments:
-                msg_obj["attachments"] = attachments
-            if thought_process:
-                msg_obj["thought_process"] = thought_process
-
-            history.append(msg_obj)
-            chat_session.history = json.dumps(history, ensure_ascii=False)
-            session.add(chat_session)
+            session.execute(
+                sqlite_insert(ChatSession)
+                .values(id=session_id, title="新对话", history="[]", user_id=user_id, created_at=now, updated_at=now)
+                .on_conflict_do_nothing(index_elements=["id"])
+            )
+
+            next_seq = select(
+                literal(session_id),
+                func.coalesce(func.max(ChatMessage.seq) + 1, 0),
+                literal(role),
+                literal(content),
+                literal(json.dumps(attachments, ensure_ascii=False) if attachments else None, String),
+                literal(json.dumps(thought_process, ensure_ascii=False) if thought_process else None, String),
+                literal(now),
+            ).where(ChatMessage.session_id == session_id)
+            session.execute(
+                insert(ChatMessage).from_select(
+                    ["session_id", "seq", "role", "content", "attachments", "thought_process", "created_at"], next_seq
+                )
+            )
+            session.execute(update(ChatSession).where(ChatSession.id == session_id).values(updated_at=now))
             session.commit()
 
     def update_title(self, session_id: str, title: str):
@@ -138,5 +179,38 @@ class SessionService:
                 session.add(chat_session)
                 session.commit()
 
+    @staticmethod
+    def _resolve_attachments(history: list[dict], expand: bool):
+        """剥离旧数据中内联的附件正文，或在需要时通过 FileParsingCache 批量展开"""
+        attachments = [att for msg in history for att in msg.get("attachments", []) if isinstance(att, dict)]
+        if not attachments:
+            return
+
+        if not expand:
+            for att in attachments:
+                att.pop("content", None)
+            return
+
+        from app.services.document_service import document_service
+
+        contents = document_service.get_rendered_contents(list({att["hash"] for att in attachments if "hash" in att}))
+        for att in attachments:
+            if att.get("hash") in contents:
+                att["content"] = contents[att["hash"]]
+
+    @staticmethod
+    def _to_dict(msg: ChatMessage) -> dict:
+        """将消息行还原为前端使用的字典结构"""
+        msg_obj = {"role": msg.role, "content": msg.content}
+        for field in ("attachments", "thought_process"):
+            raw = getattr(msg, field)
+            if not raw:
+                continue
+            try:
+                msg_obj[field] = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning(f"Corrupted {field} in message {msg.id} of session {msg.session_id}")
+        return msg_obj
+
 
 session_service = SessionService()
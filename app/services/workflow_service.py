@@ -1,17 +1,19 @@
+import asyncio
 import json
 from collections.abc import AsyncGenerator
 from typing import Any
 
-from langgraph.checkpoint.memory import MemorySaver
-from sqlmodel import Session
+from sqlmodel import Session, select
 
 from app.agents.summarizer import summarizer_agent
+from app.core.config import settings
 from app.core.db import engine
 from app.core.logging import logger
+from app.graph.checkpointer import RetentionSqliteSaver
 from app.graph.definitions import create_base_graph
 from app.models.file import FileParsingCache
 from app.schemas.chat import ChatRequest
-from app.services.document_service import UPLOAD_CACHE
+from app.services.document_service import UNPARSED_CONTENT, UPLOAD_CACHE, document_service
 from app.services.session_service import session_service
 
 
@@ -26,57 +28,84 @@ class WorkflowService:
     }
 
     def __init__(self):
-        self._memory = MemorySaver()
-        self._graph = create_base_graph().compile(checkpointer=self._memory)
+        # AsyncSqliteSaver 需要在事件循环内创建连接，因此图在首次请求时延迟编译
+        self._checkpointer: RetentionSqliteSaver | None = None
+        self._graph = None
+        self._init_lock = asyncio.Lock()
+
+    async def _get_graph(self):
+        """获取编译后的图 (绑定持久化的 SQLite checkpointer)"""
+        if self._graph is None:
+            async with self._init_lock:
+                if self._graph is None:
+                    self._checkpointer = await RetentionSqliteSaver.open(
+                        settings.CHECKPOINT_DB_PATH, max_per_thread=settings.CHECKPOINT_MAX_PER_THREAD
+                    )
+                    self._graph = create_base_graph().compile(checkpointer=self._checkpointer)
+        return self._graph
+
+    async def delete_thread(self, thread_id: str):
+        """删除会话对应的全部 checkpoint"""
+        await self._get_graph()
+        if self._checkpointer:
+            await self._checkpointer.adelete_thread(thread_id)
+
+    async def aclose(self):
+        """关闭 checkpointer 连接 (应用退出时调用)"""
+        if self._checkpointer:
+            await self._checkpointer.aclose()
+            self._checkpointer = None
+            self._graph = None
+
+    def _load_file_contents(self, file_hashes: list[str]) -> dict[str, dict]:
+        """[同步] 一次 IN 查询批量读取预渲染文本 (不加载原始 JSON)，跳过尚无解析结果的文件"""
+        parsed = FileParsingCache.rendered_content.is_not(None) | (FileParsingCache.content != UNPARSED_CONTENT)
+        with Session(engine) as session:
+            stmt = select(
+                FileParsingCache.file_hash,
+                FileParsingCache.filename,
+                FileParsingCache.file_size,
+                FileParsingCache.page_count,
+                FileParsingCache.rendered_content,
+            ).where(FileParsingCache.file_hash.in_(file_hashes), parsed)
+            rows = session.exec(stmt).all()
+
+        # 解析失败等待重试 (FAILED) 的文件只有 content 占位，不能当作空文档回填缓存
+        results = {
+            file_hash: {"content": rendered, "filename": filename, "size": file_size, "page_count": page_count}
+            for file_hash, filename, file_size, page_count, rendered in rows
+        }
 
-    async def _get_file_content(self, file_hash: str) -> dict | None:
-        """从缓存或数据库获取文件内容"""
-        # 1. 查内存
-        if file_hash in UPLOAD_CACHE:
-            return UPLOAD_CACHE[file_hash]
+        # 旧记录尚未回填 (见 scripts/backfill_rendered_content.py)，批量现场渲染
+        legacy = [h for h, data in results.items() if data["content"] is None]
+        if legacy:
+            rendered_map = document_service.get_rendered_contents(legacy)
+            for h in legacy:
+                results[h]["content"] = rendered_map.get(h, "")
+        return results
 
-        # 2. 查数据库
-        with Session(engine) as session:
-            file_record = session.get(FileParsingCache, file_hash)
-            if file_record:
-                content_str = file_record.content
-                try:
-                    docs_data = json.loads(content_str)
-                    if isinstance(docs_data, list):
-                        # 构建带结构化标记的文本，帮助 LLM 溯源
-                        formatted_parts = []
-                        for doc in docs_data:
-                            metadata = doc.get("metadata", {})
-                            page_content = doc.get("page_content", "")
-
-                            # 根据类型添加标记
-                            if "page" in metadata:
-                                marker = f"[Page {metadata['page']}]"
-                            elif "sheet" in metadata and "row" in metadata:
-                                marker = f"[Sheet: {metadata['sheet']}, Row: {metadata['row']}]"
-                            elif "slide" in metadata:
-                                marker = f"[Slide {metadata['slide']}]"
-                            elif "paragraph_index" in metadata:
-                                marker = f"[Para {metadata['paragraph_index']}]"
-                            else:
-                                marker = ""
-
-                            formatted_parts.append(f"{marker}\n{page_content}")
-
-                        parsed_content = "\n\n".join(formatted_parts)
-                    else:
-                        parsed_content = str(docs_data)
-                except (json.JSONDecodeError, TypeError):
-                    parsed_content = content_str
-
-                data = {
-                    "content": parsed_content,
-                    "filename": file_record.filename,
-                }
+    async def _get_file_contents(self, file_hashes: list[str]) -> dict[str, dict]:
+        """从缓存或数据库批量获取文件内容，数据库 I/O 放到线程中执行，不阻塞事件循环"""
+        # 1. 查内存
+        results, misses = {}, []
+        for h in dict.fromkeys(file_hashes):
+            cached = UPLOAD_CACHE.get(h)
+            if cached:
+                results[h] = cached
+            else:
+                misses.append(h)
+
+        # 2. 查数据库 (刚上传的文件可能仍在解析队列中，先等待解析完成)
+        if misses:
+            parsing = set(await document_service.wait_until_parsed(misses))
+            if parsing:
+                logger.warning(f"Attachments still parsing, skipped: {sorted(parsing)}")
+            fetched = await asyncio.to_thread(self._load_file_contents, [h for h in misses if h not in parsing])
+            for h, data in fetched.items():
                 # 回填缓存
-                UPLOAD_CACHE[file_hash] = data
-                return data
-        return None
+                UPLOAD_CACHE.set(h, data)
+                results[h] = data
+        return results
 
     async def process_stream(self, request: ChatRequest, user_id: str | None = None) -> AsyncGenerator[str, None]:
         user_input = request.message
@@ -88,19 +117,31 @@ class WorkflowService:
         # 1. 准备输入 (增加进度反馈)
         yield self._pack_event("status_update", {"text": "正在检索并准备文档上下文..."})
 
-        new_docs, file_names, attachments_data = [], [], []
-        for i, h in enumerate(file_hashes, 1):
-            yield self._pack_event("status_update", {"text": f"正在读取文档 ({i}/{len(file_hashes)})..."})
-            file_info = await self._get_file_content(h)
+        new_docs, file_names, attachments_data = {}, [], []
+        file_infos = {}
+        if file_hashes:
+            # 附件一次批量读取，只在读取前发出一条进度
+            yield self._pack_event("status_update", {"text": f"正在读取 {len(file_hashes)} 个文档..."})
+            file_infos = await self._get_file_contents(file_hashes)
+        for h in file_hashes:
+            file_info = file_infos.get(h)
             if file_info:
-                content = file_info["content"].strip()
-                new_docs.append(content)
+                new_docs[h] = file_info["content"].strip()
                 file_names.append(file_info["filename"])
-                attachments_data.append({"hash": h, "name": file_info["filename"], "content": content})
+                # 历史中只保存附件引用，正文通过 FileParsingCache 按需解析
+                attachments_data.append(
+                    {
+                        "hash": h,
+                        "name": file_info["filename"],
+                        "size": file_info.get("size", 0),
+                        "page_count": file_info.get("page_count", 0),
+                    }
+                )
 
         inputs = {
             "user_query": user_input,
             "uploaded_documents": new_docs,
+            "active_documents": list(new_docs),
             "session_id": session_id,
             "is_completed": False,
             "custom_tools": request.custom_tools,
@@ -110,11 +151,9 @@ class WorkflowService:
         # 0. 检查是否需要生成标题
         should_generate_title = False
         if session_id:
-            session = session_service.get_session(session_id)
-            if not session or session["title"] == "新对话":
-                history = session.get("history", []) if session else []
-                if not history or len(history) == 0:
-                    should_generate_title = True
+            session = session_service.get_session(session_id, include_history=False)
+            if not session or (session["title"] == "新对话" and session_service.count_messages(session_id) == 0):
+                should_generate_title = True
 
         if session_id:
             session_service.append_message(
@@ -127,9 +166,10 @@ class WorkflowService:
 
         # 2. 基于 astream_events 的核心循环
         try:
-            async for event in self._graph.astream_events(
-                inputs, config={"configurable": {"thread_id": session_id}}, version="v2"
-            ):
+            # history_cache: 单次图运行内共享的历史窗口缓存，供 router/chat 等节点复用
+            run_config = {"configurable": {"thread_id": session_id, "history_cache": {}}}
+            graph = await self._get_graph()
+            async for event in graph.astream_events(inputs, config=run_config, version="v2"):
                 kind = event["event"]
                 node_name = event.get("metadata", {}).get("langgraph_node", "")
 
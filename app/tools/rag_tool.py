@@ -1,6 +1,8 @@
 from langchain_core.tools import tool
 
+from app.core.config import settings
 from app.core.logging import logger
+from app.rag.catalog_index import catalog_index
 from app.rag.vector_store import vector_store
 
 
@@ -24,6 +26,11 @@ async def search_green_policy(query: str) -> str:
             source = doc.metadata.get("filename") or doc.metadata.get("source") or "Unknown"
             page = doc.metadata.get("page") or doc.metadata.get("page_estimate") or doc.metadata.get("slide") or ""
             page_info = f", Page {page}" if page else ""
+            if doc.metadata.get("sheet"):
+                rows = "-".join(
+                    dict.fromkeys(str(doc.metadata[key]) for key in ("row", "row_end") if key in doc.metadata)
+                )
+                page_info = f", Sheet {doc.metadata['sheet']}" + (f", Rows {rows}" if rows else "")
 
             content = f"[{i}] Source: {source}{page_info}\nContent: {doc.page_content}"
             formatted_results.append(content)
@@ -34,3 +41,38 @@ async def search_green_policy(query: str) -> str:
     except Exception as e:
         logger.exception(f"[Tool:RAG] Search Error: {e}")
         return f"检索失败: {str(e)}"
+
+
+@tool
+async def lookup_green_catalog(query: str) -> str:
+    """
+    按结构精确查询《绿色金融支持项目目录（2025年版）》。
+    输入国民经济行业代码 (如 4416 或前缀 44)、领域编号 (如 1.1.1) 或行业类别/领域的准确名称，
+    返回对应的目录条目、领域层级与条件/标准。比 search_green_policy 更快更准，已知行业时优先使用。
+    """
+    logger.info(f"[Tool:Catalog] Lookup: '{query}'")
+    entries = catalog_index.lookup(query)
+    if not entries:
+        return "目录中未找到精确匹配的条目，请改用 search_green_policy 进行语义检索。"
+    return format_catalog_entries(entries)
+
+
+def format_catalog_entries(entries: list[dict], limit: int = 10) -> str:
+    """将目录条目格式化为带来源的文本"""
+    formatted = []
+    for i, entry in enumerate(entries[:limit], 1):
+        industry = " ".join(filter(None, [entry["industry_code"], entry["industry_name"]])) or "-"
+        lines = [
+            f"[{i}] Source: {settings.CATALOG_FILE_NAME}, 领域 {' > '.join(entry['domain_path'])}",
+            f"国民经济行业: {industry}",
+        ]
+        if entry["criteria"]:
+            lines.append(f"条件/标准: {entry['criteria']}")
+        if entry["remarks"]:
+            lines.append(f"备注: {entry['remarks']}")
+        if entry["carbon_contribution"]:
+            lines.append(f"温室气体减排贡献: {entry['carbon_contribution']}")
+        formatted.append("\n".join(lines))
+    if len(entries) > limit:
+        formatted.append(f"(共 {len(entries)} 个条目，仅显示前 {limit} 个，请使用更精确的代码或领域编号)")
+    return "\n\n---\n\n".join(formatted)
@@ -0,0 +1,63 @@
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.document_service import document_service
+
+
+def migrate():
+    """为 file_parsing_cache 新增 rendered_content / page_count 列，并回填已有记录"""
+    db_path = settings.SQLITE_DB_PATH.replace("sqlite:///", "")
+    print(f"Migrating database at: {db_path}")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(file_parsing_cache)")
+        columns = [info[1] for info in cursor.fetchall()]
+
+        for col_name, col_type in [("rendered_content", "TEXT"), ("page_count", "INTEGER DEFAULT 0")]:
+            if col_name in columns:
+                print(f"Column '{col_name}' already exists. Skipping.")
+            else:
+                print(f"Adding column '{col_name}'...")
+                cursor.execute(f"ALTER TABLE file_parsing_cache ADD COLUMN {col_name} {col_type}")
+
+        rows = cursor.execute(
+            "SELECT file_hash, content FROM file_parsing_cache WHERE rendered_content IS NULL"
+        ).fetchall()
+        print(f"Backfilling {len(rows)} records...")
+        for file_hash, content in rows:
+            try:
+                docs_data = json.loads(content)
+            except (json.JSONDecodeError, TypeError):
+                docs_data = None
+
+            if isinstance(docs_data, list):
+                rendered = document_service.render_docs(docs_data)
+                page_count = document_service.count_pages(docs_data)
+            else:
+                rendered = document_service.render_marked_text(content)
+                page_count = 1
+            cursor.execute(
+                "UPDATE file_parsing_cache SET rendered_content = ?, page_count = ? WHERE file_hash = ?",
+                (rendered, page_count, file_hash),
+            )
+
+        conn.commit()
+        print("Backfill finished.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,130 @@
+"""
+检索引擎延迟对比：本地嵌入式 Qdrant vs NumPy 内存精确检索 (单查询 / 批量查询，有 / 无 user_id 过滤)。
+两者都是精确检索，同时校验 top-k 结果一致。
+
+用法:
+    python scripts/bench_numpy_search.py
+    python scripts/bench_numpy_search.py --n 5000 --dim 1024 --queries 200 --batch 16
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from app.rag.numpy_index import NumpyVectorIndex
+
+COLLECTION = "bench_numpy_search"
+
+
+def _populate(client: QdrantClient, data: np.ndarray, tenants: int):
+    client.create_collection(
+        collection_name=COLLECTION,
+        vectors_config=rest.VectorParams(size=data.shape[1], distance=rest.Distance.COSINE),
+    )
+    for start in range(0, len(data), 1024):
+        batch = data[start : start + 1024]
+        client.upsert(
+            collection_name=COLLECTION,
+            points=[
+                rest.PointStruct(
+                    id=start + i,
+                    vector=v.tolist(),
+                    payload={
+                        "page_content": f"chunk {start + i}",
+                        "metadata": {"user_id": f"user-{(start + i) % tenants}"},
+                    },
+                )
+                for i, v in enumerate(batch)
+            ],
+            wait=True,
+        )
+
+
+def _timed(fn, items) -> tuple[float, float]:
+    samples = []
+    for item in items:
+        begin = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - begin) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[max(0, int(len(samples) * 0.95) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=16, help="批量模式每批查询数")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--tenants", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    data = rng.standard_normal((args.n, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    batches = [queries[i : i + args.batch] for i in range(0, len(queries), args.batch)]
+    user_filter = rest.Filter(must=[rest.FieldCondition(key="metadata.user_id", match=rest.MatchValue(value="user-1"))])
+
+    client = QdrantClient(path=tempfile.mkdtemp(prefix="bench_qdrant_"))
+    print(f"Populating {args.n} x {args.dim} vectors...")
+    _populate(client, data, args.tenants)
+    index = NumpyVectorIndex(COLLECTION)
+    begin = time.perf_counter()
+    index.load(client)
+    print(f"NumPy index loaded in {(time.perf_counter() - begin) * 1000:.0f} ms")
+
+    # 精确检索结果应一致
+    for query in queries[:10]:
+        expected = [p.id for p in client.query_points(COLLECTION, query=query.tolist(), limit=args.k).points]
+        actual = [int(doc.metadata["_id"]) for doc, _ in index.search(query.tolist(), args.k)]
+        assert actual == expected, "NumPy and Qdrant top-k differ"
+
+    rows = [
+        (
+            "single query",
+            _timed(lambda q: client.query_points(COLLECTION, query=q.tolist(), limit=args.k), queries),
+            _timed(lambda q: index.search(q.tolist(), args.k), queries),
+            1,
+        ),
+        (
+            "single query + user_id filter",
+            _timed(
+                lambda q: client.query_points(COLLECTION, query=q.tolist(), limit=args.k, query_filter=user_filter),
+                queries,
+            ),
+            _timed(lambda q: index.search(q.tolist(), args.k, {"user_id": "user-1"}), queries),
+            1,
+        ),
+        (
+            f"batch of {args.batch}",
+            _timed(
+                lambda b: client.query_batch_points(
+                    COLLECTION, requests=[rest.QueryRequest(query=q.tolist(), limit=args.k) for q in b]
+                ),
+                batches,
+            ),
+            _timed(lambda b: index.search_batch(b.tolist(), args.k), batches),
+            args.batch,
+        ),
+    ]
+    client.close()
+
+    print("\n| mode | qdrant local p50 / p95 (ms) | numpy p50 / p95 (ms) | speedup (p50) | numpy per query (ms) |")
+    print("|---|---:|---:|---:|---:|")
+    for label, (q50, q95), (n50, n95), size in rows:
+        print(f"| {label} | {q50:.2f} / {q95:.2f} | {n50:.2f} / {n95:.2f} | {q50 / n50:.1f}x | {n50 / size:.3f} |")
+
+
+if __name__ == "__main__":
+    main()
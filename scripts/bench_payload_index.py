@@ -0,0 +1,133 @@
+"""
+Payload 索引基准测试：对比有 / 无 keyword 索引时，按 metadata.user_id 过滤检索与按 metadata.file_hash 删除的延迟。
+
+用法:
+    python scripts/bench_payload_index.py --url http://localhost:6333
+    python scripts/bench_payload_index.py --url http://localhost:6333 --sizes 10000 100000 1000000 --dim 128
+
+注意: 本地嵌入式模式 (未传 --url) 不支持 payload 索引，两组结果应无差异，仅用于验证脚本流程。
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+COLLECTION = "bench_payload_index"
+FIELDS = ("metadata.user_id", "metadata.file_hash")
+
+
+def _populate(client: QdrantClient, n: int, dim: int, tenants: int, chunks_per_file: int, batch: int = 2000):
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(
+        collection_name=COLLECTION,
+        vectors_config=rest.VectorParams(size=dim, distance=rest.Distance.COSINE),
+    )
+    rng = np.random.default_rng(42)
+    for start in range(0, n, batch):
+        end = min(start + batch, n)
+        vectors = rng.standard_normal((end - start, dim), dtype=np.float32)
+        points = [
+            rest.PointStruct(
+                id=i,
+                vector=vectors[i - start].tolist(),
+                payload={
+                    "page_content": f"chunk {i}",
+                    "metadata": {"user_id": f"user-{i % tenants}", "file_hash": f"file-{i // chunks_per_file}"},
+                },
+            )
+            for i in range(start, end)
+        ]
+        client.upsert(collection_name=COLLECTION, points=points, wait=True)
+
+
+def _timed(fn, repeat: int) -> tuple[float, float]:
+    samples = []
+    for i in range(repeat):
+        begin = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - begin) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[max(0, int(len(samples) * 0.95) - 1)]
+
+
+def _measure(client: QdrantClient, dim: int, tenants: int, file_offset: int, repeat: int) -> dict[str, tuple]:
+    rng = np.random.default_rng(7)
+    queries = rng.standard_normal((repeat, dim), dtype=np.float32)
+
+    def search(i: int):
+        client.query_points(
+            collection_name=COLLECTION,
+            query=queries[i].tolist(),
+            limit=5,
+            query_filter=rest.Filter(
+                must=[rest.FieldCondition(key="metadata.user_id", match=rest.MatchValue(value=f"user-{i % tenants}"))]
+            ),
+        )
+
+    def delete(i: int):
+        client.delete(
+            collection_name=COLLECTION,
+            points_selector=rest.FilterSelector(
+                filter=rest.Filter(
+                    must=[
+                        rest.FieldCondition(
+                            key="metadata.file_hash", match=rest.MatchValue(value=f"file-{file_offset + i}")
+                        )
+                    ]
+                )
+            ),
+            wait=True,
+        )
+
+    return {"search": _timed(search, repeat), "delete": _timed(delete, repeat)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Qdrant Server 地址；不传则使用临时本地库")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=128, help="基准向量维度 (越小构建越快，不影响过滤开销)")
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--chunks-per-file", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.url:
+        client = QdrantClient(url=args.url, timeout=600)
+    else:
+        import tempfile
+
+        client = QdrantClient(path=tempfile.mkdtemp(prefix="bench_qdrant_"))
+
+    rows = []
+    for n in args.sizes:
+        print(f"Populating {n} points...")
+        _populate(client, n, args.dim, args.tenants, args.chunks_per_file)
+        files = n // args.chunks_per_file
+        without = _measure(client, args.dim, args.tenants, file_offset=0, repeat=args.repeat)
+
+        for field in FIELDS:
+            client.create_payload_index(
+                collection_name=COLLECTION, field_name=field, field_schema=rest.PayloadSchemaType.KEYWORD, wait=True
+            )
+        # 删除不同的文件，避免第二轮删除空集合
+        with_index = _measure(client, args.dim, args.tenants, file_offset=files // 2, repeat=args.repeat)
+        rows.append((n, without, with_index))
+
+    client.delete_collection(COLLECTION)
+
+    print("\n| points | op | no index p50 / p95 (ms) | keyword index p50 / p95 (ms) | speedup (p50) |")
+    print("|---:|---|---:|---:|---:|")
+    for n, without, with_index in rows:
+        for op in ("search", "delete"):
+            (a50, a95), (b50, b95) = without[op], with_index[op]
+            print(f"| {n:,} | {op} | {a50:.2f} / {a95:.2f} | {b50:.2f} / {b95:.2f} | {a50 / b50:.1f}x |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+PDF 解析基准：旧的单线程 PyPDFLoader vs 按页段并行的进程池解析。
+
+用法:
+    python scripts/bench_pdf_parse.py                       # 生成 300 / 600 页的合成 PDF
+    python scripts/bench_pdf_parse.py --files 年报.pdf 环评报告.pdf --workers 2 4 8
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from langchain_community.document_loaders import PyPDFLoader
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from app.parsers.pdf import PDFParser
+
+
+def write_synthetic_pdf(path: Path, pages: int, lines: int = 60):
+    """生成每页 lines 行文本的 PDF (Helvetica 标准字体，无需额外依赖)"""
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        body = " T* ".join(f"(Page {i + 1} line {j}: green credit project disclosure text) Tj" for j in range(lines))
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 10 Tf 12 TL 40 770 Td {body} ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(stream)
+    with path.open("wb") as f:
+        writer.write(f)
+
+
+async def _parallel(path: Path, workers: int) -> tuple[float, int]:
+    parser = PDFParser(workers=workers)
+    try:
+        # 预热进程池，避免把子进程启动时间计入解析耗时
+        await parser.parse(path)
+        begin = time.perf_counter()
+        docs = await parser.parse(path)
+        return time.perf_counter() - begin, len(docs)
+    finally:
+        parser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=Path, nargs="*", help="待测 PDF (默认生成合成 PDF)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[300, 600])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    files = args.files
+    if not files:
+        tmp = Path(tempfile.mkdtemp(prefix="bench_pdf_"))
+        files = []
+        for pages in args.pages:
+            print(f"Generating {pages}-page PDF...")
+            files.append(tmp / f"synthetic_{pages}.pdf")
+            write_synthetic_pdf(files[-1], pages)
+
+    header = " | ".join(f"{w} workers (s) | speedup" for w in args.workers)
+    print(f"\n| file | pages | PyPDFLoader (s) | {header} |")
+    print("|---|---:|---:|" + "---:|---:|" * len(args.workers))
+    for path in files:
+        begin = time.perf_counter()
+        pages = len(PyPDFLoader(str(path)).load())
+        baseline = time.perf_counter() - begin
+
+        cells = []
+        for workers in args.workers:
+            elapsed, count = asyncio.run(_parallel(path, workers))
+            assert count == pages, f"page count mismatch: {count} != {pages}"
+            cells.append(f"{elapsed:.2f} | {baseline / elapsed:.1f}x")
+        print(f"| {path.name} | {pages} | {baseline:.2f} | {' | '.join(cells)} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+向量存储布局对比报告：float32 全内存 vs int8 标量量化 (原始向量落盘，有 / 无 rescore)。
+以 NumPy 精确余弦检索结果为基准计算 recall@k，并统计检索延迟与常驻内存估算。
+
+用法:
+    python scripts/bench_vector_layout.py --url http://localhost:6333
+    python scripts/bench_vector_layout.py --url http://localhost:6333 --source policy_kb --queries 300
+
+注意: 本地嵌入式模式 (未传 --url) 始终精确检索并忽略量化 / HNSW 参数，结果仅用于验证脚本流程。
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from app.core.config import settings
+
+PREFIX = "bench_layout"
+
+
+def _synthetic(n: int, dim: int, clusters: int = 200) -> np.ndarray:
+    """聚簇分布的合成向量 (比均匀随机更接近真实文本 Embedding)"""
+    rng = np.random.default_rng(42)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    data = centers[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim), dtype=np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def _load_source(client: QdrantClient, name: str) -> np.ndarray:
+    vectors, offset = [], None
+    while True:
+        records, offset = client.scroll(collection_name=name, limit=1024, offset=offset, with_vectors=True)
+        vectors.extend(r.vector for r in records)
+        if offset is None:
+            break
+    data = np.asarray(vectors, dtype=np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def _create(client: QdrantClient, name: str, data: np.ndarray, quantized: bool):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    kwargs = {"hnsw_config": rest.HnswConfigDiff(m=settings.HNSW_M, ef_construct=settings.HNSW_EF_CONSTRUCT)}
+    if quantized:
+        kwargs["quantization_config"] = rest.ScalarQuantization(
+            scalar=rest.ScalarQuantizationConfig(
+                type=rest.ScalarType.INT8, quantile=settings.QUANTIZATION_QUANTILE, always_ram=True
+            )
+        )
+    client.create_collection(
+        collection_name=name,
+        vectors_config=rest.VectorParams(size=data.shape[1], distance=rest.Distance.COSINE, on_disk=quantized),
+        **kwargs,
+    )
+    for start in range(0, len(data), 1024):
+        batch = data[start : start + 1024]
+        client.upsert(
+            collection_name=name,
+            points=[rest.PointStruct(id=start + i, vector=v.tolist()) for i, v in enumerate(batch)],
+            wait=True,
+        )
+
+
+def _run(client: QdrantClient, name: str, queries: np.ndarray, truth: np.ndarray, k: int, params: rest.SearchParams):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth, strict=True):
+        begin = time.perf_counter()
+        points = client.query_points(collection_name=name, query=query.tolist(), limit=k, search_params=params).points
+        latencies.append((time.perf_counter() - begin) * 1000)
+        recalls.append(len({p.id for p in points} & set(expected.tolist())) / k)
+    latencies.sort()
+    return statistics.mean(recalls), statistics.median(latencies), latencies[max(0, int(len(latencies) * 0.95) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Qdrant Server 地址；不传则使用临时本地库")
+    parser.add_argument("--source", help="从现有集合读取真实向量 (默认使用合成数据)")
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    client = (
+        QdrantClient(url=args.url, timeout=600)
+        if args.url
+        else QdrantClient(path=tempfile.mkdtemp(prefix="bench_qdrant_"))
+    )
+    data = _load_source(client, args.source) if args.source else _synthetic(args.n, args.dim)
+    n, dim = data.shape
+
+    rng = np.random.default_rng(7)
+    queries = data[rng.choice(n, args.queries, replace=False)] + 0.05 * rng.standard_normal(
+        (args.queries, dim), dtype=np.float32
+    )
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, : args.k]
+
+    print(f"Building collections ({n} x {dim})...")
+    _create(client, f"{PREFIX}_f32", data, quantized=False)
+    _create(client, f"{PREFIX}_int8", data, quantized=True)
+
+    ef = settings.HNSW_EF_SEARCH
+    oversampling = settings.QUANTIZATION_OVERSAMPLING
+    variants = [
+        ("float32, in RAM", f"{PREFIX}_f32", rest.SearchParams(hnsw_ef=ef), n * dim * 4),
+        (
+            "int8, on-disk originals, no rescore",
+            f"{PREFIX}_int8",
+            rest.SearchParams(hnsw_ef=ef, quantization=rest.QuantizationSearchParams(rescore=False)),
+            n * dim,
+        ),
+        (
+            f"int8, on-disk originals, rescore x{oversampling}",
+            f"{PREFIX}_int8",
+            rest.SearchParams(
+                hnsw_ef=ef, quantization=rest.QuantizationSearchParams(rescore=True, oversampling=oversampling)
+            ),
+            n * dim,
+        ),
+    ]
+
+    print(f"\n| layout | recall@{args.k} | p50 (ms) | p95 (ms) | resident vectors (MB) |")
+    print("|---|---:|---:|---:|---:|")
+    for label, name, params, resident in variants:
+        recall, p50, p95 = _run(client, name, queries, truth, args.k, params)
+        print(f"| {label} | {recall:.3f} | {p50:.2f} | {p95:.2f} | {resident / 1024 / 1024:.1f} |")
+
+    for suffix in ("f32", "int8"):
+        client.delete_collection(f"{PREFIX}_{suffix}")
+
+
+if __name__ == "__main__":
+    main()
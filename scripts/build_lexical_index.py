@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore
+
+from app.core.config import settings
+from app.rag.vector_store import vector_store
+
+
+def build(batch_size: int = 256):
+    """从现有 Qdrant 集合全量重建 BM25 倒排索引 (新写入的片段会自动增量索引)"""
+    print(f"Rebuilding lexical index at: {settings.LEXICAL_INDEX_PATH}")
+    vector_store.initialize()
+    client = vector_store._client
+
+    total = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=vector_store.collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        if not points:
+            break
+        ids = [str(p.id) for p in points]
+        docs = [
+            Document(
+                page_content=(p.payload or {}).get(QdrantVectorStore.CONTENT_KEY) or "",
+                metadata=(p.payload or {}).get(QdrantVectorStore.METADATA_KEY) or {},
+            )
+            for p in points
+        ]
+        vector_store.lexical.add(ids, docs)
+        total += len(points)
+        print(f"Indexed {total} chunks...")
+        if offset is None:
+            break
+
+    print(f"Done. Lexical index now holds {len(vector_store.lexical)} chunks.")
+
+
+if __name__ == "__main__":
+    build()
@@ -91,17 +91,18 @@ def ingest_knowledge_base():
 
     total_chunks = len(chunks)
     batch_size = 5  # 保持保守的 batch size
-    logger.info(f"Total chunks: {total_chunks}. Starting ingestion...")
+    logger.info(f"Total chunks: {total_chunks}. Building a new collection version...")
 
-    for i in tqdm(range(0, total_chunks, batch_size), desc="Ingesting"):
-        batch = chunks[i : i + batch_size]
-        try:
-            vector_store.add_documents(batch)
+    # 写入新的集合版本，完成后再原子切换别名；构建期间线上检索不受影响
+    with tqdm(total=total_chunks, desc="Ingesting") as progress:
+
+        def on_batch(n: int):
+            progress.update(n)
             time.sleep(0.5)
-        except Exception as e:
-            logger.error(f"Failed to ingest batch {i // batch_size}: {e}")
 
-    logger.info("Ingestion completed successfully!")
+        target = vector_store.rebuild(chunks, batch_size=batch_size, on_batch=on_batch)
+
+    logger.info(f"Ingestion completed successfully! '{vector_store.collection_name}' -> '{target}'")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.rag.snapshot import export_snapshot, import_snapshot, read_manifest, snapshot_dir_for
+from app.rag.vector_store import vector_store
+from app.services.document_service import document_service
+
+
+def export(source: Path):
+    """
+    导出已完成索引的知识库文件的向量快照 (与源文件放在一起，随仓库 / 镜像发布)。
+    新节点执行知识库同步时，若快照与文件内容、模型、维度一致则直接载入，无需重新 Embedding。
+    仓库本身不附带快照：需在完成索引的节点上执行本命令，并将生成的 *.snapshot/ 目录一并提交。
+    """
+    vector_store.initialize()
+    manifest = export_snapshot(
+        vector_store._client,
+        vector_store.collection_name,
+        snapshot_dir_for(source),
+        source_hash=document_service._calculate_hash(source),
+        source_file=source.name,
+        model=vector_store.embeddings.model,
+    )
+    print(f"Exported {manifest['count']} chunks ({manifest['embedding_dim']} dims) to {snapshot_dir_for(source)}")
+
+
+def load(source: Path):
+    """手动载入快照 (不检查 manifest，通常应通过知识库同步自动载入)"""
+    snapshot_dir = snapshot_dir_for(source)
+    print(f"Manifest: {read_manifest(snapshot_dir)}")
+    vector_store.initialize()
+    print(f"Imported {import_snapshot(vector_store, snapshot_dir)} chunks")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export / import prebuilt embedding snapshots of knowledge base files")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("--file", type=Path, default=settings.KNOWLEDGE_BASE_DIR / settings.CATALOG_FILE_NAME)
+    args = parser.parse_args()
+    if args.action == "export":
+        export(args.file)
+    else:
+        load(args.file)
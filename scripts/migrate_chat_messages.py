@@ -0,0 +1,89 @@
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.models.session import ChatMessage, ChatSession
+
+
+def _legacy_message(session_id: str, seq: int, msg: dict, created_at) -> ChatMessage:
+    return ChatMessage(
+        session_id=session_id,
+        seq=seq,
+        role=msg.get("role", "user"),
+        content=msg.get("content", ""),
+        attachments=json.dumps(msg["attachments"], ensure_ascii=False) if msg.get("attachments") else None,
+        thought_process=json.dumps(msg["thought_process"], ensure_ascii=False) if msg.get("thought_process") else None,
+        created_at=created_at,
+    )
+
+
+def migrate(purge_legacy: bool = False):
+    """
+    将 chat_sessions.history JSON 拆分为 chat_messages 行 (可重复执行)。
+    新代码上线后、迁移执行前产生的新消息已写入 chat_messages：此时将其序号整体后移，
+    旧历史插入到前面合并，而不是跳过整个会话导致旧历史丢失。
+    """
+    print(f"Migrating database at: {engine.url}")
+    ChatMessage.__table__.create(engine, checkfirst=True)
+
+    migrated, merged, skipped = 0, 0, 0
+    with Session(engine) as session:
+        for chat_session in session.exec(select(ChatSession)).all():
+            try:
+                history = json.loads(chat_session.history or "[]")
+            except json.JSONDecodeError:
+                print(f"Session {chat_session.id}: corrupted history, skipping.")
+                skipped += 1
+                continue
+            if not history:
+                continue
+
+            existing = session.exec(
+                select(ChatMessage.role, ChatMessage.content)
+                .where(ChatMessage.session_id == chat_session.id)
+                .order_by(ChatMessage.seq)
+            ).all()
+            legacy = [(msg.get("role", "user"), msg.get("content", "")) for msg in history]
+            if [tuple(row) for row in existing[: len(legacy)]] == legacy:
+                # 已迁移过 (之后可能又追加了新消息)
+                if purge_legacy:
+                    chat_session.history = "[]"
+                    session.add(chat_session)
+                    session.commit()
+                skipped += 1
+                continue
+
+            if existing:
+                # 已有的行都是迁移前新追加的消息：序号后移 len(history) 位，腾出开头给旧历史。
+                # 先取负再平移，避免逐行更新时与唯一索引 (session_id, seq) 冲突
+                owned = ChatMessage.session_id == chat_session.id
+                session.execute(update(ChatMessage).where(owned).values(seq=-ChatMessage.seq - 1))
+                session.execute(update(ChatMessage).where(owned).values(seq=-ChatMessage.seq - 1 + len(history)))
+                merged += 1
+                print(
+                    f"Session {chat_session.id}: merged {len(history)} legacy messages before {len(existing)} new ones."
+                )
+
+            for seq, msg in enumerate(history):
+                session.add(_legacy_message(chat_session.id, seq, msg, chat_session.updated_at))
+
+            if purge_legacy:
+                chat_session.history = "[]"
+                session.add(chat_session)
+            session.commit()
+            migrated += 1
+
+    print(f"Migration finished. migrated={migrated} (merged={merged}), skipped={skipped}")
+    if not purge_legacy:
+        print("Legacy history column kept. Re-run with --purge-legacy to clear it.")
+
+
+if __name__ == "__main__":
+    migrate(purge_legacy="--purge-legacy" in sys.argv)
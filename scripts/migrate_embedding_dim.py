@@ -0,0 +1,60 @@
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from qdrant_client.http import models as rest
+
+from app.core.config import settings
+from app.rag.collections import rebuild_collection
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.vector_store import LoggingDashScopeEmbeddings, vector_store
+
+SUPPORTED_DIMS = (1024, 768, 512, 256, 128, 64)  # text-embedding-v3 支持的输出维度
+
+
+def migrate(dim: int):
+    """
+    以新维度重新计算全部片段向量，写入新的物理集合后原子切换别名。
+    point id 与 payload 保持不变 (倒排索引无需重建)；旧版本保留用于回滚。
+    运行中的服务在 COLLECTION_ALIAS_CHECK_SECONDS 内检测到别名切换，自动改用新维度检索与写入，无需重启；
+    EMBEDDING_DIM 只决定新建集合的维度，建议同步修改 .env。
+    """
+    vector_store.initialize()
+    client = vector_store._client
+    current = client.get_collection(vector_store.collection_name).config.params.vectors.size
+    print(f"Collection '{vector_store.collection_name}': {current} dims -> {dim} dims")
+    if current == dim:
+        print("Nothing to do.")
+        return
+
+    embeddings = LoggingDashScopeEmbeddings(
+        model=settings.EMBEDDING_MODEL_NAME,
+        dimensions=dim,
+        dashscope_api_key=settings.DASHSCOPE_API_KEY,
+        cache=EmbeddingCache(settings.EMBEDDING_CACHE_PATH, max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES),
+    )
+
+    def re_embed(records: list[rest.Record]) -> list[rest.PointStruct]:
+        texts = [(r.payload or {}).get("page_content") or "" for r in records]
+        vectors = embeddings.embed_documents(texts)
+        return [
+            rest.PointStruct(id=r.id, vector=vector, payload=r.payload)
+            for r, vector in zip(records, vectors, strict=True)
+        ]
+
+    target = rebuild_collection(client, vector_store.collection_name, dim=dim, transform=re_embed)
+    print(f"Migration finished. '{vector_store.collection_name}' -> '{target}'")
+    print(f"Embedding cache: {embeddings.cache.stats}")
+    print(
+        f"Running services switch to {dim}-dim vectors within {settings.COLLECTION_ALIAS_CHECK_SECONDS:g}s. "
+        f"Set EMBEDDING_DIM={dim} in .env so that newly created collections match."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed the vector collection with a different dimension")
+    parser.add_argument("--dim", type=int, default=settings.EMBEDDING_DIM, choices=SUPPORTED_DIMS)
+    migrate(parser.parse_args().dim)
@@ -0,0 +1,40 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+
+
+def migrate():
+    """为 file_parsing_cache 新增索引进度列 chunk_count / indexed_chunks"""
+    db_path = settings.SQLITE_DB_PATH.replace("sqlite:///", "")
+    print(f"Migrating database at: {db_path}")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(file_parsing_cache)")
+        columns = [info[1] for info in cursor.fetchall()]
+
+        for col_name in ("chunk_count", "indexed_chunks"):
+            if col_name in columns:
+                print(f"Column '{col_name}' already exists. Skipping.")
+            else:
+                print(f"Adding column '{col_name}'...")
+                cursor.execute(f"ALTER TABLE file_parsing_cache ADD COLUMN {col_name} INTEGER DEFAULT 0")
+
+        conn.commit()
+        print("Migration finished.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
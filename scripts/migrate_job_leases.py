@@ -0,0 +1,43 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+
+
+def migrate():
+    """为 jobs 新增租约列 claimed_by / lease_until (多进程下只回收租约过期的 RUNNING 任务)"""
+    db_path = settings.SQLITE_DB_PATH.replace("sqlite:///", "")
+    print(f"Migrating database at: {db_path}")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(jobs)")
+        columns = [info[1] for info in cursor.fetchall()]
+        if not columns:
+            print("Table 'jobs' does not exist yet; it will be created by init_db. Skipping.")
+            return
+
+        for col_name, col_type in (("claimed_by", "VARCHAR"), ("lease_until", "DATETIME")):
+            if col_name in columns:
+                print(f"Column '{col_name}' already exists. Skipping.")
+            else:
+                print(f"Adding column '{col_name}'...")
+                cursor.execute(f"ALTER TABLE jobs ADD COLUMN {col_name} {col_type}")
+
+        conn.commit()
+        print("Migration finished.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,40 @@
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.rag.collections import rebuild_collection
+from app.rag.vector_store import vector_store
+
+
+def migrate(dry_run: bool = False):
+    """
+    按当前布局配置 (VECTOR_ON_DISK / VECTOR_QUANTIZATION / HNSW_*) 重建向量集合。
+    数据复制到新的物理集合后，原集合名改为指向它的别名，point id 保持不变 (倒排索引无需重建)。
+    本地嵌入式模式请先停止服务，避免文件锁冲突。
+    """
+    vector_store.initialize()
+    client = vector_store._client
+    info = client.get_collection(vector_store.collection_name)
+    print(f"Collection '{vector_store.collection_name}': {info.points_count} points")
+    print(f"  current vectors: {info.config.params.vectors}")
+    print(f"  current hnsw:    {info.config.hnsw_config}")
+    print(f"  current quant:   {info.config.quantization_config}")
+    print(
+        f"Target layout: on_disk={settings.VECTOR_ON_DISK}, quantization={settings.VECTOR_QUANTIZATION}, "
+        f"hnsw m={settings.HNSW_M} ef_construct={settings.HNSW_EF_CONSTRUCT}"
+    )
+    if dry_run:
+        return
+
+    target = rebuild_collection(client, vector_store.collection_name)
+    print(f"Migration finished. '{vector_store.collection_name}' -> '{target}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the vector collection into the configured storage layout")
+    parser.add_argument("--dry-run", action="store_true", help="只打印当前与目标布局")
+    migrate(parser.parse_args().dry_run)
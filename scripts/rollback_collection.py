@@ -0,0 +1,37 @@
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.rag.collections import list_versions, resolve_alias, rollback_version
+from app.rag.vector_store import vector_store
+from scripts.build_lexical_index import build as build_lexical_index
+
+
+def rollback(list_only: bool = False):
+    """
+    将集合别名切回上一版本 (当前版本保留，可再次执行 ingest 或手动切回)，并按回滚后的集合重建倒排索引。
+    本地嵌入式模式请先停止服务，避免文件锁冲突。
+    """
+    vector_store.initialize()
+    client = vector_store._client
+    name = vector_store.collection_name
+    current = resolve_alias(client, name)
+    for version in list_versions(client, name):
+        marker = "*" if version == current else " "
+        print(f" {marker} {version} ({client.count(version).count} points)")
+    if list_only:
+        return
+
+    target = rollback_version(client, name)
+    print(f"Rolled back '{name}': {current} -> {target}")
+    vector_store.lexical.clear()
+    build_lexical_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Point the collection alias back at the previous version")
+    parser.add_argument("--list", action="store_true", help="只列出版本 (* 为线上版本)")
+    rollback(parser.parse_args().list)
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+from app.core.cache import LRUCache
+
+
+def test_lru_cache_evicts_by_byte_budget():
+    """测试超出字节预算时淘汰最久未使用的条目"""
+    cache = LRUCache("test", max_bytes=30, sizeof=len)
+    cache.set("a", "x" * 10)
+    cache.set("b", "x" * 10)
+    cache.get("a")  # a 变为最近使用
+    cache.set("c", "x" * 15)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["bytes"] == 25
+
+
+def test_lru_cache_skips_oversized_entry():
+    """测试单个条目超出总预算时不写入"""
+    cache = LRUCache("test", max_bytes=5, sizeof=len)
+    cache.set("big", "x" * 10)
+    assert len(cache) == 0
+
+
+def test_lru_cache_oversized_update_drops_stale_entry():
+    """测试已缓存的 key 更新为超出预算的值时，旧值被移除而不是继续返回"""
+    cache = LRUCache("test", max_bytes=5, sizeof=len)
+    cache.set("k", "old")
+    cache.set("k", "x" * 10)
+    assert cache.get("k") is None
+    assert cache.stats["bytes"] == 0
+
+
+def test_lru_cache_ttl_and_stats():
+    """测试 TTL 过期与命中统计"""
+    cache = LRUCache("test", max_bytes=100, ttl=10, sizeof=len)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set("k", "v")
+        assert cache.get("k") == "v"
+    with patch("app.core.cache.time.monotonic", return_value=111.0):
+        assert cache.get("k", "default") == "default"
+
+    stats = cache.stats
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["items"]) == (1, 1, 1, 0)
@@ -0,0 +1,92 @@
+import pytest
+
+from app.rag.catalog_index import CatalogIndex
+from app.tools.rag_tool import lookup_green_catalog
+
+
+def _row(domain, code="", name="", criteria="", remarks="", contribution=""):
+    return {
+        "领域": domain,
+        "国民经济行业代码": code,
+        "国民经济行业类别名称": name,
+        "条件/标准": criteria,
+        "备注": remarks,
+        "温室气体减排贡献": contribution,
+    }
+
+
+RECORDS = [
+    _row("1.节能降碳产业"),
+    _row("1.1 高效节能装备制造"),
+    _row("1.1.1 节能锅炉制造", "3411", "锅炉及辅助设备制造", "锅炉能效达到 1 级", contribution="√"),
+    _row("1. 1.10 高效节能磁", "3441", "泵及真空设备制"),
+    _row("悬浮动力装备制造", "", "造", "磁悬浮鼓风机"),
+    _row("4.能源绿色低碳转型"),
+    _row("4.2 清洁能源设施建设和运营"),
+    _row("4.2.2 太阳能利用设施建设和运营", "4416", "太阳能发电", "光伏电站", contribution="√√"),
+    _row("4.2.2 太阳能利用设施建设和运营", " -", "其他", "分布式光伏"),
+    _row("注：1.本目录有关条目引用政策"),
+]
+
+
+@pytest.fixture
+def catalog():
+    index = CatalogIndex()
+    index.build(RECORDS)
+    return index
+
+
+def test_domain_tree_and_continuation_rows(catalog):
+    assert catalog.domains["1.1.10"]["name"] == "高效节能磁悬浮动力装备制造"
+    assert catalog.domains["1.1"]["children"] == ["1.1.1", "1.1.10"]
+
+    entry = catalog.lookup_industry_code("3441")[0]
+    assert entry["industry_name"] == "泵及真空设备制造"
+    assert entry["criteria"] == "磁悬浮鼓风机"
+    assert entry["domain_path"] == ["1 节能降碳产业", "1.1 高效节能装备制造", "1.1.10 高效节能磁悬浮动力装备制造"]
+    assert len(catalog.entries) == 4
+
+
+def test_code_prefix_domain_and_name_lookup(catalog):
+    assert [e["industry_code"] for e in catalog.lookup_industry_code("34")] == ["3411", "3441"]
+    assert catalog.lookup_industry_code("99") == []
+
+    domain = catalog.lookup_domain("1.1")
+    assert domain["children"] == ["1.1.1 节能锅炉制造", "1.1.10 高效节能磁悬浮动力装备制造"]
+    assert len(domain["entries"]) == 2
+
+    assert catalog.lookup_name("太阳能 发电")[0]["industry_code"] == "4416"
+    assert len(catalog.lookup_name("太阳能利用设施建设和运营")) == 2
+
+
+def test_combined_lookup(catalog):
+    assert catalog.lookup("3411 锅炉及辅助设备制造")[0]["domain_code"] == "1.1.1"
+    assert catalog.lookup("4.2.2")[1]["industry_code"] == ""
+    assert catalog.lookup("锅炉及辅助设备制造")[0]["industry_code"] == "3411"
+    assert catalog.lookup("不存在的行业") == []
+    assert catalog.lookup("34")[0]["industry_code"] == "3411"
+
+
+def test_lookup_ignores_stray_digits():
+    """名称中的零散数字 (5G、2号机组) 不能当作行业代码前缀，否则会返回无关大类的条目"""
+    catalog = CatalogIndex()
+    catalog.build(
+        RECORDS
+        + [
+            _row("5.生态环境产业"),
+            _row("5.1 农业资源保护", "5110", "农业专业及辅助性活动"),
+            _row("5.2 化工", "2611", "无机酸制造"),
+        ]
+    )
+
+    assert catalog.lookup("5G通信设备制造") == []
+    assert catalog.lookup("2号机组光伏电站") == []
+    assert catalog.lookup("5110农业专业及辅助性活动")[0]["industry_code"] == "5110"
+
+
+@pytest.mark.asyncio
+async def test_lookup_tool(catalog, monkeypatch):
+    monkeypatch.setattr("app.tools.rag_tool.catalog_index", catalog)
+    text = await lookup_green_catalog.ainvoke({"query": "4416"})
+    assert "4.2.2 太阳能利用设施建设和运营" in text and "光伏电站" in text
+    assert "search_green_policy" in await lookup_green_catalog.ainvoke({"query": "未知"})
@@ -0,0 +1,52 @@
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from app.graph.checkpointer import RetentionSqliteSaver
+from app.schemas.chat import CustomToolDefinition
+
+
+class _State(TypedDict):
+    docs: Annotated[list[str], operator.add]
+    custom_tools: list
+
+
+def _build_graph(saver: RetentionSqliteSaver):
+    workflow = StateGraph(_State)
+    workflow.add_node("step", lambda state: {"docs": ["x"]})
+    workflow.add_edge(START, "step")
+    workflow.add_edge("step", END)
+    return workflow.compile(checkpointer=saver)
+
+
+@pytest.mark.asyncio
+async def test_checkpoints_persist_with_bounded_retention(tmp_path):
+    """测试 checkpoint 跨连接持久化，且每个线程只保留最近 N 个"""
+    db_path = tmp_path / "checkpoints.db"
+    config = {"configurable": {"thread_id": "t-1"}}
+    tool = CustomToolDefinition(name="t", desc="d", method="GET", url="http://example.com")
+
+    saver = await RetentionSqliteSaver.open(db_path, max_per_thread=3)
+    graph = _build_graph(saver)
+    for _ in range(5):
+        await graph.ainvoke({"docs": ["doc"], "custom_tools": [tool]}, config=config)
+
+    checkpoints = [c async for c in saver.alist(config)]
+    assert len(checkpoints) == 3
+    async with saver.conn.execute(
+        "SELECT COUNT(*) FROM writes WHERE checkpoint_id NOT IN (SELECT checkpoint_id FROM checkpoints)"
+    ) as cur:
+        assert (await cur.fetchone())[0] == 0
+    await saver.aclose()
+
+    # 重新打开后状态仍然可用
+    saver = await RetentionSqliteSaver.open(db_path, max_per_thread=3)
+    state = await _build_graph(saver).aget_state(config)
+    assert len(state.values["docs"]) == 10
+    assert state.values["custom_tools"][0].name == "t"
+
+    await saver.adelete_thread("t-1")
+    assert [c async for c in saver.alist(config)] == []
+    await saver.aclose()
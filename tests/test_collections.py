@@ -0,0 +1,92 @@
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from app.core.config import settings
+from app.rag.collections import (
+    layout_kwargs,
+    list_versions,
+    rebuild_collection,
+    resolve_alias,
+    rollback_version,
+    search_params,
+)
+
+
+def _client_with_points(tmp_path, n: int = 5) -> QdrantClient:
+    client = QdrantClient(path=str(tmp_path / "qdrant"))
+    client.create_collection("kb", vectors_config=rest.VectorParams(size=4, distance=rest.Distance.COSINE))
+    client.upsert(
+        "kb",
+        points=[
+            rest.PointStruct(id=i, vector=[1.0, float(i), 0.0, 0.5], payload={"metadata": {"file_hash": f"f{i}"}})
+            for i in range(n)
+        ],
+        wait=True,
+    )
+    return client
+
+
+def test_layout_follows_settings(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "int8")
+    monkeypatch.setattr(settings, "VECTOR_ON_DISK", True)
+    kwargs = layout_kwargs(256)
+    assert kwargs["vectors_config"].size == 256 and kwargs["vectors_config"].on_disk
+    assert kwargs["quantization_config"].scalar.type == rest.ScalarType.INT8
+    assert search_params().quantization.rescore is True
+
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", None)
+    assert "quantization_config" not in layout_kwargs(256)
+    assert search_params().quantization is None
+
+
+def test_rebuild_swaps_in_alias_and_keeps_points(tmp_path):
+    client = _client_with_points(tmp_path)
+
+    first = rebuild_collection(client, "kb")
+    assert resolve_alias(client, "kb") == first
+    assert client.count("kb").count == 5
+    assert client.retrieve("kb", [3], with_payload=True)[0].payload["metadata"]["file_hash"] == "f3"
+
+    # 再次重建：别名切换到新版本，上一版本保留用于回滚
+    second = rebuild_collection(client, "kb")
+    assert resolve_alias(client, "kb") == second
+    assert list_versions(client, "kb") == [first, second]
+    assert client.count("kb").count == 5
+
+    # 超出 COLLECTION_VERSIONS_KEEP 的最旧版本被删除
+    third = rebuild_collection(client, "kb")
+    assert list_versions(client, "kb") == [second, third]
+    client.close()
+
+
+def test_rollback_points_alias_at_previous_version(tmp_path):
+    client = _client_with_points(tmp_path)
+    first = rebuild_collection(client, "kb")
+    second = rebuild_collection(client, "kb")
+
+    assert rollback_version(client, "kb") == first
+    assert resolve_alias(client, "kb") == first
+    # 回滚不删除较新的版本
+    assert list_versions(client, "kb") == [first, second]
+    with pytest.raises(ValueError):
+        rollback_version(client, "kb")
+
+    # 回滚后的下一次发布保留刚被替换的线上版本，而不是更新但已弃用的版本
+    third = rebuild_collection(client, "kb")
+    assert list_versions(client, "kb") == [first, third]
+    client.close()
+
+
+def test_rebuild_with_transform_changes_dimension(tmp_path):
+    """重新计算向量迁移到新维度，point id 与 payload 不变"""
+    client = _client_with_points(tmp_path)
+
+    def shrink(records):
+        return [rest.PointStruct(id=r.id, vector=r.vector[:2], payload=r.payload) for r in records]
+
+    rebuild_collection(client, "kb", dim=2, transform=shrink)
+    assert client.get_collection("kb").config.params.vectors.size == 2
+    point = client.retrieve("kb", [3], with_payload=True, with_vectors=True)[0]
+    assert len(point.vector) == 2 and point.payload["metadata"]["file_hash"] == "f3"
+    client.close()
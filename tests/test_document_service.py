@@ -1,24 +1,46 @@
+import hashlib
 import json
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from fastapi import UploadFile
 from langchain_core.documents import Document
+from sqlmodel import Session, SQLModel, create_engine, select
 
+from app.models.file import FileParsingCache, FileStatus
+from app.models.job import Job, JobKind, JobStatus
 from app.services.document_service import document_service
+from app.services.job_queue import PRIORITY_UPLOAD, job_queue
+
+
+@pytest.fixture
+def test_engine(tmp_path: Path):
+    """文件缓存表与任务队列共用的临时数据库"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with (
+        patch("app.services.document_service.engine", engine),
+        patch("app.services.job_queue.engine", engine),
+    ):
+        yield engine
+
+
+def _jobs(engine) -> list[Job]:
+    with Session(engine) as session:
+        return list(session.exec(select(Job).order_by(Job.id)).all())
 
 
 @pytest.mark.asyncio
-async def test_document_processing_flow(tmp_path: Path):
-    """测试文件上传、哈希、解析、存储全流程"""
+async def test_document_processing_flow(tmp_path: Path, monkeypatch, test_engine):
+    """测试上传 (哈希后立即返回) -> 解析任务 -> 索引任务全流程"""
     import io
 
+    monkeypatch.setattr(document_service, "upload_dir", tmp_path / "uploads")
+    document_service.upload_dir.mkdir()
     content_bytes = b"dummy excel content"
 
-    # Mock UploadFile
-    mock_upload = MagicMock()
-    mock_upload.filename = "test.xlsx"
-    mock_upload.file = io.BytesIO(content_bytes)
+    mock_upload = UploadFile(file=io.BytesIO(content_bytes), filename="test.xlsx")
 
     # Mock parse_file to return high-fidelity docs
     mock_docs = [
@@ -27,23 +49,144 @@ async def test_document_processing_flow(tmp_path: Path):
     ]
 
     with patch("app.services.document_service.parse_file", return_value=mock_docs) as mock_parse:
-        # Mock Session and select
-        with patch("app.services.document_service.Session") as mock_session:
-            session_inst = mock_session.return_value.__enter__.return_value
-            session_inst.get.return_value = None  # No cache hit
+        result = await document_service.process_file(mock_upload, user_id="u1")
+
+        # 上传只登记记录并排入解析任务，不在请求中解析
+        assert result["status"] == "success"
+        file_hash = hashlib.sha256(content_bytes).hexdigest()
+        assert result["file_hash"] == file_hash
+        mock_parse.assert_not_called()
+        with Session(test_engine) as session:
+            record = session.get(FileParsingCache, file_hash)
+            assert record.status == FileStatus.PARSING
+            assert record.file_size == len(content_bytes)
+        (job,) = _jobs(test_engine)
+        assert (job.kind, job.priority) == (JobKind.PARSE, PRIORITY_UPLOAD)
+        assert (document_service.upload_dir / f"{file_hash}.xlsx").exists()
+
+        with patch("app.services.document_service.vector_store") as mock_vector:
+            mock_vector.aembed_documents = AsyncMock(side_effect=lambda texts: [[0.1] * 4 for _ in texts])
+            mock_vector.aadd_embeddings = AsyncMock()
+            assert await job_queue.run_pending() == 2
+
+    mock_parse.assert_called_once()
+    with Session(test_engine) as session:
+        record = session.get(FileParsingCache, file_hash)
+        # 验证解析后的 JSON 序列化
+        content_data = json.loads(record.content)
+        assert len(content_data) == 2
+        assert content_data[0]["metadata"]["sheet"] == "S1"
+        assert content_data[0]["page_content"] == "Row 1"
+
+        # 解析时预渲染标记文本
+        assert record.rendered_content == "[Sheet: S1, Row: 1]\nRow 1\n\n[Sheet: S1, Row: 2]\nRow 2"
+        assert record.page_count == 1
+        assert record.status == FileStatus.COMPLETED
+    assert [(j.kind, j.status) for j in _jobs(test_engine)] == [
+        (JobKind.PARSE, JobStatus.SUCCEEDED),
+        (JobKind.INDEX, JobStatus.SUCCEEDED),
+    ]
+    assert json.loads(_jobs(test_engine)[1].payload) == {"user_id": "u1"}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_short_circuits(tmp_path: Path, monkeypatch):
+    """哈希命中时复用解析结果，不解析、不保留任何文件"""
+    import io
 
-            result = await document_service.process_file(mock_upload)
+    monkeypatch.setattr(document_service, "upload_dir", tmp_path)
+    upload = UploadFile(file=io.BytesIO(b"same bytes"), filename="dup.pdf")
 
-            assert result["status"] == "success"
-            assert "file_hash" in result
+    with (
+        patch("app.services.document_service.parse_file") as mock_parse,
+        patch("app.services.document_service.Session") as mock_session,
+    ):
+        cached = MagicMock(rendered_content="cached text", status="COMPLETED", file_size=10, page_count=1)
+        mock_session.return_value.__enter__.return_value.get.return_value = cached
+        result = await document_service.process_file(upload)
 
-            # 验证解析后的 JSON 序列化
-            # session_inst.add(new_cache) 被调用
-            new_cache = session_inst.add.call_args[0][0]
-            content_data = json.loads(new_cache.content)
-            assert len(content_data) == 2
-            assert content_data[0]["metadata"]["sheet"] == "S1"
-            assert content_data[0]["page_content"] == "Row 1"
+    assert result["file_hash"] == hashlib.sha256(b"same bytes").hexdigest()
+    mock_parse.assert_not_called()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_upload_size_limit(tmp_path: Path, monkeypatch):
+    """超过大小上限时中止写入并清理临时文件"""
+    import io
+
+    from app.core.config import settings
+    from app.services.document_service import UploadTooLargeError
+
+    monkeypatch.setattr(document_service, "upload_dir", tmp_path)
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1000)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_BYTES", 256)
+
+    with pytest.raises(UploadTooLargeError):
+        await document_service.process_file(UploadFile(file=io.BytesIO(b"x" * 1001), filename="big.pdf"))
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_uploads_share_one_parse(tmp_path: Path, monkeypatch, test_engine):
+    """同一文件的并发上传只登记、入队一次，其余请求共享结果"""
+    import asyncio
+    import io
+
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(document_service, "upload_dir", upload_dir)
+
+    with patch("app.services.document_service.parse_file") as mock_parse:
+        results = await asyncio.gather(
+            *(
+                document_service.process_file(
+                    UploadFile(file=io.BytesIO(b"annual report"), filename=f"report{i}.pdf"),
+                )
+                for i in range(3)
+            )
+        )
+
+    assert len({r["file_hash"] for r in results}) == 1
+    mock_parse.assert_not_called()
+    assert [job.kind for job in _jobs(test_engine)] == [JobKind.PARSE]
+    assert document_service._inflight == {}
+    # 只保留一份最终文件，临时文件全部清理
+    assert [p.name for p in upload_dir.iterdir()] == [f"{results[0]['file_hash']}.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_recover_stuck_files(tmp_path: Path, monkeypatch, test_engine):
+    """启动恢复：无任务的 PARSING / INDEXING 文件重新入队，源文件缺失或任务已失败的标记为 FAILED"""
+    monkeypatch.setattr(document_service, "upload_dir", tmp_path)
+    (tmp_path / "uploaded.pdf").write_bytes(b"pdf")
+
+    def record(file_hash: str, status: FileStatus, parsed: bool) -> FileParsingCache:
+        return FileParsingCache(
+            file_hash=file_hash,
+            filename=f"{file_hash}.pdf",
+            content='[{"page_content": "x", "metadata": {}}]' if parsed else "[]",
+            rendered_content="x" if parsed else None,
+            file_type=".pdf",
+            status=status,
+        )
+
+    with Session(test_engine) as session:
+        session.add(record("uploaded", FileStatus.PARSING, parsed=False))
+        session.add(record("indexing", FileStatus.INDEXING, parsed=True))
+        session.add(record("missing", FileStatus.PARSING, parsed=False))
+        session.add(record("crashy", FileStatus.INDEXING, parsed=True))
+        session.add(Job(kind=JobKind.INDEX, file_hash="crashy", status=JobStatus.FAILED, last_error="boom"))
+        session.commit()
+
+    assert document_service.recover_stuck_files() == 2
+
+    queued = {job.file_hash: job.kind for job in _jobs(test_engine) if job.status == JobStatus.QUEUED}
+    assert queued == {"uploaded": JobKind.PARSE, "indexing": JobKind.INDEX}
+    with Session(test_engine) as session:
+        assert session.get(FileParsingCache, "missing").status == FileStatus.FAILED
+        crashy = session.get(FileParsingCache, "crashy")
+        assert (crashy.status, crashy.error_message) == (FileStatus.FAILED, "boom")
 
 
 @pytest.mark.asyncio
@@ -58,13 +201,101 @@ async def test_index_document_task_reconstruction():
         mock_record = MagicMock()
         mock_record.content = mock_content
         mock_record.filename = "test.pdf"
+        mock_record.chunk_count = 0
         session_inst.get.return_value = mock_record
 
         with patch("app.services.document_service.vector_store") as mock_vector:
+            mock_vector.aembed_documents = AsyncMock(side_effect=lambda texts: [[0.1] * 4 for _ in texts])
+            mock_vector.aadd_embeddings = AsyncMock()
             await document_service.index_document_task(file_hash)
 
-            # 验证 add_documents 被调用
-            added_docs = mock_vector.add_documents.call_args[0][0]
+            # 验证 aadd_embeddings 被调用
+            added_docs, vectors, ids, _ = mock_vector.aadd_embeddings.call_args[0]
             assert len(added_docs) > 0
             assert added_docs[0].metadata["page"] == 1
             assert added_docs[0].metadata["file_hash"] == file_hash
+            assert len(vectors) == len(ids) == len(added_docs)
+            assert mock_record.indexed_chunks == len(added_docs)
+
+
+@pytest.mark.asyncio
+async def test_failed_parse_is_not_cached_as_empty(tmp_path: Path, test_engine):
+    """解析失败等待重试的文件不会以空内容进入上传缓存；重试成功后旧缓存失效"""
+    from app.services.document_service import UPLOAD_CACHE
+    from app.services.workflow_service import workflow_service
+
+    source = tmp_path / "report.txt"
+    source.write_text("年报")
+    with Session(test_engine) as session:
+        session.add(
+            FileParsingCache(
+                file_hash="retrying", filename="report.txt", content="[]", file_type=".txt", status=FileStatus.FAILED
+            )
+        )
+        session.commit()
+
+    with patch("app.services.workflow_service.engine", test_engine):
+        assert workflow_service._load_file_contents(["retrying"]) == {}
+
+    UPLOAD_CACHE.set("retrying", {"content": "", "filename": "report.txt"})
+    with patch("app.services.document_service.parse_file", return_value=[Document(page_content="年报", metadata={})]):
+        await document_service.parse_document_task("retrying", source)
+    assert UPLOAD_CACHE.get("retrying") is None
+    with patch("app.services.workflow_service.engine", test_engine):
+        assert workflow_service._load_file_contents(["retrying"])["retrying"]["content"] == "\n年报"
+
+
+@pytest.mark.asyncio
+async def test_coalesce_leader_cancellation_promotes_follower():
+    """首个请求被取消时，等待方不跟着取消：其中一个重新执行，其余共享其结果"""
+    import asyncio
+
+    started, calls = asyncio.Event(), []
+
+    async def slow_parse():
+        calls.append(len(calls))
+        started.set()
+        await asyncio.sleep(0 if len(calls) > 1 else 10)
+        return {"rendered": f"run {len(calls)}"}
+
+    leader = asyncio.create_task(document_service._coalesce("h-cancel", slow_parse))
+    await started.wait()
+    followers = [asyncio.create_task(document_service._coalesce("h-cancel", slow_parse)) for _ in range(2)]
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    results = await asyncio.gather(*followers)
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert calls == [0, 1]
+    assert sorted(shared for _, shared in results) == [False, True]
+    assert all(result == {"rendered": "run 2"} for result, _ in results)
+    assert document_service._inflight == {}
+
+
+def test_delete_removes_vectors_of_partially_indexed_files(tmp_path: Path, monkeypatch, test_engine):
+    """索引失败但已提交部分分块的文件，删除时同样清理向量，未写入过向量的不调用删除"""
+    monkeypatch.setattr(document_service, "upload_dir", tmp_path)
+    with Session(test_engine) as session:
+        session.add(
+            FileParsingCache(
+                file_hash="partial",
+                filename="a.pdf",
+                content="[]",
+                file_type=".pdf",
+                status=FileStatus.FAILED,
+                indexed_chunks=64,
+            )
+        )
+        session.add(
+            FileParsingCache(
+                file_hash="parse-failed", filename="b.pdf", content="[]", file_type=".pdf", status=FileStatus.FAILED
+            )
+        )
+        session.commit()
+
+    with patch("app.services.document_service.vector_store") as mock_store:
+        assert document_service.delete_document("partial")
+        mock_store.delete_by_metadata.assert_called_once_with("file_hash", "partial")
+        assert document_service.delete_document("parse-failed")
+        assert mock_store.delete_by_metadata.call_count == 1
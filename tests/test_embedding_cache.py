@@ -0,0 +1,82 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.vector_store import LoggingDashScopeEmbeddings
+
+
+def test_cache_roundtrip_and_eviction(tmp_path):
+    """测试向量读写、命中统计与容量淘汰"""
+    # 3 个 4 维 float32 向量；每次命中都刷新使用时间，便于验证淘汰顺序
+    cache = EmbeddingCache(tmp_path / "emb.db", max_bytes=3 * 16, touch_interval=0)
+    cache.put_many("m/document", ["a", "b"], [[0.5, 1.0, 1.5, 2.0], [1.0] * 4])
+
+    assert cache.get_many("m/document", ["a", "x"]) == [[0.5, 1.0, 1.5, 2.0], None]
+    assert cache.get_many("m/query", ["a"]) == [None]
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 2
+
+    cache.put_many("m/document", ["c", "d"], [[2.0] * 4, [3.0] * 4])
+    assert cache.stats["evictions"] >= 1
+    assert cache.stats["bytes"] <= 3 * 16
+    # 最近使用过的 a 被保留，最久未用的 b 被淘汰
+    assert cache.get_many("m/document", ["a", "b"])[1] is None
+    cache.close()
+
+
+def test_hits_only_touch_rows_older_than_interval(tmp_path):
+    """测试命中时只刷新超过刷新间隔的行，间隔内的重复读取不产生写入"""
+    cache = EmbeddingCache(tmp_path / "emb.db", max_bytes=1024, touch_interval=3600)
+    with patch("app.rag.embedding_cache.time.time", return_value=1000.0):
+        cache.put_many("m/document", ["a", "b"], [[1.0] * 4, [2.0] * 4])
+    conn = cache._connect()
+    changes = conn.total_changes
+
+    with patch("app.rag.embedding_cache.time.time", return_value=2000.0):
+        assert cache.get_many("m/document", ["a", "b"]) == [[1.0] * 4, [2.0] * 4]
+    assert conn.total_changes == changes
+
+    with patch("app.rag.embedding_cache.time.time", return_value=5000.0):
+        cache.get_many("m/document", ["a"])
+    last_used = dict(conn.execute("SELECT text_hash, last_used FROM embeddings").fetchall())
+    assert last_used == {cache.text_hash("a"): 5000.0, cache.text_hash("b"): 1000.0}
+    cache.close()
+
+
+@pytest.mark.parametrize("method", ["embed_documents", "embed_query"])
+def test_embeddings_consult_cache(tmp_path, method):
+    """测试 Embedding 包装类只对未命中的文本调用 API"""
+    embeddings = LoggingDashScopeEmbeddings(
+        model="text-embedding-v3", dashscope_api_key="x", cache=EmbeddingCache(tmp_path / "emb.db", 1 << 20)
+    )
+
+    with patch(
+        "app.rag.vector_store.embed_with_retry",
+        side_effect=lambda _, **kwargs: [{"embedding": [1.0]}] * len(kwargs["input"]),
+    ) as api:
+        if method == "embed_documents":
+            assert embeddings.embed_documents(["a", "b"]) == [[1.0], [1.0]]
+            assert embeddings.embed_documents(["b", "c"]) == [[1.0], [1.0]]
+            assert api.call_args_list[1].kwargs["input"] == ["c"]
+        else:
+            assert embeddings.embed_query("q") == [1.0]
+            assert embeddings.embed_query("q") == [1.0]
+            api.assert_called_once()
+            assert api.call_args.kwargs["text_type"] == "query"
+
+
+def test_embedding_dimension_is_requested_and_namespaced(tmp_path):
+    """指定维度时随请求传递 dimension，且缓存按维度隔离"""
+    cache = EmbeddingCache(tmp_path / "emb.db", 1 << 20)
+    full = LoggingDashScopeEmbeddings(model="text-embedding-v3", dashscope_api_key="x", cache=cache)
+    small = LoggingDashScopeEmbeddings(model="text-embedding-v3", dashscope_api_key="x", dimensions=256, cache=cache)
+
+    with patch(
+        "app.rag.vector_store.embed_with_retry",
+        side_effect=lambda _, **kwargs: [{"embedding": [float(kwargs.get("dimension", 0))]}] * len(kwargs["input"]),
+    ) as api:
+        assert full.embed_documents(["a"]) == [[0.0]]
+        assert small.embed_documents(["a"]) == [[256.0]]
+
+    assert "dimension" not in api.call_args_list[0].kwargs
+    assert api.call_args_list[1].kwargs["dimension"] == 256
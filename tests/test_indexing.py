@@ -0,0 +1,67 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from app.rag.indexing import IndexingPipeline
+
+
+def _make_store(fail_batches: dict[str, int] | None = None):
+    """构造一个模拟向量库：指定首条文本的批次前若干次 Embedding 调用失败"""
+    failures = dict(fail_batches or {})
+    store = MagicMock()
+
+    def embed(texts):
+        if failures.get(texts[0], 0) > 0:
+            failures[texts[0]] -= 1
+            raise RuntimeError("embedding api error")
+        return [[float(len(t))] for t in texts]
+
+    store.aembed_documents = AsyncMock(side_effect=embed)
+    store.aadd_embeddings = AsyncMock()
+    return store
+
+
+def _docs(n: int) -> tuple[list[Document], list[str]]:
+    return [Document(page_content=f"chunk-{i}") for i in range(n)], [f"id-{i}" for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_and_reports_progress():
+    """测试分批写入与连续水位进度上报"""
+    store = _make_store()
+    docs, ids = _docs(7)
+    progress = []
+
+    pipeline = IndexingPipeline(batch_size=3, concurrency=2, max_retries=1)
+    committed = await pipeline.run(store, docs, ids, on_progress=lambda done, total: progress.append((done, total)))
+
+    assert committed == 7
+    assert store.aadd_embeddings.call_count == 3
+    assert progress[-1] == (7, 7)
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_retries_and_resumes(monkeypatch):
+    """测试单批重试，以及失败后从已提交水位续传"""
+    monkeypatch.setattr("app.rag.indexing.wait_exponential", lambda **kwargs: lambda retry_state: 0)
+    docs, ids = _docs(6)
+
+    # 第一批失败一次后重试成功
+    store = _make_store({"chunk-0": 1})
+    assert await IndexingPipeline(batch_size=2, concurrency=1, max_retries=2).run(store, docs, ids) == 6
+
+    # 第二批持续失败：水位停在第一批之后
+    store = _make_store({"chunk-2": 99})
+    progress = []
+    pipeline = IndexingPipeline(batch_size=2, concurrency=1, max_retries=2)
+    with pytest.raises(RuntimeError):
+        await pipeline.run(store, docs, ids, on_progress=lambda done, total: progress.append(done))
+    assert progress == [2]
+
+    # 从水位续传，只写入剩余批次
+    store = _make_store()
+    assert await pipeline.run(store, docs, ids, start=2) == 6
+    written_ids = [call.args[2] for call in store.aadd_embeddings.call_args_list]
+    assert written_ids == [["id-2", "id-3"], ["id-4", "id-5"]]
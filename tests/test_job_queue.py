@@ -0,0 +1,163 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.config import settings
+from app.models.job import Job, JobKind, JobStatus
+from app.services.job_queue import PRIORITY_SYNC, PRIORITY_UPLOAD, JobQueue
+
+
+@pytest.fixture
+def test_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with patch("app.services.job_queue.engine", engine):
+        yield engine
+
+
+def _jobs(engine) -> list[Job]:
+    with Session(engine) as session:
+        return list(session.exec(select(Job).order_by(Job.id)).all())
+
+
+@pytest.mark.asyncio
+async def test_priority_order_and_dedupe(test_engine):
+    """高优先级先执行，同优先级按入队顺序；同一文件同类任务不重复入队"""
+    queue, ran = JobQueue(workers=1), []
+
+    async def handler(job: Job):
+        ran.append(job.file_hash)
+
+    queue.register(JobKind.INDEX, handler)
+    first = queue.enqueue(JobKind.INDEX, "kb-a", priority=PRIORITY_SYNC)
+    queue.enqueue(JobKind.INDEX, "kb-b", priority=PRIORITY_SYNC)
+    queue.enqueue(JobKind.INDEX, "upload-c", priority=PRIORITY_UPLOAD)
+    # 重复入队返回已有任务，并提升优先级
+    again = queue.enqueue(JobKind.INDEX, "kb-a", priority=PRIORITY_UPLOAD + 1)
+    assert again.id == first.id
+
+    assert await queue.run_pending() == 3
+    assert ran == ["kb-a", "upload-c", "kb-b"]
+    assert {job.status for job in _jobs(test_engine)} == {JobStatus.SUCCEEDED}
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_then_fail(test_engine, monkeypatch):
+    """失败后按指数退避重新排队，到期前不会被领取，尝试次数用尽标记为 FAILED"""
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 30)
+    queue, calls = JobQueue(workers=1), []
+
+    async def flaky(job: Job):
+        calls.append(job.attempts)
+        raise RuntimeError("embedding service unavailable")
+
+    queue.register(JobKind.PARSE, flaky)
+    queue.enqueue(JobKind.PARSE, "f1")
+
+    assert await queue.run_pending() == 1
+    (job,) = _jobs(test_engine)
+    assert job.status == JobStatus.QUEUED
+    assert job.attempts == 1
+    assert "embedding service unavailable" in job.last_error
+    assert job.available_at - datetime.now() > timedelta(seconds=25)
+    assert queue.backoff(1) == 30 and queue.backoff(2) == 60
+
+    # 退避期内不会执行
+    assert await queue.run_pending() == 0
+
+    with Session(test_engine) as session:
+        record = session.get(Job, job.id)
+        record.available_at = datetime.now()
+        session.add(record)
+        session.commit()
+    assert await queue.run_pending() == 1
+    (job,) = _jobs(test_engine)
+    assert job.status == JobStatus.FAILED
+    assert calls == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_recover_only_expired_leases(test_engine):
+    """只回收租约过期的 RUNNING 任务 (尝试次数已用尽的标记为 FAILED)，其他存活进程持有的任务不受影响"""
+    expired, live = datetime.now() - timedelta(seconds=1), datetime.now() + timedelta(seconds=60)
+    with Session(test_engine) as session:
+        for file_hash, attempts, lease_until in (("resume", 1, expired), ("crashy", 3, expired), ("busy", 1, live)):
+            session.add(
+                Job(
+                    kind=JobKind.INDEX,
+                    file_hash=file_hash,
+                    status=JobStatus.RUNNING,
+                    attempts=attempts,
+                    max_attempts=3,
+                    claimed_by="other-host:42:abcd",
+                    lease_until=lease_until,
+                )
+            )
+        session.commit()
+
+    queue = JobQueue(workers=1)
+    assert queue.recover() == 2
+    statuses = {job.file_hash: job.status for job in _jobs(test_engine)}
+    assert statuses == {"resume": JobStatus.QUEUED, "crashy": JobStatus.FAILED, "busy": JobStatus.RUNNING}
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_long_jobs_from_being_recovered(test_engine, monkeypatch):
+    """执行时间超过租约的任务持续续期，其他进程不会将其放回队列"""
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.3)
+    queue, other = JobQueue(workers=1), JobQueue(workers=1)
+    recovered = []
+
+    async def slow(job: Job):
+        for _ in range(4):
+            await asyncio.sleep(0.15)
+            recovered.append(await asyncio.to_thread(other.recover))
+
+    queue.register(JobKind.INDEX, slow)
+    queue.enqueue(JobKind.INDEX, "long")
+    assert await queue.run_pending() == 1
+
+    assert recovered == [0, 0, 0, 0]
+    (job,) = _jobs(test_engine)
+    assert (job.status, job.attempts, job.claimed_by) == (JobStatus.SUCCEEDED, 1, None)
+
+
+@pytest.mark.asyncio
+async def test_workers_wake_on_enqueue_and_release_on_stop(test_engine):
+    """入队立即唤醒 worker (无需等待轮询)；停止时执行中的任务退回队列且不计尝试次数"""
+    queue = JobQueue(workers=2, poll_interval=30)
+    done, started = asyncio.Event(), asyncio.Event()
+
+    async def quick(job: Job):
+        done.set()
+
+    async def blocking(job: Job):
+        started.set()
+        await asyncio.Event().wait()
+
+    queue.register(JobKind.INDEX, quick)
+    queue.register(JobKind.PARSE, blocking)
+    await queue.start()
+    try:
+        await asyncio.sleep(0.05)  # worker 进入空闲等待
+        queue.enqueue(JobKind.INDEX, "f1")
+        await asyncio.wait_for(done.wait(), timeout=5)
+
+        queue.enqueue(JobKind.PARSE, "f2")
+        await asyncio.wait_for(started.wait(), timeout=5)
+        # 等待 f1 的结果写回后再停止
+        for _ in range(50):
+            if _jobs(test_engine)[0].status == JobStatus.SUCCEEDED:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await queue.stop()
+
+    jobs = {job.file_hash: job for job in _jobs(test_engine)}
+    assert jobs["f1"].status == JobStatus.SUCCEEDED
+    assert jobs["f2"].status == JobStatus.QUEUED
+    assert jobs["f2"].attempts == 0
@@ -0,0 +1,90 @@
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from app.rag.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+from app.rag.vector_store import VectorStoreService
+
+CATALOG = [
+    "3411 锅炉及辅助设备制造：高效节能锅炉制造",
+    "4411 火力发电：燃煤电厂超低排放改造",
+    "4416 太阳能发电：光伏电站建设和运营",
+    "7820 环境卫生管理：城镇生活垃圾处理",
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = LexicalIndex(tmp_path / "lexical.db")
+    idx.add(
+        [f"p{i}" for i in range(len(CATALOG))],
+        [Document(page_content=text, metadata={"file_hash": "catalog"}) for text in CATALOG],
+    )
+    yield idx
+    idx.close()
+
+
+def test_tokenize_mixes_ngrams_and_codes():
+    terms = tokenize("3411 锅炉制造 1.1.1")
+    assert "3411" in terms and "1.1.1" in terms
+    assert {"锅炉", "炉制", "制造", "锅炉制", "炉制造"} <= set(terms)
+
+
+def test_bm25_ranks_exact_industry_hit_first(index):
+    hits = index.search("3411 锅炉及辅助设备制造", k=3)
+    assert hits[0].document.metadata["_id"] == "p0"
+    assert hits[0].coverage == 1.0
+    assert len(hits) == 1 or hits[0].score > hits[1].score
+
+
+def test_add_is_idempotent_and_delete_by_metadata(index):
+    index.add(["p0"], [Document(page_content=CATALOG[0], metadata={"file_hash": "catalog"})])
+    assert len(index) == len(CATALOG)
+
+    index.add(["u1"], [Document(page_content="光伏组件采购合同", metadata={"file_hash": "f1", "user_id": "alice"})])
+    assert [h.document.metadata["_id"] for h in index.search("光伏", k=5, user_id="alice")] == ["u1"]
+
+    assert index.delete_by_metadata("file_hash", "catalog") == len(CATALOG)
+    assert index.search("锅炉", k=5) == []
+    assert len(index) == 1
+
+
+def test_sees_writes_from_other_connections(tmp_path):
+    """其他进程 (另一个连接) 写入后，已连接的实例按新的片段数检索，不会一直返回空结果"""
+    reader, writer = LexicalIndex(tmp_path / "lexical.db"), LexicalIndex(tmp_path / "lexical.db")
+    assert reader.search("光伏", k=1) == []
+
+    writer.add(["p1"], [Document(page_content=CATALOG[2], metadata={})])
+    assert [hit.document.page_content for hit in reader.search("光伏", k=1)] == [CATALOG[2]]
+    assert len(reader) == 1
+
+    writer.delete(["p1"])
+    assert reader.search("光伏", k=1) == []
+    reader.close()
+    writer.close()
+
+
+def test_rrf_merges_by_point_id():
+    a, b, c = (Document(page_content=x, metadata={"_id": x}) for x in "abc")
+    fused = reciprocal_rank_fusion([[a, b], [b, c]], k=3)
+    assert [d.metadata["_id"] for d in fused] == ["b", "a", "c"]
+
+
+def test_decisive_lexical_hit_skips_embedding(index):
+    store = VectorStoreService()
+    store._lexical = index
+    store._db = MagicMock()
+    store._embeddings = MagicMock()
+
+    results = store.search("3411 锅炉及辅助设备制造", k=2)
+    assert results[0].metadata["_id"] == "p0"
+    store._embeddings.embed_query.assert_not_called()
+    store._db.similarity_search_by_vector.assert_not_called()
+
+    # 语义型查询仍走向量检索并与词法结果融合
+    store._embeddings.embed_query.return_value = [0.0]
+    store._db.similarity_search_by_vector.return_value = [Document(page_content="x", metadata={"_id": "p2"})]
+    results = store.search("新能源项目贷款支持", k=2)
+    store._embeddings.embed_query.assert_called_once()
+    assert results[0].metadata["_id"] == "p2"
@@ -0,0 +1,74 @@
+import numpy as np
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from app.rag.numpy_index import NumpyVectorIndex
+
+
+def _index_from_qdrant(tmp_path, n: int = 50, dim: int = 8):
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((n, dim), dtype=np.float32)
+    client = QdrantClient(path=str(tmp_path / "qdrant"))
+    client.create_collection("kb", vectors_config=rest.VectorParams(size=dim, distance=rest.Distance.COSINE))
+    client.upsert(
+        "kb",
+        points=[
+            rest.PointStruct(
+                id=i,
+                vector=v.tolist(),
+                payload={"page_content": f"chunk {i}", "metadata": {"user_id": f"u{i % 3}"}},
+            )
+            for i, v in enumerate(data)
+        ],
+        wait=True,
+    )
+    index = NumpyVectorIndex("kb")
+    assert index.load(client) == n
+    return client, index, rng
+
+
+def test_matches_qdrant_exact_search(tmp_path):
+    """与 Qdrant 精确检索的排序一致，过滤语义一致"""
+    client, index, rng = _index_from_qdrant(tmp_path)
+    user_filter = rest.Filter(must=[rest.FieldCondition(key="metadata.user_id", match=rest.MatchValue(value="u1"))])
+
+    for query in rng.standard_normal((5, 8)).tolist():
+        expected = [p.id for p in client.query_points("kb", query=query, limit=5).points]
+        assert [int(doc.metadata["_id"]) for doc, _ in index.search(query, 5)] == expected
+
+        expected = [p.id for p in client.query_points("kb", query=query, limit=5, query_filter=user_filter).points]
+        hits = index.search(query, 5, {"user_id": "u1"})
+        assert [int(doc.metadata["_id"]) for doc, _ in hits] == expected
+        assert all(doc.metadata["user_id"] == "u1" for doc, _ in hits)
+    client.close()
+
+
+def test_batch_equals_single_queries(tmp_path):
+    client, index, rng = _index_from_qdrant(tmp_path)
+    queries = rng.standard_normal((4, 8)).tolist()
+
+    batch = index.search_batch(queries, 3, {"user_id": "u2"})
+    single = [index.search(query, 3, {"user_id": "u2"}) for query in queries]
+    assert [[d.metadata["_id"] for d, _ in hits] for hits in batch] == [
+        [d.metadata["_id"] for d, _ in hits] for hits in single
+    ]
+    client.close()
+
+
+def test_writes_update_snapshot():
+    index = NumpyVectorIndex("kb")
+    assert index.search([1.0, 0.0], 3) == []
+
+    index.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], [Document("x", metadata={"file_hash": "h1"}), Document("y")])
+    assert index.search([1.0, 0.1], 1)[0][0].page_content == "x"
+
+    # 相同 id 覆盖
+    index.add(["a"], [[0.0, 1.0]], [Document("x2", metadata={"file_hash": "h1"})])
+    assert len(index) == 2
+    assert index.search([1.0, 0.0], 5, {"file_hash": "h1"})[0][0].page_content == "x2"
+
+    assert index.delete_by_metadata("file_hash", "h1") == 1
+    assert [doc.page_content for doc, _ in index.search([1.0, 0.0], 5)] == ["y"]
+    # 过滤无命中时返回空而不是未过滤的结果
+    assert index.search([1.0, 0.0], 5, {"file_hash": "h1"}) == []
@@ -30,3 +30,103 @@ async def test_parse_unsupported_file(tmp_path: Path):
     with pytest.raises(ValueError) as excinfo:
         await parse_file(file)
     assert "Unsupported file type" in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+async def test_parse_excel_groups_rows_into_blocks(tmp_path: Path):
+    """测试 Excel 流式解析：连续行按预算合并为带表头的块，并记录行号范围"""
+    from openpyxl import Workbook
+
+    from app.parsers.office import ExcelParser
+
+    file = tmp_path / "ledger.xlsx"
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = "贷款台账"
+    sheet.append(["客户", "金额", "用途"])
+    for i in range(1, 61):
+        sheet.append([f"企业{i}", i * 100, "光伏电站建设"])
+    sheet.append([None, None, None])  # 空行
+    sheet.append(["企业末", 1, "风电"])
+    wb.create_sheet("空表")
+    wb.save(file)
+
+    docs = await ExcelParser(block_max_chars=300).parse(file)
+
+    assert 1 < len(docs) < 61
+    assert all(doc.page_content.startswith("客户 | 金额 | 用途\n") for doc in docs)
+    assert all(len(doc.page_content) <= 300 for doc in docs)
+    assert docs[0].metadata["sheet"] == "贷款台账" and docs[0].metadata["row"] == 2
+    # 各块行号范围首尾相接，覆盖全部非空行
+    for prev, cur in zip(docs, docs[1:], strict=False):
+        assert cur.metadata["row"] == prev.metadata["row_end"] + 1
+    assert docs[-1].metadata["row_end"] == 63
+    assert docs[-1].page_content.endswith("企业末 | 1 | 风电")
+    assert "企业1 | 100 | 光伏电站建设" in docs[0].page_content
+
+
+def _write_pdf(path: Path, pages: int):
+    """生成每页一行文本的 PDF"""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 40 760 Td (Page {i + 1} content) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(stream)
+    with path.open("wb") as f:
+        writer.write(f)
+
+
+@pytest.mark.asyncio
+async def test_parse_pdf_in_page_ranges_keeps_order(tmp_path: Path):
+    """测试 PDF 按页段在进程池中并行解析，结果按页序合并"""
+    from app.parsers.pdf import PDFParser
+
+    file = tmp_path / "report.pdf"
+    _write_pdf(file, 20)
+    parser = PDFParser(workers=2, min_parallel_pages=4)
+    try:
+        docs = await parser.parse(file)
+    finally:
+        parser.close()
+
+    assert [doc.metadata["page"] for doc in docs] == list(range(20))
+    assert [doc.page_content for doc in docs] == [f"Page {i + 1} content" for i in range(20)]
+    assert docs[0].metadata["total_pages"] == 20 and docs[3].metadata["page_label"] == "4"
+
+
+@pytest.mark.asyncio
+async def test_parse_pdf_timeout(tmp_path: Path):
+    """测试单个 PDF 超时只放弃该文件，进程池保留给其他解析"""
+    from app.parsers.pdf import PDFParser
+
+    file = tmp_path / "report.pdf"
+    _write_pdf(file, 40)
+    parser = PDFParser(workers=2, timeout=0.001, min_parallel_pages=4)
+    try:
+        with pytest.raises(TimeoutError, match="report.pdf"):
+            await parser.parse(file)
+        # 超时不终止共享进程池，后续文件继续使用同一个池
+        pool = parser._pool
+        assert pool is not None
+        parser.timeout = 60
+        docs = await parser.parse(file)
+        assert parser._pool is pool
+        assert [doc.metadata["page"] for doc in docs] == list(range(40))
+    finally:
+        parser.close()
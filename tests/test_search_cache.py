@@ -0,0 +1,263 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import QdrantVectorStore
+
+from app.rag.lexical_index import LexicalIndex
+from app.rag.vector_store import VectorStoreService
+
+
+@pytest.fixture
+def store(tmp_path):
+    service = VectorStoreService()
+    service._lexical = LexicalIndex(tmp_path / "lexical.db")
+    service._client = MagicMock()
+    service._db = MagicMock()
+    service._db.similarity_search_by_vector.side_effect = lambda vector, k, filter, **kwargs: [
+        Document(page_content="太阳能发电", metadata={"_id": "p1"})
+    ]
+    service._embeddings = MagicMock()
+    service._embeddings.embed_query.return_value = [0.1, 0.2]
+    return service
+
+
+def test_repeated_search_hits_cache(store):
+    first = store.search("光伏  电站", k=5)
+    second = store.search(" 光伏 电站 ", k=5)
+
+    assert [d.page_content for d in second] == [d.page_content for d in first]
+    store._embeddings.embed_query.assert_called_once_with("光伏 电站")
+    store._db.similarity_search_by_vector.assert_called_once()
+
+    # 调用方修改返回值不影响缓存
+    second[0].metadata["mutated"] = True
+    assert "mutated" not in store.search("光伏 电站", k=5)[0].metadata
+
+
+def test_result_key_includes_k_and_filter(store):
+    store.search("光伏", k=5)
+    store.search("光伏", k=3)
+    store.search("光伏", k=5, user_id="u1")
+
+    # 同一 query 只需一次 Embedding，但三次检索结果分别缓存
+    assert store._embeddings.embed_query.call_count == 1
+    assert store._db.similarity_search_by_vector.call_count == 3
+
+
+@pytest.mark.parametrize("mutate", ["add_embeddings", "delete_by_metadata"])
+def test_writes_invalidate_results(store, mutate):
+    store.search("光伏", k=5)
+    generation = store.generation
+
+    if mutate == "add_embeddings":
+        store.add_embeddings([Document(page_content="x", metadata={})], [[0.0, 0.0]], ["id-1"])
+    else:
+        store.delete_by_metadata("file_hash", "abc")
+
+    assert store.generation == generation + 1
+    store.search("光伏", k=5)
+    assert store._db.similarity_search_by_vector.call_count == 2
+    # query 向量与集合内容无关，不随代数失效
+    assert store._embeddings.embed_query.call_count == 1
+
+
+def test_add_documents_invalidates_results(store):
+    store.search("光伏", k=5)
+    with patch.object(store._db, "add_documents"):
+        store.add_documents([Document(page_content="x", metadata={})])
+    store.search("光伏", k=5)
+    assert store._db.similarity_search_by_vector.call_count == 2
+
+
+def test_initialize_creates_missing_payload_indexes(monkeypatch):
+    """Server 模式下为缺失的过滤字段补建 keyword 索引"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "QDRANT_URL", "http://qdrant:6333")
+    client = MagicMock()
+    client.collection_exists.return_value = True
+    client.get_collection.return_value.payload_schema = {"metadata.user_id": object()}
+
+    service = VectorStoreService()
+    service._embeddings = MagicMock()
+    with (
+        patch("app.rag.vector_store.QdrantClient", return_value=client),
+        patch("app.rag.vector_store.AsyncQdrantClient"),
+        patch.object(QdrantVectorStore, "__init__", return_value=None),
+    ):
+        service.initialize()
+
+    created = [c.kwargs["field_name"] for c in client.create_payload_index.call_args_list]
+    assert created == ["metadata.file_hash"]
+
+
+@pytest.mark.asyncio
+async def test_asearch_runs_on_dedicated_executors(store):
+    """异步检索在专用线程池中执行，并与同步检索共享缓存"""
+    threads = {}
+
+    def embed_query(text):
+        threads["embed"] = threading.current_thread().name
+        return [0.1, 0.2]
+
+    def dense(vector, k, filter, **kwargs):
+        threads["qdrant"] = threading.current_thread().name
+        return [Document(page_content="太阳能发电", metadata={"_id": "p1"})]
+
+    store._embeddings.embed_query.side_effect = embed_query
+    store._db.similarity_search_by_vector.side_effect = dense
+
+    results = await store.asearch("光伏 电站", k=5, user_id="u1")
+    assert results[0].page_content == "太阳能发电"
+    assert threads["embed"].startswith("embed-query")
+    assert threads["qdrant"].startswith("qdrant")
+    assert store._db.similarity_search_by_vector.call_args.kwargs["filter"] is not None
+
+    store.search("光伏 电站", k=5, user_id="u1")
+    assert store._db.similarity_search_by_vector.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_executors_recreated_after_aclose(store):
+    """aclose 关闭线程池后单例仍可继续使用 (如应用在同一进程内重新启动)"""
+    store._embeddings.embed_documents.return_value = [[0.0, 1.0]]
+    assert await store.aembed_documents(["光伏"]) == [[0.0, 1.0]]
+    await store.aclose()
+    assert store._executors == {}
+
+    assert await store.aembed_documents(["光伏"]) == [[0.0, 1.0]]
+    assert (await store.asearch("光伏 电站", k=5))[0].page_content == "太阳能发电"
+    await store.aclose()
+
+
+@pytest.mark.asyncio
+async def test_aadd_documents_embeds_and_writes(store):
+    store._embeddings.embed_documents.return_value = [[0.0, 1.0]]
+    generation = store.generation
+
+    await store.aadd_documents([Document(page_content="光伏组件", metadata={})], user_id="u1")
+
+    point = store._client.upsert.call_args.kwargs["points"][0]
+    assert point.payload["metadata"]["user_id"] == "u1"
+    assert store.generation == generation + 1
+    assert store.lexical.search("光伏", k=1)[0].document.page_content == "光伏组件"
+
+
+def test_rebuild_builds_new_version_and_swaps_alias(tmp_path):
+    """知识库重建写入新版本，用户文档随之迁移，切换后倒排索引同步更新"""
+    from qdrant_client import QdrantClient
+
+    from app.rag.collections import create_version, list_versions, promote_version, resolve_alias
+
+    service = VectorStoreService()
+    service._lexical = LexicalIndex(tmp_path / "lexical.db")
+    service._client = QdrantClient(path=str(tmp_path / "qdrant"))
+    service._embeddings = MagicMock(spec=Embeddings)
+    service._embeddings.embed_documents.side_effect = lambda texts: [[1.0, 0.0]] * len(texts)
+    name = service.collection_name
+    old = create_version(service._client, name, 2)
+    promote_version(service._client, name, old)
+
+    service.add_embeddings([Document(page_content="旧版光伏目录", metadata={})], [[1.0, 0.0]], ["0" * 32])
+    user_id = "1" * 32
+    service.add_embeddings(
+        [Document(page_content="用户上传的光伏报告", metadata={"file_hash": "h1"})], [[0.0, 1.0]], [user_id]
+    )
+
+    new = service.rebuild([Document(page_content="新版光伏目录", metadata={})], batch_size=1)
+
+    assert resolve_alias(service._client, name) == new
+    assert list_versions(service._client, name) == [old, new]
+    assert service._client.count(name).count == 2
+    assert service._client.count(old).count == 2  # 旧版本原样保留
+    contents = {hit.document.page_content for hit in service.lexical.search("光伏", k=5)}
+    assert contents == {"新版光伏目录", "用户上传的光伏报告"}
+    service._client.close()
+
+
+@pytest.mark.asyncio
+async def test_numpy_backend_serves_dense_search(store):
+    """numpy 引擎替代 Qdrant 完成向量检索，写入同步到内存索引"""
+    from app.rag.numpy_index import NumpyVectorIndex
+
+    store._numpy = NumpyVectorIndex(store.collection_name)
+    store.add_embeddings(
+        [Document(page_content="风电项目", metadata={}), Document(page_content="光伏项目", metadata={})],
+        [[1.0, 0.0], [0.1, 0.2]],
+        ["a", "b"],
+        user_id="u1",
+    )
+
+    results = await store.asearch("电站", k=1, user_id="u1")
+    assert results[0].page_content == "光伏项目"
+    assert store.similarity_search_batch(["电站"], k=2, user_id="u2") == [[]]
+    store._db.similarity_search_by_vector.assert_not_called()
+
+
+def test_alias_switch_by_another_process_reloads_dimension(tmp_path, monkeypatch):
+    """别名被迁移脚本切换到其他维度的版本后，检索与写入改用新维度，query 向量缓存按维度区分"""
+    from qdrant_client import QdrantClient
+
+    from app.core.config import settings
+    from app.rag.collections import create_version, promote_version
+
+    monkeypatch.setattr(settings, "COLLECTION_ALIAS_CHECK_SECONDS", 0)
+    service = VectorStoreService()
+    service._lexical = LexicalIndex(tmp_path / "lexical.db")
+    service._client = QdrantClient(path=str(tmp_path / "qdrant"))
+    embeddings = service._embeddings = MagicMock(spec=Embeddings, dimensions=None)
+    embeddings.embed_documents.side_effect = lambda texts: [[1.0] * embeddings.dimensions for _ in texts]
+    embeddings.embed_query.side_effect = lambda text: [1.0] * embeddings.dimensions
+    name = service.collection_name
+    promote_version(service._client, name, create_version(service._client, name, 4))
+    service._load_serving()
+    service.search("光伏", k=1)
+    assert embeddings.dimensions == 4
+
+    # 模拟迁移脚本 (另一进程) 以 2 维重建并切换别名
+    promote_version(service._client, name, create_version(service._client, name, 2))
+    generation = service.generation
+    service.search("光伏", k=1)
+
+    assert embeddings.dimensions == 2
+    assert service.generation == generation + 1
+    assert embeddings.embed_query.call_count == 2  # 旧维度的 query 向量不会被复用
+    service.add_embeddings([Document(page_content="光伏组件", metadata={})], [[0.0, 1.0]], ["2" * 32])
+    assert service._client.count(name).count == 1
+    service._client.close()
+
+
+def test_numpy_backend_follows_rollback_by_another_process(tmp_path, monkeypatch):
+    """numpy 引擎在别名被回滚脚本切回旧版本后重新载入旧版本的向量"""
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as rest
+
+    from app.core.config import settings
+    from app.rag.collections import create_version, promote_version, rollback_version
+
+    service = VectorStoreService()
+    monkeypatch.setattr(settings, "COLLECTION_ALIAS_CHECK_SECONDS", 0)
+    monkeypatch.setattr(settings, "VECTOR_SEARCH_BACKENDS", {service.collection_name: "numpy"})
+    service._lexical = LexicalIndex(tmp_path / "lexical.db")
+    client = service._client = QdrantClient(path=str(tmp_path / "qdrant"))
+    service._embeddings = MagicMock(spec=Embeddings, dimensions=None)
+    service._embeddings.embed_documents.side_effect = lambda texts: [[1.0, 0.0] for _ in texts]
+    service._embeddings.embed_query.return_value = [1.0, 0.0]
+    name = service.collection_name
+
+    for content in ("旧版目录", "新版目录"):
+        version = create_version(client, name, 2)
+        client.upsert(
+            version,
+            [rest.PointStruct(id=1, vector=[1.0, 0.0], payload={"page_content": content, "metadata": {}})],
+        )
+        promote_version(client, name, version)
+    service._load_serving()
+    assert [d.page_content for d in service.similarity_search_batch(["目录"], k=1)[0]] == ["新版目录"]
+
+    rollback_version(client, name)
+    assert [d.page_content for d in service.similarity_search_batch(["目录"], k=1)[0]] == ["旧版目录"]
+    client.close()
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from app.models.session import ChatMessage, ChatSession
+from app.services.session_service import session_service
+
+test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    SQLModel.metadata.create_all(test_engine)
+    with Session(test_engine) as session:
+        yield session
+    SQLModel.metadata.drop_all(test_engine)
+
+
+def test_append_message_writes_rows(session: Session):
+    """测试消息按 seq 追加为独立行，并能组装回 history"""
+    with patch("app.services.session_service.engine", test_engine):
+        session_service.append_message("s-1", "user", "你好", attachments=[{"hash": "h1", "name": "a.pdf"}])
+        session_service.append_message("s-1", "assistant", "您好", thought_process=["Thinking: ..."])
+
+        rows = session.exec(select(ChatMessage).where(ChatMessage.session_id == "s-1")).all()
+        assert [r.seq for r in rows] == [0, 1]
+
+        data = session_service.get_session("s-1")
+        assert data["history"][0] == {
+            "role": "user",
+            "content": "你好",
+            "attachments": [{"hash": "h1", "name": "a.pdf"}],
+        }
+        assert data["history"][1]["thought_process"] == ["Thinking: ..."]
+        assert session_service.count_messages("s-1") == 2
+
+
+def test_get_chat_history_reads_tail(session: Session):
+    """测试 get_chat_history 只返回最后 N 条且保持正序"""
+    with patch("app.services.session_service.engine", test_engine):
+        for i in range(6):
+            session_service.append_message("s-2", "user" if i % 2 == 0 else "assistant", f"m{i}")
+
+        history = session_service.get_chat_history("s-2", limit=3)
+        assert [m.content for m in history] == ["m3", "m4", "m5"]
+        assert isinstance(history[0], AIMessage)
+        assert isinstance(history[1], HumanMessage)
+
+
+def test_delete_session_removes_messages(session: Session):
+    """测试删除会话时级联清理消息行"""
+    with patch("app.services.session_service.engine", test_engine):
+        session_service.append_message("s-3", "user", "hi", user_id="u1")
+        assert session_service.delete_session("s-3", user_id="u1") is True
+        assert session_service.count_messages("s-3") == 0
+
+
+def test_history_window_uses_run_cache(session: Session):
+    """测试同一次图运行内的重复读取命中缓存"""
+    with patch("app.services.session_service.engine", test_engine):
+        for i in range(4):
+            session_service.append_message("s-4", "user", f"m{i}", attachments=[{"hash": f"h{i}"}])
+
+        cache = {}
+        window = session_service.get_history_window("s-4", limit=3, cache=cache)
+        assert window == [{"role": "user", "content": f"m{i}"} for i in (1, 2, 3)]
+
+        with patch("app.services.session_service.Session") as mock_session:
+            assert session_service.get_history_window("s-4", limit=2, cache=cache)[0]["content"] == "m2"
+            mock_session.assert_not_called()
+
+        # 请求更大的窗口时重新读取
+        assert len(session_service.get_history_window("s-4", limit=10, cache=cache)) == 4
+
+
+def test_attachment_refs_expand_lazily(session: Session):
+    """测试附件默认只返回引用，展开时才通过解析缓存补全正文"""
+    legacy = {"hash": "h1", "name": "a.pdf", "content": "inline text"}
+    ref = {"hash": "h2", "name": "b.pdf", "size": 10, "page_count": 2}
+    with patch("app.services.session_service.engine", test_engine):
+        session_service.append_message("s-5", "user", "看看附件", attachments=[legacy, ref])
+
+        data = session_service.get_session("s-5")
+        assert data["history"][0]["attachments"] == [{"hash": "h1", "name": "a.pdf"}, ref]
+
+        with patch(
+            "app.services.document_service.document_service.get_rendered_contents",
+            return_value={"h1": "[Page 1]\nA", "h2": "[Page 1]\nB"},
+        ) as mock_render:
+            data = session_service.get_session("s-5", expand_attachments=True)
+            assert sorted(mock_render.call_args[0][0]) == ["h1", "h2"]
+            assert [a["content"] for a in data["history"][0]["attachments"]] == ["[Page 1]\nA", "[Page 1]\nB"]
+
+
+def test_concurrent_appends_get_distinct_seq(tmp_path):
+    """同一会话的并发追加在 INSERT 中分配序号，不会因序号冲突失败"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(file_engine)
+    with (
+        patch("app.services.session_service.engine", file_engine),
+        ThreadPoolExecutor(8) as pool,
+    ):
+        list(pool.map(lambda i: session_service.append_message("s-race", "user", f"m{i}"), range(16)))
+
+    with Session(file_engine) as session:
+        seqs = session.exec(select(ChatMessage.seq).where(ChatMessage.session_id == "s-race")).all()
+        assert sorted(seqs) == list(range(16))
+        assert session.get(ChatSession, "s-race").title == "新对话"
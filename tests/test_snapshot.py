@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+
+from app.rag.collections import create_version, promote_version
+from app.rag.lexical_index import LexicalIndex
+from app.rag.snapshot import export_snapshot, import_snapshot, manifest_matches, read_manifest, snapshot_dir_for
+from app.rag.vector_store import VectorStoreService
+
+
+def _store(tmp_path, name: str) -> VectorStoreService:
+    service = VectorStoreService()
+    service._lexical = LexicalIndex(tmp_path / f"{name}_lexical.db")
+    service._client = QdrantClient(path=str(tmp_path / name))
+    service._embeddings = MagicMock()
+    version = create_version(service._client, service.collection_name, 2)
+    promote_version(service._client, service.collection_name, version)
+    return service
+
+
+def test_export_import_roundtrip(tmp_path):
+    """快照导出后在新节点载入：point id、向量与倒排索引都与源一致，无需 Embedding"""
+    source = _store(tmp_path, "source")
+    source.add_embeddings(
+        [
+            Document(page_content="光伏发电设施建设", metadata={"file_hash": "h1", "filename": "目录.json"}),
+            Document(page_content="风力发电装备制造", metadata={"file_hash": "h1", "filename": "目录.json"}),
+            Document(page_content="用户文档", metadata={"file_hash": "other"}),
+        ],
+        [[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]],
+        ["00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002", "0" * 31 + "3"],
+    )
+    snapshot_dir = snapshot_dir_for(tmp_path / "目录.json")
+    manifest = export_snapshot(
+        source._client, source.collection_name, snapshot_dir, "h1", "目录.json", model="text-embedding-v3"
+    )
+    assert manifest["count"] == 2 and manifest["embedding_dim"] == 2
+    assert manifest_matches(read_manifest(snapshot_dir), "h1", "text-embedding-v3", 2)
+    source._client.close()
+
+    target = _store(tmp_path, "target")
+    assert import_snapshot(target, snapshot_dir) == 2
+    assert import_snapshot(target, snapshot_dir) == 2  # 幂等
+    assert target._client.count(target.collection_name).count == 2
+    point = target._client.retrieve(
+        target.collection_name, ["00000000-0000-0000-0000-000000000002"], with_vectors=True
+    )[0]
+    assert point.vector == pytest.approx([0.0, 1.0])
+    assert target.lexical.search("风力发电", k=1)[0].document.metadata["file_hash"] == "h1"
+    target._embeddings.embed_documents.assert_not_called()
+    target._client.close()
+
+
+@pytest.mark.parametrize(
+    ("source_hash", "model", "dim"),
+    [("changed", "text-embedding-v3", 1024), ("h1", "text-embedding-v4", 1024), ("h1", "text-embedding-v3", 512)],
+)
+def test_manifest_mismatch_requires_reembedding(source_hash, model, dim):
+    manifest = {"format": 1, "source_hash": "h1", "embedding_model": "text-embedding-v3", "embedding_dim": 1024}
+    assert manifest_matches(manifest, "h1", "text-embedding-v3", 1024)
+    assert not manifest_matches(manifest, source_hash, model, dim)
+    assert not manifest_matches(None, "h1", "text-embedding-v3", 1024)
@@ -1,4 +1,5 @@
-from unittest.mock import patch
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -55,8 +56,8 @@ async def test_workflow_stream():
         }
 
     with patch.object(workflow_service, "_graph") as mock_graph:
-        # Mock _get_file_content to avoid DB/Network
-        with patch.object(workflow_service, "_get_file_content", return_value=None):
+        # Mock _get_file_contents to avoid DB/Network
+        with patch.object(workflow_service, "_get_file_contents", return_value={}):
             mock_graph.astream_events.side_effect = mock_stream
 
             events = []
@@ -128,8 +129,8 @@ async def test_process_stream_filters_json():
     ws = WorkflowService()
     ws._graph = mock_graph
 
-    # Mock _get_file_content to avoid DB
-    with patch.object(ws, "_get_file_content", return_value=None):
+    # Mock _get_file_contents to avoid DB
+    with patch.object(ws, "_get_file_contents", return_value={}):
         req = ChatRequest(message="test", session_id="s1", file_hashes=[])
         events = []
         async for event in ws.process_stream(req):
@@ -140,3 +141,63 @@ async def test_process_stream_filters_json():
     thought_events = [e for e in events if "thought_delta" in e]
     assert len(thought_events) == 1
     assert "正在思考" in thought_events[0]
+
+
+@pytest.mark.asyncio
+async def test_process_stream_loads_attachments_in_batch():
+    """测试附件一次批量读取 (读取前一条进度事件)，并保留附件引用"""
+    from app.services.document_service import UPLOAD_CACHE
+    from app.services.workflow_service import WorkflowService
+
+    ws = WorkflowService()
+    mock_graph = MagicMock()
+    mock_graph.astream_events.return_value = AsyncMockIterator([])
+    ws._graph = mock_graph
+
+    UPLOAD_CACHE.set("cached", {"content": "[Page 1]\nC", "filename": "c.pdf", "size": 3, "page_count": 1})
+    loaded = {
+        "h1": {"content": "[Page 1]\nA", "filename": "a.pdf", "size": 1, "page_count": 1},
+        "h2": {"content": "[Page 1]\nB", "filename": "b.pdf", "size": 2, "page_count": 1},
+    }
+
+    with (
+        patch.object(ws, "_load_file_contents", return_value=loaded) as mock_load,
+        patch("app.services.workflow_service.document_service.wait_until_parsed", AsyncMock(return_value=[])),
+        patch("app.services.workflow_service.session_service") as mock_sessions,
+    ):
+        req = ChatRequest(message="test", session_id="s-batch", file_hashes=["h1", "cached", "h2"])
+        events = [json.loads(e.replace("data: ", "").strip()) async for e in ws.process_stream(req)]
+
+    mock_load.assert_called_once_with(["h1", "h2"])
+    progress = [e["payload"]["text"] for e in events if e["event"] == "status_update"]
+    assert [t for t in progress if t.startswith("正在读取")] == ["正在读取 3 个文档..."]
+
+    inputs = mock_graph.astream_events.call_args[0][0]
+    assert inputs["uploaded_documents"] == {"h1": "[Page 1]\nA", "cached": "[Page 1]\nC", "h2": "[Page 1]\nB"}
+    assert inputs["active_documents"] == ["h1", "cached", "h2"]
+    attachments = mock_sessions.append_message.call_args_list[0].kwargs["attachments"]
+    assert attachments[0] == {"hash": "h1", "name": "a.pdf", "size": 1, "page_count": 1}
+    UPLOAD_CACHE.pop("cached")
+
+
+def test_document_registry_dedupes_by_hash():
+    """测试文档登记表按哈希去重，并兼容旧的列表形式"""
+    from app.graph.state import merge_documents
+
+    registry = merge_documents({}, {"h1": "A"})
+    registry = merge_documents(registry, {"h1": "A", "h2": "B"})
+    assert registry == {"h1": "A", "h2": "B"}
+
+    legacy = merge_documents(["old text"], {"h1": "A"})
+    assert list(legacy.values()) == ["old text", "A"]
+
+
+def test_build_document_context_is_bounded():
+    """测试提取上下文：本轮文档优先，总长度受限且按公平份额截断"""
+    from app.graph.nodes import build_document_context
+
+    docs = {"old": "o" * 50, "short": "s" * 5, "new": "n" * 50}
+    context = build_document_context(docs, priority=["new"], limit=45)
+
+    parts = context.split("\n\n")
+    assert parts == ["n" * 20, "o" * 20, "s" * 5]